@@ -0,0 +1,70 @@
+"""Задержка одного вызова: соединение на каждый вызов против общего менеджера
+
+Запуск из корня проекта:
+    python -m benchmarks.connection_latency [--calls N]
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import database as db
+
+QUERIES = {
+    'get_all_categories': ("SELECT * FROM categories ORDER BY name", ()),
+    'get_all_tags': ("SELECT * FROM tags ORDER BY name", ()),
+    'get_study_item_by_id': ("SELECT * FROM study_items WHERE id = ?", (1,)),
+    'search_study_items': (
+        "SELECT * FROM study_items WHERE LOWER(title) LIKE LOWER(?)", ('%python%',)),
+    'count_items': ("SELECT COUNT(*) FROM study_items", ()),
+}
+
+
+def per_call_connection(path, sql, params):
+    """Прежняя схема: открыть соединение, выполнить запрос, закрыть"""
+    conn = sqlite3.connect(path)
+    conn.execute(sql, params).fetchall()
+    conn.close()
+
+
+def shared_connection(sql, params):
+    """Новая схема: соединение из пула менеджера"""
+    with db.reader() as conn:
+        conn.execute(sql, params).fetchall()
+
+
+def measure(func, calls):
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        db.use_database(path)
+        db.init_database()
+
+        print(f"{'запрос':<24}{'до p50, мкс':>14}{'до p95':>10}"
+              f"{'после p50':>12}{'после p95':>12}{'ускорение':>12}")
+        for name, (sql, params) in QUERIES.items():
+            before = measure(lambda: per_call_connection(path, sql, params), args.calls)
+            after = measure(lambda: shared_connection(sql, params), args.calls)
+            print(f"{name:<24}{before[0]:>14.1f}{before[1]:>10.1f}"
+                  f"{after[0]:>12.1f}{after[1]:>12.1f}{before[0] / after[0]:>11.1f}x")
+
+        db.close_connections()
+
+
+if __name__ == '__main__':
+    main()
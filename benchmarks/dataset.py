@@ -0,0 +1,177 @@
+"""Генератор синтетической базы для замеров
+
+Данные детерминированы зерном генератора: одинаковые параметры дают
+одинаковую базу. Распределения приближены к реальным: популярность
+категорий и тегов убывает по закону Ципфа, завершённых материалов
+больше, чем отложенных, у части материалов нет дедлайна, число и
+длительность учебных сессий сильно разбросаны.
+
+Запуск из корня проекта:
+    python -m benchmarks.dataset --scale medium --out bench.db
+"""
+import argparse
+import datetime
+import itertools
+import os
+import random
+import sys
+import time
+
+import database as db
+
+# Масштаб: (материалов, тегов, категорий, сессий на материал в среднем)
+SCALES = {
+    'small': (1000, 200, 10, 3),
+    'medium': (100000, 2000, 20, 3),
+    'large': (1000000, 5000, 30, 3),
+}
+
+CHUNK_SIZE = 50000
+
+STATUS_WEIGHTS = {'completed': 40, 'planned': 25, 'in_progress': 20, 'on_hold': 15}
+RATING_WEIGHTS = {None: 30, 1: 3, 2: 7, 3: 20, 4: 25, 5: 15}
+PRIORITY_WEIGHTS = {1: 10, 2: 20, 3: 40, 4: 20, 5: 10}
+TAGS_PER_ITEM_WEIGHTS = {0: 15, 1: 30, 2: 30, 3: 15, 4: 7, 5: 3}
+
+WORDS = (
+    "python sql алгоритмы структуры данных математика анализ алгебра "
+    "геометрия статистика вероятность english grammar vocabulary физика "
+    "химия история экономика менеджмент дизайн интерфейсы сети linux "
+    "docker kubernetes тестирование архитектура рефакторинг паттерны "
+    "машинное обучение нейросети оптимизация базы индексы транзакции "
+    "курс лекция практикум книга видео семинар конспект проект задачи "
+    "основы продвинутый введение углублённый обзор экзамен подготовка"
+).split()
+
+START_DATE = datetime.date(2021, 1, 1)
+DAYS = 4 * 365
+
+
+def zipf_weights(count, exponent=1.1):
+    """Накопленные веса для random.choices с убывающей популярностью"""
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def _choices(weights):
+    return list(weights), list(itertools.accumulate(weights.values()))
+
+
+def _text(rnd, low, high):
+    return ' '.join(rnd.choices(WORDS, k=rnd.randint(low, high)))
+
+
+def generate(path, scale='small', items=None, seed=1, progress=None):
+    """Создание базы path заданного масштаба; возвращает число материалов"""
+    scale_items, tag_count, category_count, sessions_per_item = SCALES[scale]
+    items = items or scale_items
+    rnd = random.Random(seed)
+
+    statuses, status_cum = _choices(STATUS_WEIGHTS)
+    ratings, rating_cum = _choices(RATING_WEIGHTS)
+    priorities, priority_cum = _choices(PRIORITY_WEIGHTS)
+    tag_counts, tag_count_cum = _choices(TAGS_PER_ITEM_WEIGHTS)
+    category_cum = zipf_weights(category_count)
+    tag_cum = zipf_weights(tag_count)
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    db.use_database(path)
+    db.init_database()
+
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM study_items")
+        conn.execute("DELETE FROM categories")
+        conn.execute("DELETE FROM tags")
+        conn.executemany(
+            "INSERT INTO categories (id, name, description, color, is_default) VALUES (?, ?, ?, ?, ?)",
+            [(i, f"Категория {i}", _text(rnd, 2, 5), f"#{rnd.randrange(0x1000000):06x}", int(i == 1))
+             for i in range(1, category_count + 1)]
+        )
+        conn.executemany(
+            "INSERT INTO tags (id, name, color) VALUES (?, ?, ?)",
+            [(i, f"{rnd.choice(WORDS)}-{i}", f"#{rnd.randrange(0x1000000):06x}")
+             for i in range(1, tag_count + 1)]
+        )
+        suspended = db.suspend_maintenance(conn)
+
+    category_ids = range(1, category_count + 1)
+    tag_ids = range(1, tag_count + 1)
+    # Геометрическое распределение числа сессий со средним sessions_per_item
+    session_p = 1 / (sessions_per_item + 1)
+
+    try:
+        for start in range(1, items + 1, CHUNK_SIZE):
+            item_rows, tag_rows, session_rows = [], [], []
+            for item_id in range(start, min(start + CHUNK_SIZE, items + 1)):
+                created = START_DATE + datetime.timedelta(days=rnd.randrange(DAYS))
+                deadline = None
+                if rnd.random() < 0.7:
+                    deadline = created + datetime.timedelta(days=rnd.randint(7, 365))
+
+                minutes = 0
+                last_day = (deadline or created + datetime.timedelta(days=90)) - created
+                while rnd.random() > session_p:
+                    duration = min(int(rnd.lognormvariate(3.6, 0.6)), 480)
+                    day = created + datetime.timedelta(days=rnd.randint(0, last_day.days))
+                    session_rows.append((item_id, day.isoformat(), duration,
+                                         _text(rnd, 0, 6) or None))
+                    minutes += duration
+
+                item_rows.append((
+                    item_id,
+                    f"{_text(rnd, 2, 4).capitalize()} {item_id}",
+                    _text(rnd, 5, 15),
+                    rnd.choices(category_ids, cum_weights=category_cum)[0]
+                    if rnd.random() < 0.95 else None,
+                    rnd.choices(ratings, cum_weights=rating_cum)[0],
+                    rnd.choices(statuses, cum_weights=status_cum)[0],
+                    f"{created.isoformat()} {rnd.randrange(24):02d}:{rnd.randrange(60):02d}:00",
+                    deadline.isoformat() if deadline else None,
+                    round(minutes / 60, 2),
+                    rnd.choices(priorities, cum_weights=priority_cum)[0],
+                ))
+                k = rnd.choices(tag_counts, cum_weights=tag_count_cum)[0]
+                for tag_id in set(rnd.choices(tag_ids, cum_weights=tag_cum, k=k)):
+                    tag_rows.append((item_id, tag_id))
+
+            with db.transaction() as conn:
+                conn.executemany(
+                    """INSERT INTO study_items
+                       (id, title, description, category_id, rating, status,
+                        created_at, deadline, hours_spent, priority)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    item_rows
+                )
+                conn.executemany(
+                    "INSERT INTO study_item_tags (study_item_id, tag_id) VALUES (?, ?)", tag_rows)
+                conn.executemany(
+                    """INSERT INTO study_sessions (study_item_id, date, duration_minutes, notes)
+                       VALUES (?, ?, ?, ?)""",
+                    session_rows
+                )
+            if progress:
+                progress(min(start + CHUNK_SIZE - 1, items), items)
+    finally:
+        with db.transaction() as conn:
+            db.resume_maintenance(conn, suspended)
+
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--items', type=int, help="переопределить число материалов")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', default='bench.db')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    items = generate(args.out, args.scale, args.items, args.seed,
+                     progress=lambda done, total: print(f"\r{done}/{total}", end='', flush=True))
+    print(f"\nСоздано материалов: {items} за {time.perf_counter() - start:.1f} с -> {args.out}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
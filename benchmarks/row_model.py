@@ -0,0 +1,88 @@
+"""Память и время разбора строк списка: кортеж, sqlite3.Row и StudyItem
+
+Строки читаются запросом get_all_study_items из готовой базы (см.
+benchmarks.dataset). Память считается через tracemalloc вместе со
+значениями полей и отдельно только для объекта строки (sys.getsizeof).
+
+Запуск из корня проекта:
+    python -m benchmarks.row_model --db bench.db [--limit N]
+"""
+import argparse
+import gc
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+import database as db
+
+FETCH_SIZE = 1000
+
+
+def read_tuples(conn, sql):
+    return conn.execute(sql).fetchall()
+
+
+def read_rows(conn, sql):
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    return cursor.execute(sql).fetchall()
+
+
+def read_factory(conn, sql):
+    cursor = conn.cursor()
+    cursor.row_factory = db.study_item_row
+    return cursor.execute(sql).fetchall()
+
+
+def read_batches(conn, sql):
+    cursor = conn.execute(sql)
+    items = []
+    while True:
+        chunk = cursor.fetchmany(FETCH_SIZE)
+        if not chunk:
+            return items
+        items.extend(db.decode_study_items(chunk))
+
+
+VARIANTS = (
+    ('кортеж', read_tuples),
+    ('sqlite3.Row', read_rows),
+    ('StudyItem: row_factory', read_factory),
+    ('StudyItem: пачки fetchmany', read_batches),
+)
+
+
+def measure(conn, sql, read):
+    gc.collect()
+    start = time.perf_counter()
+    rows = read(conn, sql)
+    elapsed = time.perf_counter() - start
+    del rows
+
+    gc.collect()
+    tracemalloc.start()
+    rows = read(conn, sql)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return len(rows), elapsed, memory, sys.getsizeof(rows[0]) if rows else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='bench.db')
+    parser.add_argument('--limit', type=int, default=100000)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    sql = db.ITEM_LIST_SELECT + db.ITEM_LIST_ORDER + f" LIMIT {int(args.limit)}"
+
+    print(f"{'вариант':<30}{'строк':>8}{'время, с':>10}{'байт/строку':>14}{'объект':>9}")
+    for name, read in VARIANTS:
+        count, elapsed, memory, size = measure(conn, sql, read)
+        print(f"{name:<30}{count:>8}{elapsed:>10.3f}{memory / max(count, 1):>14.0f}{size:>9}")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,420 @@
+"""Замер публичных функций database.py и форматирования строк списка
+
+Каждая функция вызывается много раз на синтетической базе из
+benchmarks.dataset, аргументы выбираются детерминированно. Результат -
+JSON с p50/p95/p99 в миллисекундах; с --baseline прогон сравнивается с
+сохранённым результатом прошлой версии.
+
+Запуск из корня проекта:
+    python -m benchmarks.run --scale medium --out bench-medium.json
+    python -m benchmarks.run --db bench.db --baseline bench-old.json
+"""
+import argparse
+import contextlib
+import datetime
+import inspect
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import database as db
+from benchmarks import dataset
+from gui.item_table import format_item
+from gui.search_cache import SearchCache
+
+CALLS = 200
+# Тяжёлые вызовы, для которых хватает нескольких повторов
+HEAVY_CALLS = 5
+# Во сколько раз должен вырасти p50 или p95, чтобы считать это регрессией
+REGRESSION_RATIO = 1.2
+
+# Функции, которые не замеряются, и причина
+SKIPPED = {
+    'cached_query': "декоратор, замеряются обёрнутые им функции",
+    'use_database': "переключение файла базы",
+    'close_connections': "закрытие пула",
+    'migrate': "выполняется однократно при обновлении схемы",
+    'add_default_data': "часть init_database",
+    'suspend_maintenance': "удаляет индексы, см. importer.py",
+    'resume_maintenance': "пересоздаёт индексы, см. importer.py",
+    'create_main_table': "создание схемы",
+    'create_categories_table': "создание схемы",
+    'create_tags_table': "создание схемы",
+    'create_record_tags_table': "создание схемы",
+    'create_study_sessions_table': "создание схемы",
+    'set_trace_callback': "включение трассировки, см. profiler.py",
+}
+
+
+def percentile(sorted_values, fraction):
+    """Перцентиль по ближайшему рангу"""
+    index = max(0, int(round(fraction * len(sorted_values))) - 1)
+    return sorted_values[index]
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        'calls': len(timings),
+        'p50_ms': round(percentile(timings, 0.50), 4),
+        'p95_ms': round(percentile(timings, 0.95), 4),
+        'p99_ms': round(percentile(timings, 0.99), 4),
+        'mean_ms': round(sum(timings) / len(timings), 4),
+        'max_ms': round(timings[-1], 4),
+    }
+
+
+def _text_sample(rnd):
+    return ' '.join(rnd.choices(dataset.WORDS, k=12))
+
+
+def build_cases(rnd, calls):
+    """Сценарии замера: (имя, функция, фабрика аргументов, число вызовов)
+
+    Фабрика вызывается до начала замера и возвращает (args, kwargs),
+    поэтому подготовка аргументов во время не входит.
+    """
+    with db.reader() as conn:
+        max_id = conn.execute("SELECT MAX(id) FROM study_items").fetchone()[0]
+        # Сырые кортежи страницы для разбора в StudyItem
+        raw_page = conn.execute(
+            db.ITEM_LIST_SELECT + db.ITEM_LIST_ORDER + " LIMIT ?", (db.PAGE_SIZE,)).fetchall()
+    category_ids = [row[0] for row in db.get_all_categories()]
+    tag_ids = [row[0] for row in db.get_all_tags()]
+    category_names = [row[1] for row in db.get_all_categories()]
+    tag_names = [row[1] for row in db.get_all_tags()]
+    statuses = list(db.STATUS_RANKS)
+    today = datetime.date.today()
+    page = db.get_study_items_page()
+
+    def random_id():
+        return rnd.randint(1, max_id)
+
+    def sort_key():
+        rows = db.get_study_items_by_ids([random_id()])
+        return db.item_sort_key(next(iter(rows.values()))) if rows else None
+
+    def query():
+        return ' '.join(rnd.sample(dataset.WORDS, rnd.randint(1, 2)))
+
+    def item_data():
+        return {
+            'title': f"Замер {query()}",
+            'description': query(),
+            'category_id': rnd.choice(category_ids),
+            'rating': rnd.randint(1, 5),
+            'status': rnd.choice(statuses),
+            'deadline': f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+            'hours_spent': rnd.randint(0, 40),
+            'priority': rnd.randint(1, 5),
+            'tags': rnd.sample(tag_ids, 2),
+        }
+
+    # Созданные при замере записи удаляются соответствующими delete_*
+    created_items, created_categories, created_tags = [], [], []
+
+    def add_item(data):
+        created_items.append(db.add_study_item(data))
+
+    def add_category(name):
+        created_categories.append(db.add_category(name, "", "#123456"))
+
+    def item_batch(size=100):
+        with db.transaction():
+            return (([db.add_study_item(item_data()) for _ in range(size)],), {})
+
+    created_sessions = []
+
+    def add_session(item_id, minutes):
+        created_sessions.append(db.add_study_session(item_id, minutes))
+
+    def add_tag(name):
+        created_tags.append(db.add_tag(name, "#123456"))
+
+    def with_reader(func):
+        def call():
+            with db.reader() as conn:
+                func(conn)
+        return call
+
+    def reload_references():
+        db.invalidate_reference_cache()
+        db.get_all_tags()
+
+    def empty_transaction():
+        with db.transaction():
+            pass
+
+    def uncached(func):
+        # Замер самого запроса: кэш результатов очищается перед вызовом
+        def call(*args, **kwargs):
+            db.clear_query_cache()
+            return func(*args, **kwargs)
+        return call
+
+    def empty_write():
+        pass
+
+    def empty_reader():
+        with db.reader():
+            pass
+
+    def format_page(rows):
+        current_date = today.isoformat()
+        for row in rows:
+            format_item(row, current_date)
+
+    # Результаты по первой букве слова: из них уточняется полное слово
+    by_letter = {}
+
+    def refine_args():
+        word = rnd.choice(dataset.WORDS)
+        if word[0] not in by_letter:
+            by_letter[word[0]] = SearchCache.fetch(word[0])
+        cache = SearchCache()
+        cache.store(word[0], None, None, dict(by_letter[word[0]]))
+        return (cache, word), {}
+
+    unique = iter(range(10 ** 9))
+    no_args = lambda: ((), {})
+    return [
+        ('create_connection', lambda: db.create_connection().close(), no_args, calls),
+        ('get_manager', db.get_manager, no_args, calls),
+        ('transaction', empty_transaction, no_args, calls),
+        ('reader', empty_reader, no_args, calls),
+        ('submit_write', lambda: db.submit_write(empty_write).result(), no_args, calls),
+        ('write', db.write, lambda: ((empty_write,), {}), calls),
+        ('get_write_stats', db.get_write_stats, no_args, calls),
+        ('is_busy_error', db.is_busy_error,
+         lambda: ((sqlite3.OperationalError("database is locked"),), {}), calls),
+        ('get_schema_version', with_reader(db.get_schema_version), no_args, calls),
+        ('fts5_available', with_reader(db.fts5_available), no_args, calls),
+        ('fts_enabled', db.fts_enabled, no_args, calls),
+        ('schema_ready', with_reader(db.schema_ready), no_args, calls),
+        ('data_version', db.data_version, no_args, calls),
+        ('init_database', db.init_database, no_args, HEAVY_CALLS),
+        ('get_all_study_items', uncached(db.get_all_study_items), no_args, HEAVY_CALLS),
+        ('item_sort_key', db.item_sort_key, lambda: ((rnd.choice(page),), {}), calls),
+        ('study_item_row', db.study_item_row, lambda: ((None, rnd.choice(raw_page)), {}), calls),
+        ('decode_study_items: страница', db.decode_study_items, lambda: ((raw_page,), {}), calls),
+        ('ids_param', db.ids_param,
+         lambda: (([random_id() for _ in range(db.PAGE_SIZE)],), {}), calls),
+        ('count_study_items', uncached(db.count_study_items), no_args, calls),
+        ('count_study_items: статус', uncached(db.count_study_items),
+         lambda: ((), {'status': rnd.choice(statuses)}), calls),
+        ('count_study_items: до строки', uncached(db.count_study_items),
+         lambda: ((), {'before': sort_key()}), calls),
+        ('get_study_items_by_ids', db.get_study_items_by_ids,
+         lambda: (([random_id() for _ in range(db.PAGE_SIZE)],), {}), calls),
+        ('get_study_items_page', db.get_study_items_page, no_args, calls),
+        ('get_study_items_page: после строки', db.get_study_items_page,
+         lambda: ((), {'after': sort_key()}), calls),
+        ('get_study_items_page: до строки', db.get_study_items_page,
+         lambda: ((), {'before': sort_key()}), calls),
+        ('get_study_items_page: категория', db.get_study_items_page,
+         lambda: ((), {'category_id': rnd.choice(category_ids)}), calls),
+        ('get_study_items_page: тег', db.get_study_items_page,
+         lambda: ((), {'tag_id': rnd.choice(tag_ids)}), calls),
+        ('get_study_item_by_id', db.get_study_item_by_id, lambda: ((random_id(),), {}), calls),
+        ('add_study_item', add_item, lambda: ((item_data(),), {}), calls),
+        ('update_study_item', db.update_study_item,
+         lambda: ((random_id(), item_data()), {}), calls),
+        ('patch_study_items', db.patch_study_items,
+         lambda: (([random_id()],), {'priority': rnd.randint(1, 5)}), calls),
+        ('patch_study_items: 1000 материалов', db.patch_study_items,
+         lambda: (([random_id() for _ in range(1000)],), {'status': rnd.choice(statuses)}),
+         HEAVY_CALLS),
+        ('delete_study_items: 100 материалов', db.delete_study_items, item_batch, HEAVY_CALLS),
+        ('get_study_item_ids', db.get_study_item_ids,
+         lambda: ((), {'status': rnd.choice(statuses)}), HEAVY_CALLS),
+        ('set_item_tags', db.set_item_tags,
+         lambda: ((random_id(), rnd.sample(tag_ids, rnd.randint(0, 4))), {}), calls),
+        ('add_tag_to_items: 5000 материалов', db.add_tag_to_items,
+         lambda: ((rnd.choice(tag_ids), [random_id() for _ in range(5000)]), {}), HEAVY_CALLS),
+        ('remove_tag_from_items: категория', db.remove_tag_from_items,
+         lambda: ((rnd.choice(tag_ids),), {'category_id': rnd.choice(category_ids)}),
+         HEAVY_CALLS),
+        ('delete_study_item', db.delete_study_item,
+         lambda: ((created_items.pop(),), {}), calls),
+        ('get_all_categories', db.get_all_categories, no_args, calls),
+        ('get_category', db.get_category, lambda: ((rnd.choice(category_ids),), {}), calls),
+        ('get_category_id', db.get_category_id,
+         lambda: ((rnd.choice(category_names),), {}), calls),
+        ('get_default_category', db.get_default_category, no_args, calls),
+        ('add_category', add_category, lambda: ((f"Замер {next(unique)}",), {}), calls),
+        ('update_category', db.update_category,
+         lambda: ((created_categories[-1], f"Замер {next(unique)}", "", "#654321", 0), {}),
+         calls),
+        ('delete_category', db.delete_category,
+         lambda: ((created_categories.pop(),), {}), calls),
+        ('get_all_tags', db.get_all_tags, no_args, calls),
+        ('get_tag', db.get_tag, lambda: ((rnd.choice(tag_ids),), {}), calls),
+        ('get_tag_id', db.get_tag_id, lambda: ((rnd.choice(tag_names),), {}), calls),
+        ('invalidate_reference_cache', db.invalidate_reference_cache, no_args, calls),
+        ('invalidate_reference_cache: перечитывание', reload_references, no_args, calls),
+        ('add_tag', add_tag, lambda: ((f"замер-{next(unique)}",), {}), calls),
+        ('update_tag', db.update_tag,
+         lambda: ((created_tags[-1], f"замер-{next(unique)}", "#654321"), {}), calls),
+        ('delete_tag', db.delete_tag, lambda: ((created_tags.pop(),), {}), calls),
+        ('add_study_session', add_session,
+         lambda: ((random_id(), rnd.randint(5, 120)), {}), calls),
+        ('update_study_session', db.update_study_session,
+         lambda: ((rnd.choice(created_sessions), rnd.randint(5, 120),
+                   today.isoformat()), {}), calls),
+        ('delete_study_session', db.delete_study_session,
+         lambda: ((created_sessions.pop(),), {}), calls),
+        ('get_item_sessions', db.get_item_sessions, lambda: ((random_id(),), {}), calls),
+        ('get_item_daily_minutes', db.get_item_daily_minutes,
+         lambda: ((random_id(),), {'date_from': '2023-01-01'}), calls),
+        ('rollup_bucket', db.rollup_bucket,
+         lambda: ((today, rnd.choice(db.ROLLUP_PERIODS)), {}), calls),
+        ('rollup_buckets', db.rollup_buckets,
+         lambda: (('week', 26, today), {}), calls),
+        ('get_rollup_series', uncached(db.get_rollup_series),
+         lambda: (('week', 'category', db.rollup_buckets('week', 26, today)[0]), {}), calls),
+        ('get_rollup_series: по дням', uncached(db.get_rollup_series),
+         lambda: (('day', 'category', db.rollup_buckets('day', 30, today)[0]), {}), calls),
+        ('rebuild_rollups', db.rebuild_rollups, no_args, HEAVY_CALLS),
+        ('build_fts_query', db.build_fts_query, lambda: ((query(),), {}), calls),
+        ('build_search_query', db.build_search_query, lambda: ((query(),), {}), calls),
+        ('search_study_items', uncached(db.search_study_items), lambda: ((query(),), {}), calls),
+        ('search_study_items: фрагменты', uncached(db.search_study_items),
+         lambda: ((query(),), {'snippets': True}), calls),
+        ('search_study_items: фильтры', uncached(db.search_study_items),
+         lambda: ((None,), {'status': rnd.choice(statuses),
+                            'category_id': rnd.choice(category_ids)}), HEAVY_CALLS),
+        ('fold_text', db.fold_text, lambda: ((_text_sample(rnd),), {}), calls),
+        ('search_terms', db.search_terms, lambda: ((query(),), {}), calls),
+        ('search_study_item_ids', uncached(db.search_study_item_ids), lambda: ((query(),), {}), calls),
+        ('get_search_snippet', db.get_search_snippet,
+         lambda: ((query(), random_id()), {}), calls),
+        ('get_upcoming_deadlines', db.get_upcoming_deadlines,
+         lambda: ((today.isoformat(), (today + datetime.timedelta(days=14)).isoformat()), {}),
+         calls),
+        ('get_statistics', uncached(db.get_statistics), no_args, calls),
+        ('get_statistics: из кэша', db.get_statistics, no_args, calls),
+        ('get_all_study_items: из кэша', db.get_all_study_items, no_args, calls),
+        ('get_query_cache_stats', db.get_query_cache_stats, no_args, calls),
+        ('clear_query_cache', db.clear_query_cache, no_args, calls),
+        ('rebuild_statistics', db.rebuild_statistics, no_args, HEAVY_CALLS),
+        ('format_item: страница', format_page, lambda: ((page,), {}), calls),
+        ('SearchCache: уточнение запроса', lambda cache, word: cache.lookup(word),
+         refine_args, calls),
+    ]
+
+
+def run_cases(cases):
+    results = {}
+    for name, func, make_args, calls in cases:
+        timings = []
+        for _ in range(calls):
+            args, kwargs = make_args()
+            # Служебный вывод функций (init_database и т.п.) не мешает отчёту
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                func(*args, **kwargs)
+                timings.append((time.perf_counter() - start) * 1000)
+        results[name] = summarize(timings)
+        print(f"{name:<40}{results[name]['p50_ms']:>10.3f}{results[name]['p95_ms']:>10.3f}"
+              f"{results[name]['p99_ms']:>10.3f}")
+    return results
+
+
+def uncovered(cases):
+    """Публичные функции database.py без сценария замера"""
+    timed = {name.split(':')[0] for name, *_ in cases}
+    return sorted(
+        name for name, obj in vars(db).items()
+        if inspect.isfunction(obj) and obj.__module__ == db.__name__
+        and not name.startswith('_') and name not in timed and name not in SKIPPED
+    )
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, results):
+    """Сравнение с прошлым прогоном; возвращает число регрессий"""
+    regressions = 0
+    print(f"\n{'':<40}{'p50 было':>10}{'стало':>10}{'p95 было':>10}{'стало':>10}")
+    for name, new in results.items():
+        old = baseline['results'].get(name)
+        if old is None:
+            continue
+        worse = any(new[key] > old[key] * REGRESSION_RATIO and new[key] - old[key] > 0.05
+                    for key in ('p50_ms', 'p95_ms'))
+        regressions += worse
+        print(f"{name:<40}{old['p50_ms']:>10.3f}{new['p50_ms']:>10.3f}"
+              f"{old['p95_ms']:>10.3f}{new['p95_ms']:>10.3f}{'  <-- медленнее' if worse else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=dataset.SCALES, default='small')
+    parser.add_argument('--items', type=int, help="переопределить число материалов")
+    parser.add_argument('--db', help="готовая база вместо генерации (будет изменена)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--calls', type=int, default=CALLS)
+    parser.add_argument('--out', help="файл результата, по умолчанию bench-<масштаб>.json")
+    parser.add_argument('--baseline', help="результат прошлой версии для сравнения")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.db:
+            db.use_database(args.db)
+        else:
+            print(f"Генерация базы масштаба {args.scale}...")
+            dataset.generate(os.path.join(tmp, 'bench.db'), args.scale, args.items, args.seed)
+
+        with db.reader() as conn:
+            items = conn.execute("SELECT COUNT(*) FROM study_items").fetchone()[0]
+
+        cases = build_cases(random.Random(args.seed), args.calls)
+        print(f"{'':<40}{'p50, мс':>10}{'p95':>10}{'p99':>10}")
+        results = run_cases(cases)
+        db.close_connections()
+
+    report = {
+        'meta': {
+            'scale': None if args.db else args.scale,
+            'items': items,
+            'seed': args.seed,
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        },
+        'results': results,
+        'skipped': SKIPPED,
+        'uncovered': uncovered(cases),
+    }
+    out = args.out or f"bench-{args.scale}.json"
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультат: {out}")
+    if report['uncovered']:
+        print(f"Без замера: {', '.join(report['uncovered'])}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            if compare(json.load(f), results):
+                return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
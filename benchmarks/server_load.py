@@ -0,0 +1,231 @@
+"""Нагрузочный тест server.py: запросов в секунду и хвост задержек
+
+Клиенты — корутины asyncio, каждая держит своё keep-alive соединение и
+выбирает сценарий по весам --mix:
+    page        следующая страница /items по курсору, по кругу
+    item        GET /items/<случайный id>
+    stats       GET /stats без кэша
+    revalidate  GET /stats с If-None-Match (обычно 304)
+    write       PATCH /items/<id> с новым приоритетом
+
+С --db сервис запускается отдельным процессом на свободном порту,
+иначе нагрузка идёт на уже запущенный по --url.
+
+Запуск из корня проекта:
+    python -m benchmarks.server_load --db bench.db --clients 16 --duration 10
+    python -m benchmarks.server_load --url http://127.0.0.1:8765 --mix page=1,write=1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_MIX = 'page=4,item=4,stats=1,revalidate=4,write=1'
+PAGE_LIMIT = 50
+
+
+class Connection:
+    """Минимальный HTTP/1.1-клиент поверх одного keep-alive соединения"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None, headers=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = b'' if body is None else json.dumps(body).encode()
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}",
+                 f"Content-Length: {len(data)}"]
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + data)
+
+        status = int((await self.reader.readline()).split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        length = int(response_headers.get('content-length', 0))
+        payload = await self.reader.readexactly(length) if length else b''
+        if response_headers.get('connection') == 'close':
+            self.close()
+        return status, response_headers, json.loads(payload) if payload else None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+class Client:
+    """Состояние одного клиента: курсор листания и последний ETag"""
+
+    def __init__(self, connection, item_ids, rnd):
+        self.connection = connection
+        self.item_ids = item_ids
+        self.rnd = rnd
+        self.cursor = None
+        self.etag = None
+
+    async def page(self):
+        path = f"/items?limit={PAGE_LIMIT}" + (f"&cursor={self.cursor}" if self.cursor else "")
+        status, _, payload = await self.connection.request('GET', path)
+        if status == 200:
+            self.cursor = payload['next']
+        return status
+
+    async def item(self):
+        status, _, _ = await self.connection.request(
+            'GET', f"/items/{self.rnd.choice(self.item_ids)}")
+        return status
+
+    async def stats(self):
+        status, _, _ = await self.connection.request('GET', "/stats")
+        return status
+
+    async def revalidate(self):
+        headers = {'If-None-Match': self.etag} if self.etag else None
+        status, response_headers, _ = await self.connection.request('GET', "/stats", headers=headers)
+        self.etag = response_headers.get('etag', self.etag)
+        return status
+
+    async def write(self):
+        status, _, _ = await self.connection.request(
+            'PATCH', f"/items/{self.rnd.choice(self.item_ids)}",
+            body={'priority': self.rnd.randint(1, 5)})
+        return status
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if not hasattr(Client, name):
+            raise SystemExit(f"неизвестный сценарий: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def run_client(client, mix, deadline, results):
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        name = client.rnd.choices(names, weights)[0]
+        start = time.perf_counter()
+        try:
+            status = await getattr(client, name)()
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            client.connection.close()
+            status = None
+        results.setdefault(name, []).append((time.perf_counter() - start, status))
+    client.connection.close()
+
+
+async def sample_ids(host, port, count):
+    connection = Connection(host, port)
+    status, _, payload = await connection.request('GET', f"/items?limit={count}")
+    connection.close()
+    if status != 200 or not payload['items']:
+        raise SystemExit("в базе нет материалов для нагрузки")
+    return [item['id'] for item in payload['items']]
+
+
+async def load(host, port, clients, duration, mix, seed):
+    item_ids = await sample_ids(host, port, 500)
+    results = {}
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        run_client(Client(Connection(host, port), item_ids, random.Random(seed + n)),
+                   mix, deadline, results)
+        for n in range(clients)
+    ))
+    return results, time.perf_counter() - start
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(results, elapsed):
+    report = {}
+    for name, samples in sorted(results.items()) + [('всего', sum(results.values(), []))]:
+        ordered = sorted(elapsed_s * 1000 for elapsed_s, _ in samples)
+        statuses = {}
+        for _, status in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        report[name] = {
+            'requests': len(samples),
+            'rps': round(len(samples) / elapsed, 1),
+            'p50_ms': round(percentile(ordered, 0.5), 2),
+            'p95_ms': round(percentile(ordered, 0.95), 2),
+            'p99_ms': round(percentile(ordered, 0.99), 2),
+            'max_ms': round(ordered[-1], 2),
+            'statuses': statuses,
+        }
+    return report
+
+
+def start_server(db_path):
+    """server.py отдельным процессом на свободном порту; возвращает (процесс, порт)"""
+    process = subprocess.Popen(
+        [sys.executable, 'server.py', '--db', db_path, '--port', '0'],
+        stdout=subprocess.PIPE, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    line = process.stdout.readline()
+    if not line:
+        raise SystemExit("сервис не запустился")
+    return process, int(line.rsplit(':', 1)[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8765')
+    parser.add_argument('--db', help="запустить server.py на этой базе")
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10, help="секунд нагрузки")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="сценарий=вес через запятую")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help="сохранить результат в JSON")
+    args = parser.parse_args()
+
+    process = None
+    if args.db:
+        process, port = start_server(args.db)
+        host = '127.0.0.1'
+    else:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+
+    try:
+        results, elapsed = asyncio.run(
+            load(host, port, args.clients, args.duration, parse_mix(args.mix), args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    report = summarize(results, elapsed)
+    print(f"{'сценарий':<12}{'запросов':>9}{'в сек':>9}{'p50, мс':>9}{'p95, мс':>9}"
+          f"{'p99, мс':>9}{'макс, мс':>10}  коды")
+    for name, row in report.items():
+        codes = ', '.join(f"{code}: {count}" for code, count in row['statuses'].items())
+        print(f"{name:<12}{row['requests']:>9}{row['rps']:>9}{row['p50_ms']:>9}{row['p95_ms']:>9}"
+              f"{row['p99_ms']:>9}{row['max_ms']:>10}  {codes}")
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'clients': args.clients, 'duration': elapsed, 'mix': args.mix,
+                       'results': report}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Нагрузка записью из нескольких процессов и потоков одновременно
+
+Каждый процесс открывает базу своим менеджером соединений и запускает
+--threads потоков; поток выполняет --ops коротких записей (приоритет
+материала или новая сессия). В режиме queue записи идут через очередь
+потока-писателя (database.write) и фиксируются группами, в режиме
+direct каждая запись — своя транзакция.
+
+Итог по процессам: выполнено, ошибок, задержки, число транзакций и
+повторов BEGIN при занятой базе. Ненулевой код выхода, если были ошибки.
+--busy-timeout 0 --retries 0 показывает поведение без ожидания блокировки.
+
+База изменяется (добавляются сессии), поэтому --db — копия рабочей
+базы; без --db нагрузка идёт на временную базу с тестовыми данными:
+    python -m benchmarks.write_stress --db bench.db --processes 4 --threads 4 --ops 200
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+import database as db
+
+SAMPLE_SIZE = 1000
+
+
+def run_thread(mode, item_ids, ops, seed, results):
+    rnd = random.Random(seed)
+    latencies, errors = [], {}
+    for _ in range(ops):
+        item_id = rnd.choice(item_ids)
+        if rnd.random() < 0.5:
+            func, args, kwargs = db.patch_study_items, ([item_id],), {'priority': rnd.randint(1, 5)}
+        else:
+            func, args, kwargs = db.add_study_session, (item_id, rnd.randint(5, 60)), {}
+        start = time.perf_counter()
+        try:
+            if mode == 'queue':
+                db.write(func, *args, **kwargs)
+            else:
+                func(*args, **kwargs)
+        except db.sqlite3.Error as e:
+            errors[str(e)] = errors.get(str(e), 0) + 1
+        latencies.append((time.perf_counter() - start) * 1000)
+    results.append((latencies, errors))
+
+
+def run_process(params):
+    """Один процесс-писатель; возвращает сводку для печати"""
+    number, args, start_at = params
+    db.BUSY_TIMEOUT = args.busy_timeout
+    db.WRITE_RETRIES = args.retries
+    db.use_database(args.db)
+    with db.reader() as conn:
+        item_ids = [row[0] for row in conn.execute(
+            "SELECT id FROM study_items ORDER BY random() LIMIT ?", (SAMPLE_SIZE,))]
+
+    results = []
+    threads = [
+        threading.Thread(target=run_thread,
+                         args=(args.mode, item_ids, args.ops, number * 1000 + n, results))
+        for n in range(args.threads)
+    ]
+    time.sleep(max(0.0, start_at - time.time()))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for thread_latencies, _ in results for latency in thread_latencies)
+    errors = {}
+    for _, thread_errors in results:
+        for message, count in thread_errors.items():
+            errors[message] = errors.get(message, 0) + count
+    stats = db.get_write_stats()
+    db.close_connections()
+    return {
+        'process': number,
+        'done': len(latencies) - sum(errors.values()),
+        'errors': errors,
+        'elapsed': elapsed,
+        'p50_ms': latencies[len(latencies) // 2],
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        'stats': stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', help="база для нагрузки, по умолчанию временная")
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4, help="потоков-писателей в процессе")
+    parser.add_argument('--ops', type=int, default=200, help="записей на поток")
+    parser.add_argument('--mode', choices=('queue', 'direct'), default='queue')
+    parser.add_argument('--busy-timeout', type=float, default=db.BUSY_TIMEOUT)
+    parser.add_argument('--retries', type=int, default=db.WRITE_RETRIES)
+    args = parser.parse_args()
+
+    tmp = None
+    if args.db is None:
+        tmp = tempfile.mkdtemp(prefix='write_stress_')
+        args.db = os.path.join(tmp, 'bench.db')
+    # Схема создаётся до старта писателей, соединения родителя им не передаются
+    db.use_database(args.db)
+    db.init_database()
+    db.close_connections()
+
+    # Процессы стартуют одновременно, после открытия базы всеми
+    start_at = time.time() + 1.0
+    try:
+        with multiprocessing.Pool(args.processes) as pool:
+            reports = pool.map(run_process, [(n, args, start_at) for n in range(args.processes)])
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"{'процесс':<9}{'готово':>8}{'ошибок':>8}{'в сек':>8}{'p50, мс':>9}{'p99, мс':>9}"
+          f"{'транз.':>8}{'групп':>7}{'повторов':>10}")
+    total_done = total_errors = 0
+    for report in reports:
+        stats = report['stats']
+        errors = sum(report['errors'].values())
+        total_done += report['done']
+        total_errors += errors
+        print(f"{report['process']:<9}{report['done']:>8}{errors:>8}"
+              f"{report['done'] / report['elapsed']:>8.0f}{report['p50_ms']:>9.2f}"
+              f"{report['p99_ms']:>9.2f}{stats['transactions']:>8}{stats['groups']:>7}"
+              f"{stats['busy_retries']:>10}")
+        for message, count in report['errors'].items():
+            print(f"    {count} x {message}")
+
+    elapsed = max(report['elapsed'] for report in reports)
+    print(f"\nВсего: {total_done} записей за {elapsed:.2f} с ({total_done / elapsed:.0f}/с), "
+          f"ошибок: {total_errors}")
+    return 1 if total_errors else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
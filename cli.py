@@ -0,0 +1,423 @@
+"""Командная строка без GUI: выборки, массовые изменения, статистика, импорт и экспорт
+
+Модуль не импортирует tkinter и пакет gui, поэтому запуск занимает
+десятки миллисекунд и подходит для вызова из циклов в скриптах.
+В stdout пишутся только данные: JSON Lines (по объекту на строку) или
+таблица; служебные сообщения идут в stderr.
+
+update без --set читает изменения из stdin, по объекту JSON на строку,
+и применяет их одной транзакцией: ошибка в любой строке откатывает все.
+    {"id": 5, "status": "completed"}
+    {"ids": [1, 2, 3], "priority": 2, "category": "Математика"}
+    {"id": 7, "tags": ["Python", "Экзамен"]}
+    {"id": 9, "delete": true}
+
+Запуск из корня проекта:
+    python cli.py query --status planned --format table
+    python cli.py query --search "python" --limit 20
+    python cli.py update --status planned --set status=on_hold
+    python cli.py update < changes.jsonl
+    python cli.py stats
+    python cli.py import items.csv
+    python cli.py export backup.jsonl.gz
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import sqlite3
+import sys
+
+import database as db
+
+# Строк за одно обращение к базе при потоковой выдаче
+QUERY_PAGE = 1000
+# Ширина столбца таблицы, длинные значения обрезаются
+MAX_COLUMN_WIDTH = 40
+
+ITEM_OUTPUT_FIELDS = ('id', 'title', 'description', 'category_id', 'category_name', 'rating',
+                      'status', 'created_at', 'deadline', 'hours_spent', 'priority', 'tags')
+TABLE_FIELDS = ('id', 'title', 'category_name', 'status', 'deadline', 'hours_spent', 'priority')
+
+
+class CliError(Exception):
+    """Ошибка в аргументах или во входных данных"""
+
+
+def iter_items(status=None, category_id=None, tag_id=None, search=None, page_size=QUERY_PAGE):
+    """Материалы под фильтрами пачками по page_size, без загрузки всего списка"""
+    if search:
+        # Результаты поиска в порядке релевантности, строки дочитываются по id
+        item_ids = [row[0] for row in db.search_study_item_ids(search, status, category_id, tag_id)]
+        for start in range(0, len(item_ids), page_size):
+            page = item_ids[start:start + page_size]
+            rows = db.get_study_items_by_ids(page)
+            yield from (rows[item_id] for item_id in page if item_id in rows)
+        return
+
+    after = None
+    while True:
+        page = db.get_study_items_page(after=after, limit=page_size, status=status,
+                                       category_id=category_id, tag_id=tag_id)
+        yield from page
+        if len(page) < page_size:
+            return
+        after = db.item_sort_key(page[-1])
+
+
+class Output:
+    """Построчная выдача в JSON Lines или таблицу
+
+    Ширина столбцов таблицы берётся по первой пачке строк, чтобы не
+    держать в памяти всю выборку.
+    """
+
+    def __init__(self, fmt, fields, stream=None):
+        self.fmt = fmt
+        self.fields = fields
+        self.stream = stream or sys.stdout
+        self.widths = None
+        self.pending = []
+
+    def write(self, record):
+        if self.fmt == 'jsonl':
+            self.stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+            return
+        self.pending.append(record)
+        if self.widths is None and len(self.pending) >= QUERY_PAGE:
+            self._flush()
+
+    def close(self):
+        if self.fmt == 'table':
+            self._flush()
+        self.stream.flush()
+
+    def _flush(self):
+        if self.widths is None:
+            self.widths = [
+                min(MAX_COLUMN_WIDTH, max([len(field)] + [len(_cell(r.get(field))) for r in self.pending]))
+                for field in self.fields
+            ]
+            self._line(self.fields)
+            self._line(['-' * width for width in self.widths])
+        for record in self.pending:
+            self._line([_cell(record.get(field)) for field in self.fields])
+        self.pending = []
+
+    def _line(self, cells):
+        parts = []
+        for cell, width in zip(cells, self.widths):
+            if len(cell) > width:
+                cell = cell[:width - 1] + '…'
+            parts.append(cell.ljust(width))
+        self.stream.write('  '.join(parts).rstrip() + '\n')
+
+
+def _cell(value):
+    return '' if value is None else str(value)
+
+
+def _category_id(name):
+    if name is None:
+        return None
+    category_id = db.get_category_id(name)
+    if category_id is None:
+        raise CliError(f"нет категории «{name}»")
+    return category_id
+
+
+def _tag_id(name):
+    if name is None:
+        return None
+    tag_id = db.get_tag_id(name)
+    if tag_id is None:
+        raise CliError(f"нет тега «{name}»")
+    return tag_id
+
+
+def _filters(args):
+    return {
+        'status': args.status,
+        'category_id': _category_id(args.category),
+        'tag_id': _tag_id(args.tag),
+    }
+
+
+def cmd_query(args):
+    fields = args.fields.split(',') if args.fields else (
+        ITEM_OUTPUT_FIELDS if args.format == 'jsonl' else TABLE_FIELDS)
+    unknown = set(fields) - set(db.ITEM_FIELDS)
+    if unknown:
+        raise CliError(f"неизвестные поля: {', '.join(sorted(unknown))}")
+
+    # С --limit не читаем больше строк, чем будет выведено
+    page_size = min(QUERY_PAGE, args.limit) if args.limit else QUERY_PAGE
+    items = iter_items(search=args.search, page_size=page_size, **_filters(args))
+    output = Output(args.format, fields)
+    for item in itertools.islice(items, args.limit):
+        output.write({field: getattr(item, field) for field in fields})
+    output.close()
+
+
+def _parse_value(text):
+    """Значение из --set: число, null/true/false или строка как есть"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def check_item_fields(fields):
+    """Проверка значений полей материала до записи
+
+    Повторяет ограничения CHECK таблицы study_items, чтобы неверное
+    значение давало понятную ошибку, а не IntegrityError из SQLite.
+    """
+    for field in ('rating', 'priority'):
+        value = fields.get(field)
+        if value is not None and not (_is_id(value) and 1 <= value <= 5):
+            raise CliError(f"{field}: ожидается целое число от 1 до 5")
+    if 'status' in fields and fields['status'] not in db.STATUS_RANKS:
+        raise CliError(f"status: одно из {', '.join(db.STATUS_RANKS)}")
+    if 'title' in fields and not (isinstance(fields['title'], str) and fields['title'].strip()):
+        raise CliError("title: ожидается непустая строка")
+    hours = fields.get('hours_spent')
+    if hours is not None and (isinstance(hours, bool) or not isinstance(hours, (int, float))
+                              or hours < 0):
+        raise CliError("hours_spent: ожидается неотрицательное число")
+    for field in ('description', 'deadline'):
+        if not isinstance(fields.get(field), (str, type(None))):
+            raise CliError(f"{field}: ожидается строка")
+    if not (fields.get('category_id') is None or _is_id(fields['category_id'])):
+        raise CliError("category_id: ожидается целое число")
+
+
+def _change_fields(change):
+    """Поля patch_study_items из объекта изменения (category - по имени)"""
+    fields = {key: value for key, value in change.items()
+              if key not in ('id', 'ids', 'tags', 'delete', 'category')}
+    unknown = set(fields) - db.PATCHABLE_COLUMNS
+    if unknown:
+        raise CliError(f"неизвестные поля: {', '.join(sorted(unknown))}")
+    check_item_fields(fields)
+    if 'category' in change:
+        fields['category_id'] = _category_id(change['category'])
+    return fields
+
+
+def _change_ids(change):
+    """id материалов изменения: поле ids (список чисел) или id (число)"""
+    if 'ids' in change:
+        item_ids = change['ids']
+        if not isinstance(item_ids, list) or not all(_is_id(item_id) for item_id in item_ids):
+            raise CliError("ids: ожидается список целых чисел")
+        return item_ids
+    if 'id' in change:
+        if not _is_id(change['id']):
+            raise CliError("id: ожидается целое число")
+        return [change['id']]
+    return None
+
+
+def _change_tags(change):
+    """Имена тегов изменения или None, если теги не меняются"""
+    tags = change.get('tags')
+    if tags is not None and (not isinstance(tags, list)
+                             or not all(isinstance(name, str) for name in tags)):
+        raise CliError("tags: ожидается список строк")
+    return tags
+
+
+def apply_changes(changes):
+    """Применение изменений одной транзакцией; возвращает счётчики
+
+    Изменения выполняются операцией очереди записи (db.write), как и
+    остальные записи процесса. Идущие подряд изменения с одинаковыми
+    полями сливаются в один patch_study_items на все их id.
+    """
+    return db.write(_apply_changes, changes)
+
+
+def _apply_changes(changes):
+    report = {'changes': 0, 'updated': 0, 'deleted': 0, 'tagged': 0}
+    with db.transaction():
+        batch_ids, batch_fields = [], None
+        for number, change in changes:
+            if not isinstance(change, dict):
+                raise CliError(f"строка {number}: ожидается объект JSON")
+            try:
+                item_ids = _change_ids(change)
+                tag_names = _change_tags(change)
+                fields = _change_fields(change)
+            except CliError as e:
+                raise CliError(f"строка {number}: {e}")
+            if not item_ids:
+                raise CliError(f"строка {number}: нет id или ids")
+            report['changes'] += 1
+
+            if fields != batch_fields and batch_ids:
+                report['updated'] += db.patch_study_items(batch_ids, **batch_fields)
+                batch_ids = []
+            batch_fields = fields
+            if fields:
+                batch_ids.extend(item_ids)
+
+            if tag_names is not None:
+                try:
+                    tag_ids = [_tag_id(name) for name in tag_names]
+                except CliError as e:
+                    raise CliError(f"строка {number}: {e}")
+                for item_id in item_ids:
+                    added, removed = db.set_item_tags(item_id, tag_ids)
+                    report['tagged'] += bool(added or removed)
+            if change.get('delete'):
+                # Удаление после накопленных изменений полей, чтобы сохранить порядок
+                if batch_ids:
+                    report['updated'] += db.patch_study_items(batch_ids, **batch_fields)
+                    batch_ids = []
+                report['deleted'] += db.delete_study_items(item_ids)
+
+        if batch_ids:
+            report['updated'] += db.patch_study_items(batch_ids, **batch_fields)
+    return report
+
+
+def _read_changes(stream):
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as e:
+            raise CliError(f"строка {number}: {e}")
+
+
+def cmd_update(args):
+    if args.set:
+        # Одно изменение для всех материалов под фильтрами
+        change = {}
+        for assignment in args.set:
+            field, sep, value = assignment.partition('=')
+            if not sep:
+                raise CliError(f"--set ожидает поле=значение: {assignment}")
+            change[field] = _parse_value(value)
+        change['ids'] = db.get_study_item_ids(**_filters(args))
+        changes = [(0, change)] if change['ids'] else []
+    else:
+        # В JSON Lines id перечислены явно, фильтры им не применить
+        if args.status or args.category or args.tag:
+            raise CliError("--status, --category и --tag работают только вместе с --set")
+        changes = _read_changes(sys.stdin)
+    _print_report(apply_changes(changes), args.format)
+
+
+def cmd_stats(args):
+    _print_report(db.get_statistics(), args.format)
+
+
+def cmd_import(args):
+    import importer
+    report = importer.import_file(args.path, defer=args.defer, progress=_progress("Импортировано"))
+    print(file=sys.stderr)
+    _print_report(report, args.format)
+
+
+def cmd_export(args):
+    import exporter
+    report = exporter.export_file(args.path, progress=_progress("Выгружено"))
+    print(file=sys.stderr)
+    _print_report(report, args.format)
+
+
+def _progress(label):
+    def report(count, fraction):
+        print(f"\r{label}: {count} ({fraction:.0%})", end='', file=sys.stderr, flush=True)
+    return report
+
+
+def _print_report(report, fmt):
+    if fmt == 'jsonl':
+        print(json.dumps(report, ensure_ascii=False))
+        return
+    for key, value in report.items():
+        if isinstance(value, dict):
+            value = ', '.join(f"{k}: {v}" for k, v in value.items())
+        elif isinstance(value, list):
+            value = '; '.join(map(str, value))
+        print(f"{key:<16}{value}")
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--db', default=db.DB_NAME, help="файл базы данных")
+    common.add_argument('--format', choices=('jsonl', 'table'), default='jsonl',
+                        help="вывод: JSON Lines или таблица")
+
+    filters = argparse.ArgumentParser(add_help=False)
+    filters.add_argument('--status', choices=list(db.STATUS_RANKS))
+    filters.add_argument('--category', help="название категории")
+    filters.add_argument('--tag', help="название тега")
+
+    # Общие параметры задаются после команды: у подкоманды свои значения
+    # по умолчанию, они перекрыли бы указанные до неё
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    query = commands.add_parser('query', parents=[common, filters], help="выборка материалов")
+    query.add_argument('--search', help="текстовый поиск")
+    query.add_argument('--fields', help="поля через запятую")
+    query.add_argument('--limit', type=int, help="не больше N строк")
+    query.set_defaults(func=cmd_query)
+
+    update = commands.add_parser('update', parents=[common, filters],
+                                 help="изменение материалов: --set или JSON Lines из stdin")
+    update.add_argument('--set', action='append', metavar='ПОЛЕ=ЗНАЧЕНИЕ',
+                        help="изменить всем материалам под фильтрами")
+    update.set_defaults(func=cmd_update)
+
+    stats = commands.add_parser('stats', parents=[common], help="сводная статистика")
+    stats.set_defaults(func=cmd_stats)
+
+    import_ = commands.add_parser('import', parents=[common], help="импорт CSV или JSON Lines")
+    import_.add_argument('path', help="файл .csv или .jsonl, можно сжатый .gz")
+    import_.add_argument('--defer', action='store_true', default=None,
+                         help="отложить индексы и триггеры до конца загрузки")
+    import_.set_defaults(func=cmd_import)
+
+    export = commands.add_parser('export', parents=[common], help="экспорт в файл")
+    export.add_argument('path', help="файл .csv, .jsonl или .db, можно сжатый .gz")
+    export.set_defaults(func=cmd_export)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    db.use_database(args.db)
+    # Сообщение init_database не должно попадать в данные на stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.init_database()
+
+    try:
+        args.func(args)
+    except BrokenPipeError:
+        # Читатель закрыл канал (например, head): остаток выдачи не нужен,
+        # а stdout подменяется, чтобы сброс буфера при выходе не упал
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except (CliError, OSError, ValueError, sqlite3.Error) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close_connections()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
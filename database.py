@@ -1,18 +1,673 @@
+import atexit
+import datetime
+import functools
+import itertools
+import json
+import queue
+import random
+import re
 import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
 
 DB_NAME = "study_tracker.db"
 
+# Размер пула читающих соединений
+READER_POOL_SIZE = 4
+
+# Сколько одна попытка записи ждёт блокировку, занятую другим процессом, с
+BUSY_TIMEOUT = 2.0
+# Повторов BEGIN IMMEDIATE после истечения BUSY_TIMEOUT и базовая пауза
+# перед повтором, с (удваивается с каждой попыткой)
+WRITE_RETRIES = 5
+RETRY_DELAY = 0.05
+# Наибольшее число операций очереди записи в одной транзакции
+GROUP_COMMIT_SIZE = 64
+
+# Кэш результатов запросов: число записей и суммарно строк во всех записях
+QUERY_CACHE_SIZE = 64
+QUERY_CACHE_ROWS = 200000
+
+# Настройки, применяемые один раз к каждому соединению
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA cache_size = -16000",
+)
+
+# Порядок статусов в списке материалов
+STATUS_RANKS = {
+    'in_progress': 1,
+    'planned': 2,
+    'on_hold': 3,
+    'completed': 4,
+}
+
+# Статусы, у которых дедлайн в силе: завершённые и отложенные не просрочиваются
+ACTIVE_STATUSES = ('planned', 'in_progress')
+
+STATUS_RANK_SQL = "CASE status " + " ".join(
+    f"WHEN '{status}' THEN {rank}" for status, rank in STATUS_RANKS.items()
+) + " END"
+
+# Размер страницы при постраничной загрузке списка
+PAGE_SIZE = 100
+
+# Столбцы study_items в порядке объявления таблицы
+ITEM_COLUMNS = (
+    'id', 'title', 'description', 'category_id', 'rating', 'status',
+    'created_at', 'deadline', 'hours_spent', 'priority',
+)
+
+# Столбцы, которые можно менять через patch_study_items
+PATCHABLE_COLUMNS = frozenset(ITEM_COLUMNS) - {'id', 'created_at'}
+
+# Строка списка: столбцы материала, категория и теги через запятую
+ITEM_LIST_COLUMNS = f"""
+        {', '.join('si.' + column for column in ITEM_COLUMNS)},
+        c.name as category_name,
+        c.color as category_color,
+        (SELECT GROUP_CONCAT(t.name, ', ')
+         FROM study_item_tags sit
+         JOIN tags t ON sit.tag_id = t.id
+         WHERE sit.study_item_id = si.id) as tags"""
+
+ITEM_LIST_FROM = """
+    FROM study_items si
+    LEFT JOIN categories c ON si.category_id = c.id
+"""
+
+ITEM_LIST_SELECT = "\n    SELECT" + ITEM_LIST_COLUMNS + ITEM_LIST_FROM
+
+# Сортировка списка: статус, дедлайн (без дедлайна — первыми), id
+ITEM_LIST_ORDER = " ORDER BY si.status_rank, si.deadline_key, si.id"
+
+# Поля StudyItem: столбцы материала, затем ITEM_LIST_COLUMNS и фрагмент поиска
+ITEM_FIELDS = ITEM_COLUMNS + ('category_name', 'category_color', 'tags', 'snippet')
+
+
+class StudyItem:
+    """Строка материала с доступом к полям по имени
+
+    Поля идут в порядке ITEM_FIELDS, как столбцы в запросах списка;
+    столбцов, которых нет в запросе (категории и тегов у
+    get_study_item_by_id, фрагмента вне поиска), - None. __slots__ без
+    __dict__ на строку: запись занимает немногим больше кортежа.
+    """
+
+    __slots__ = ITEM_FIELDS
+
+    def __init__(self, id, title, description, category_id, rating, status,
+                 created_at, deadline, hours_spent, priority,
+                 category_name=None, category_color=None, tags=None, snippet=None):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.category_id = category_id
+        self.rating = rating
+        self.status = status
+        self.created_at = created_at
+        self.deadline = deadline
+        self.hours_spent = hours_spent
+        self.priority = priority
+        self.category_name = category_name
+        self.category_color = category_color
+        self.tags = tags
+        self.snippet = snippet
+
+    def __repr__(self):
+        return f"StudyItem(id={self.id!r}, title={self.title!r}, status={self.status!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, StudyItem):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in ITEM_FIELDS)
+
+    __hash__ = None
+
+
+def study_item_row(cursor, row):
+    """row_factory курсора: строка запроса списка -> StudyItem"""
+    return StudyItem(*row)
+
+
+def decode_study_items(rows):
+    """Пачка строк (fetchall/fetchmany) -> список StudyItem за один проход"""
+    return list(itertools.starmap(StudyItem, rows))
+
 
 def create_connection():
+    """Открытие нового соединения с базовыми настройками"""
     conn = None
     try:
-        conn = sqlite3.connect(DB_NAME)
+        conn = sqlite3.connect(DB_NAME, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
         return conn
     except sqlite3.Error as e:
         print(f"Ошибка подключения к БД: {e}")
     return conn
 
 
+class ConnectionManager:
+    """Долгоживущие соединения: один общий писатель и пул читателей"""
+
+    def __init__(self, db_name, pool_size=READER_POOL_SIZE):
+        self.db_name = db_name
+        self.pool_size = pool_size
+        self._writer = None
+        self._write_lock = threading.RLock()
+        self._pool_lock = threading.Lock()
+        self._readers = queue.LifoQueue()
+        self._all_readers = []
+        self._local = threading.local()
+        self._trace_callback = None
+        self._watcher = None
+        self._watch_lock = threading.Lock()
+        self._write_queue = None
+        # Транзакций, зафиксированных этим менеджером (см. QueryCache)
+        self.mutations = 0
+        # Счётчики записи (begin_wait_ms — время в BEGIN, включая ожидание
+        # блокировки); меняются под _write_lock
+        self.stats = {'transactions': 0, 'busy_retries': 0, 'begin_wait_ms': 0.0}
+
+    def _connect(self):
+        # isolation_level=None: транзакциями управляем явно через BEGIN
+        conn = sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT, check_same_thread=False,
+                               isolation_level=None)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        conn.set_trace_callback(self._trace_callback)
+        return conn
+
+    def set_trace_callback(self, callback):
+        """Трассировка SQL на всех соединениях менеджера (None — отключить)"""
+        self._trace_callback = callback
+        with self._pool_lock:
+            connections = list(self._all_readers)
+        if self._writer is not None:
+            connections.append(self._writer)
+        if self._watcher is not None:
+            connections.append(self._watcher)
+        for conn in connections:
+            conn.set_trace_callback(callback)
+
+    def in_transaction(self):
+        """Открыта ли транзакция записи в текущем потоке"""
+        return getattr(self._local, 'depth', 0) > 0
+
+    def _begin(self, conn):
+        """BEGIN IMMEDIATE с повторами, пока запись держит другой процесс
+
+        Каждая попытка ждёт BUSY_TIMEOUT в обработчике занятости SQLite.
+        Пауза перед повтором случайная в пределах растущего окна, чтобы
+        процессы, упёршиеся в одну блокировку, не пробовали снова разом.
+        """
+        start = time.perf_counter()
+        try:
+            for attempt in range(WRITE_RETRIES + 1):
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    return
+                except sqlite3.OperationalError as e:
+                    if not is_busy_error(e) or attempt == WRITE_RETRIES:
+                        raise
+                self.stats['busy_retries'] += 1
+                time.sleep(random.uniform(0, RETRY_DELAY * 2 ** attempt))
+        finally:
+            self.stats['begin_wait_ms'] += (time.perf_counter() - start) * 1000
+
+    @contextmanager
+    def transaction(self):
+        """Транзакция на общем соединении-писателе (допускает вложенность)"""
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            conn = self._writer
+
+            depth = getattr(self._local, 'depth', 0)
+            if depth:
+                # Вложенный вызов работает внутри внешней транзакции
+                self._local.depth = depth + 1
+                try:
+                    yield conn
+                finally:
+                    self._local.depth = depth
+                return
+
+            self._begin(conn)
+            self.stats['transactions'] += 1
+            self._local.depth = 1
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+                self.mutations += 1
+            finally:
+                self._local.depth = 0
+
+    @contextmanager
+    def reader(self):
+        """Соединение для чтения из пула"""
+        if self.in_transaction():
+            # Внутри транзакции читаем через писателя, чтобы видеть свои изменения
+            yield self._writer
+            return
+
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    def _acquire_reader(self):
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._pool_lock:
+            if len(self._all_readers) < self.pool_size:
+                conn = self._connect()
+                self._all_readers.append(conn)
+                return conn
+
+        return self._readers.get()
+
+    @contextmanager
+    def watcher(self):
+        """Отдельное соединение-наблюдатель для кэшей процесса
+
+        Наблюдатель ничего не пишет, поэтому его PRAGMA data_version
+        меняется после любого коммита в базу — и своего писателя, и других
+        процессов, — а чтение через него не зависит от транзакции вызывающего.
+        """
+        with self._watch_lock:
+            if self._watcher is None:
+                self._watcher = self._connect()
+            yield self._watcher
+
+    def write_queue(self):
+        """Очередь записи менеджера; поток-писатель стартует при первом обращении"""
+        with self._pool_lock:
+            if self._write_queue is None:
+                self._write_queue = WriteQueue(self)
+            return self._write_queue
+
+    def close(self):
+        """Закрытие всех соединений"""
+        with self._pool_lock:
+            write_queue, self._write_queue = self._write_queue, None
+        if write_queue is not None:
+            write_queue.close()
+        with self._watch_lock:
+            if self._watcher is not None:
+                self._watcher.close()
+                self._watcher = None
+        with self._write_lock, self._pool_lock:
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers = []
+            self._readers = queue.LifoQueue()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+class QueryInterrupt:
+    """Прерывание долгого чтения из другого потока
+
+    Поток, выполняющий запрос, держит соединение под running(); вызов
+    interrupt() из любого потока делает conn.interrupt(), и запрос
+    завершается sqlite3.OperationalError. Соединение возвращается в пул
+    исправным: флаг прерывания SQLite сбрасывается со следующим запросом.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn = None
+        self.interrupted = False
+
+    @contextmanager
+    def running(self, conn):
+        with self._lock:
+            if self.interrupted:
+                raise sqlite3.OperationalError("interrupted")
+            self._conn = conn
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                self._conn = None
+
+    def interrupt(self):
+        with self._lock:
+            self.interrupted = True
+            if self._conn is not None:
+                self._conn.interrupt()
+
+
+class WriteQueue:
+    """Очередь операций записи с одним потоком-писателем
+
+    Поток берёт операцию и всё, что успело накопиться в очереди (до
+    GROUP_COMMIT_SIZE), и выполняет их одной транзакцией: пока идёт
+    фиксация одной группы, следующая собирается сама, без ожидания по
+    таймеру. Каждая операция обёрнута в SAVEPOINT, поэтому ошибка
+    откатывает только её. Future операции завершается после COMMIT
+    всей группы; если не удался сам BEGIN или COMMIT, ошибку получают
+    все операции группы.
+    """
+
+    def __init__(self, manager, group_size=GROUP_COMMIT_SIZE):
+        self.manager = manager
+        self.group_size = group_size
+        self.stats = {'operations': 0, 'groups': 0, 'largest_group': 0}
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        """Постановка func(*args, **kwargs) в очередь; возвращает Future
+
+        Ждать результат внутри своей транзакции нельзя: поток-писатель
+        не получит блокировку, пока она не закончится.
+        """
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        return future
+
+    def close(self):
+        """Остановка потока после уже поставленных операций"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            group = [self._queue.get()]
+            while group[-1] is not None and len(group) < self.group_size:
+                try:
+                    group.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = group[-1] is None
+            if stop:
+                group.pop()
+            if group:
+                self._execute(group)
+            if stop:
+                return
+
+    def _execute(self, group):
+        outcomes = []
+        try:
+            with self.manager.transaction() as conn:
+                for future, func, args, kwargs in group:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    conn.execute("SAVEPOINT queued_write")
+                    try:
+                        result = func(*args, **kwargs)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO queued_write")
+                        conn.execute("RELEASE queued_write")
+                        outcomes.append((future, None, e))
+                    else:
+                        conn.execute("RELEASE queued_write")
+                        outcomes.append((future, result, None))
+        except Exception as e:
+            for future, *_ in group:
+                if future.running() or future.set_running_or_notify_cancel():
+                    future.set_exception(e)
+            return
+
+        self.stats['operations'] += len(outcomes)
+        self.stats['groups'] += 1
+        self.stats['largest_group'] = max(self.stats['largest_group'], len(outcomes))
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+_trace_callback = None
+
+
+def get_manager():
+    """Общий менеджер соединений процесса"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                manager = ConnectionManager(DB_NAME)
+                manager.set_trace_callback(_trace_callback)
+                _manager = manager
+    return _manager
+
+
+def set_trace_callback(callback):
+    """Трассировка SQL общего менеджера, в том числе созданного заново
+    после use_database() (None — отключить)"""
+    global _trace_callback
+    _trace_callback = callback
+    with _manager_lock:
+        manager = _manager
+    if manager is not None:
+        manager.set_trace_callback(callback)
+
+
+def transaction():
+    """Контекстный менеджер транзакции записи"""
+    return get_manager().transaction()
+
+
+def reader():
+    """Контекстный менеджер соединения для чтения"""
+    return get_manager().reader()
+
+
+def submit_write(func, *args, **kwargs):
+    """Запись через очередь потока-писателя (см. WriteQueue); возвращает Future
+
+    Операции из разных потоков, поставленные одновременно, фиксируются
+    одной транзакцией.
+    """
+    return get_manager().write_queue().submit(func, *args, **kwargs)
+
+
+def write(func, *args, **kwargs):
+    """Запись через очередь с ожиданием результата
+
+    Внутри транзакции (в том числе в самом потоке-писателе) func
+    выполняется сразу: ожидание очереди оттуда заблокировало бы её.
+    """
+    manager = get_manager()
+    if manager.in_transaction():
+        return func(*args, **kwargs)
+    return manager.write_queue().submit(func, *args, **kwargs).result()
+
+
+def is_busy_error(error):
+    """Ошибка SQLite из-за блокировки базы другим соединением"""
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def get_write_stats():
+    """Счётчики записи общего менеджера: транзакции, повторы при занятой
+    базе, операции и группы очереди записи"""
+    manager = get_manager()
+    stats = dict(manager.stats)
+    write_queue = manager._write_queue
+    stats.update(write_queue.stats if write_queue else
+                 {'operations': 0, 'groups': 0, 'largest_group': 0})
+    return stats
+
+
+def data_version():
+    """Номер состояния базы: меняется после любого коммита — своего
+    процесса или другого
+
+    Читается через соединение-наблюдатель; значения сравнимы только
+    между собой в пределах жизни общего менеджера соединений.
+    """
+    with get_manager().watcher() as conn:
+        return conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+def close_connections():
+    """Закрытие соединений общего менеджера"""
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.close()
+            _manager = None
+    _references.invalidate()
+    _query_cache.clear()
+
+
+def use_database(db_name):
+    """Переключение на другой файл базы данных"""
+    global DB_NAME, _fts_enabled
+    close_connections()
+    DB_NAME = db_name
+    _fts_enabled = None
+
+
+atexit.register(close_connections)
+
+
+def _result_copy(value):
+    """Копия списков и словарей результата; строки внутри них общие"""
+    if isinstance(value, dict):
+        return {key: _result_copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        if value and isinstance(value[0], (list, dict)):
+            return [_result_copy(item) for item in value]
+        return list(value)
+    return value
+
+
+class QueryCache:
+    """Результаты запросов чтения с вытеснением давно не использованных
+
+    Запись хранит поколение базы, при котором получен результат: PRAGMA
+    data_version (коммиты любых соединений, в том числе других
+    процессов) и счётчик транзакций своего менеджера. Результат отдаётся
+    из памяти, пока поколение не изменилось. Внутри транзакции записи
+    кэш обходится: там видны ещё не зафиксированные изменения.
+
+    Ограничения — QUERY_CACHE_SIZE записей и QUERY_CACHE_ROWS строк во
+    всех списках вместе. Каждый вызывающий получает свою копию списков и
+    словарей результата, поэтому может их изменять; сами строки (кортежи
+    и StudyItem) общие и не изменяются.
+    """
+
+    def __init__(self, size=QUERY_CACHE_SIZE, max_rows=QUERY_CACHE_ROWS):
+        self.size = size
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()  # ключ -> (поколение, результат, строк)
+            self.rows = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def generation(self):
+        manager = get_manager()
+        return data_version(), manager.mutations
+
+    def get(self, key, load):
+        """Результат по ключу из кэша или load() с сохранением"""
+        if get_manager().in_transaction():
+            return load()
+        # Поколение снимается до запроса: если коммит попадёт между ними,
+        # запись окажется устаревшей по метке и просто перечитается
+        generation = self.generation()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _result_copy(entry[1])
+            self.misses += 1
+
+        value = load()
+        rows = len(value) if isinstance(value, (list, dict)) else 1
+        if rows > self.max_rows:
+            return value
+        result = _result_copy(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.rows -= old[2]
+            self._entries[key] = (generation, value, rows)
+            self.rows += rows
+            while len(self._entries) > self.size or self.rows > self.max_rows:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.rows -= evicted
+                self.evictions += 1
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries), 'rows': self.rows}
+
+
+_query_cache = QueryCache()
+
+
+def cached_query(by_date=False):
+    """Декоратор функции чтения: результат берётся из QueryCache
+
+    by_date — результат зависит от текущей даты (DATE('now')), она
+    входит в ключ. Вызовы с нехешируемыми аргументами идут мимо кэша.
+    Аргумент interrupt (QueryInterrupt) на результат не влияет и в ключ
+    не входит.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (func.__name__, args,
+                   tuple(sorted(item for item in kwargs.items() if item[0] != 'interrupt')))
+            if by_date:
+                # DATE('now') в SQLite — дата по UTC
+                key += (datetime.datetime.now(datetime.timezone.utc).date(),)
+            try:
+                hash(key)
+            except TypeError:
+                return func(*args, **kwargs)
+            return _query_cache.get(key, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorate
+
+
+def get_query_cache_stats():
+    """Счётчики кэша запросов: попадания, промахи, вытеснения, размер"""
+    return _query_cache.stats()
+
+
+def clear_query_cache():
+    """Очистка кэша запросов"""
+    _query_cache.clear()
+
+
 def create_main_table(conn):
     """Создание основной таблицы учебных материалов"""
     sql = '''
@@ -33,9 +688,9 @@ def create_main_table(conn):
     try:
         cursor = conn.cursor()
         cursor.execute(sql)
-        conn.commit()
     except sqlite3.Error as e:
         print(f"Ошибка создания основной таблицы: {e}")
+        raise
 
 
 def create_categories_table(conn):
@@ -52,9 +707,9 @@ def create_categories_table(conn):
     try:
         cursor = conn.cursor()
         cursor.execute(sql)
-        conn.commit()
     except sqlite3.Error as e:
         print(f"Ошибка создания таблицы категорий: {e}")
+        raise
 
 
 def create_tags_table(conn):
@@ -69,9 +724,9 @@ def create_tags_table(conn):
     try:
         cursor = conn.cursor()
         cursor.execute(sql)
-        conn.commit()
     except sqlite3.Error as e:
         print(f"Ошибка создания таблицы тегов: {e}")
+        raise
 
 
 def create_record_tags_table(conn):
@@ -88,9 +743,9 @@ def create_record_tags_table(conn):
     try:
         cursor = conn.cursor()
         cursor.execute(sql)
-        conn.commit()
     except sqlite3.Error as e:
         print(f"Ошибка создания таблицы связей: {e}")
+        raise
 
 
 def create_study_sessions_table(conn):
@@ -108,23 +763,650 @@ def create_study_sessions_table(conn):
     try:
         cursor = conn.cursor()
         cursor.execute(sql)
-        conn.commit()
     except sqlite3.Error as e:
         print(f"Ошибка создания таблицы сессий: {e}")
+        raise
+
+
+def _migration_base_schema(conn):
+    """Базовые таблицы"""
+    create_categories_table(conn)
+    create_main_table(conn)
+    create_tags_table(conn)
+    create_record_tags_table(conn)
+    create_study_sessions_table(conn)
+
+
+# Вторичные индексы текущей схемы: их снимает и восстанавливает отложенный
+# импорт и проверяет schema_ready. Миграции создают индексы своим SQL
+INDEXES = {
+    'idx_study_items_order': """
+        CREATE INDEX IF NOT EXISTS idx_study_items_order
+        ON study_items (status_rank, deadline_key, id)
+    """,
+    'idx_study_items_status_deadline': """
+        CREATE INDEX IF NOT EXISTS idx_study_items_status_deadline
+        ON study_items (status, deadline)
+    """,
+    'idx_study_items_category': """
+        CREATE INDEX IF NOT EXISTS idx_study_items_category
+        ON study_items (category_id, deadline)
+    """,
+    'idx_study_items_deadline': """
+        CREATE INDEX IF NOT EXISTS idx_study_items_deadline
+        ON study_items (deadline, status)
+    """,
+    'idx_study_item_tags_tag': """
+        CREATE INDEX IF NOT EXISTS idx_study_item_tags_tag
+        ON study_item_tags (tag_id, study_item_id)
+    """,
+    # Без него каскадное удаление материала просматривает все сессии
+    'idx_study_sessions_item': """
+        CREATE INDEX IF NOT EXISTS idx_study_sessions_item
+        ON study_sessions (study_item_id, date)
+    """,
+}
+
+
+def _migration_hot_path_indexes(conn):
+    """Индексы под сортировку списка, фильтры поиска и статистику"""
+    # Вычисляемые столбцы повторяют ключ сортировки списка и позволяют
+    # искать по индексу сравнением кортежей (status_rank, deadline_key, id)
+    conn.execute(f"""
+        ALTER TABLE study_items ADD COLUMN status_rank INTEGER
+        GENERATED ALWAYS AS ({STATUS_RANK_SQL}) VIRTUAL
+    """)
+    conn.execute("""
+        ALTER TABLE study_items ADD COLUMN deadline_key TEXT
+        GENERATED ALWAYS AS (IFNULL(deadline, '')) VIRTUAL
+    """)
+    # Набор индексов миграции зафиксирован: индексы, добавленные в INDEXES
+    # позже, создают свои миграции, а rating_hours удаляет миграция 5
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_study_items_order
+        ON study_items (status_rank, deadline_key, id)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_study_items_status_deadline
+        ON study_items (status, deadline)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_study_items_category
+        ON study_items (category_id, deadline)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_study_items_deadline
+        ON study_items (deadline, status)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_study_items_rating_hours
+        ON study_items (rating, hours_spent)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_study_item_tags_tag
+        ON study_item_tags (tag_id, study_item_id)
+    """)
+
+
+# Полнотекстовый индекс по названию и описанию (внешнее содержимое — study_items)
+FTS_TABLE_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS study_items_fts USING fts5(
+        title, description,
+        content='study_items', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+"""
+
+# Триггеры, поддерживающие study_items_fts в актуальном состоянии
+FTS_TRIGGERS = {
+    'study_items_fts_ai': """
+        CREATE TRIGGER IF NOT EXISTS study_items_fts_ai
+        AFTER INSERT ON study_items BEGIN
+            INSERT INTO study_items_fts (rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+    """,
+    'study_items_fts_ad': """
+        CREATE TRIGGER IF NOT EXISTS study_items_fts_ad
+        AFTER DELETE ON study_items BEGIN
+            INSERT INTO study_items_fts (study_items_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+    """,
+    'study_items_fts_au': """
+        CREATE TRIGGER IF NOT EXISTS study_items_fts_au
+        AFTER UPDATE OF title, description ON study_items BEGIN
+            INSERT INTO study_items_fts (study_items_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO study_items_fts (rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+    """,
+}
+
+
+def fts5_available(conn):
+    """Проверка, собран ли SQLite с модулем FTS5"""
+    options = [row[0] for row in conn.execute("PRAGMA compile_options")]
+    return 'ENABLE_FTS5' in options
+
+
+def _migration_full_text_search(conn):
+    """Полнотекстовый поиск FTS5 по названию и описанию"""
+    if not fts5_available(conn):
+        print("SQLite собран без FTS5, поиск будет работать через LIKE")
+        return
+
+    conn.execute(FTS_TABLE_SQL)
+    for trigger_sql in FTS_TRIGGERS.values():
+        conn.execute(trigger_sql)
+    # Название весит больше описания при ранжировании bm25
+    conn.execute(
+        "INSERT INTO study_items_fts (study_items_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+    conn.execute("INSERT INTO study_items_fts (study_items_fts) VALUES ('rebuild')")
+
+
+# Сводная статистика, которую поддерживают триггеры на study_items:
+# 'all' — число материалов и сумма часов, 'status' и 'category' — число
+# материалов по ключу, 'rating' — число оценённых материалов и сумма оценок
+STATS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS study_item_stats (
+        kind TEXT NOT NULL,
+        key NOT NULL DEFAULT '',
+        count INTEGER NOT NULL DEFAULT 0,
+        total REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (kind, key)
+    ) WITHOUT ROWID
+"""
+
+STATS_TRIGGERS = {
+    'study_item_stats_ai': """
+        CREATE TRIGGER IF NOT EXISTS study_item_stats_ai
+        AFTER INSERT ON study_items BEGIN
+            INSERT INTO study_item_stats (kind, key, count, total)
+            SELECT 'all', '', 1, IFNULL(new.hours_spent, 0)
+            WHERE true
+            ON CONFLICT (kind, key) DO UPDATE
+            SET count = count + excluded.count, total = total + excluded.total;
+            INSERT INTO study_item_stats (kind, key, count, total)
+            SELECT 'status', new.status, 1, 0
+            WHERE true
+            ON CONFLICT (kind, key) DO UPDATE
+            SET count = count + excluded.count, total = total + excluded.total;
+            INSERT INTO study_item_stats (kind, key, count, total)
+            SELECT 'category', new.category_id, 1, 0
+            WHERE new.category_id IS NOT NULL
+            ON CONFLICT (kind, key) DO UPDATE
+            SET count = count + excluded.count, total = total + excluded.total;
+            INSERT INTO study_item_stats (kind, key, count, total)
+            SELECT 'rating', '', 1, new.rating
+            WHERE new.rating IS NOT NULL
+            ON CONFLICT (kind, key) DO UPDATE
+            SET count = count + excluded.count, total = total + excluded.total;
+        END
+    """,
+    'study_item_stats_ad': """
+        CREATE TRIGGER IF NOT EXISTS study_item_stats_ad
+        AFTER DELETE ON study_items BEGIN
+            INSERT INTO study_item_stats (kind, key, count, total)
+            SELECT 'all', '', -1, -IFNULL(old.hours_spent, 0)
+            WHERE true
+            ON CONFLICT (kind, key) DO UPDATE
+            SET count = count + excluded.count, total = total + excluded.total;
+            INSERT INTO study_item_stats (kind, key, count, total)
+            SELECT 'status', old.status, -1, 0
+            WHERE true
+            ON CONFLICT (kind, key) DO UPDATE
+            SET count = count + excluded.count, total = total + excluded.total;
+            INSERT INTO study_item_stats (kind, key, count, total)
+            SELECT 'category', old.category_id, -1, 0
+            WHERE old.category_id IS NOT NULL
+            ON CONFLICT (kind, key) DO UPDATE
+            SET count = count + excluded.count, total = total + excluded.total;
+            INSERT INTO study_item_stats (kind, key, count, total)
+            SELECT 'rating', '', -1, -old.rating
+            WHERE old.rating IS NOT NULL
+            ON CONFLICT (kind, key) DO UPDATE
+            SET count = count + excluded.count, total = total + excluded.total;
+        END
+    """,
+    'study_item_stats_au': """
+        CREATE TRIGGER IF NOT EXISTS study_item_stats_au
+        AFTER UPDATE OF status, category_id, rating, hours_spent ON study_items BEGIN
+            INSERT INTO study_item_stats (kind, key, count, total)
+            SELECT 'all', '', -1, -IFNULL(old.hours_spent, 0)
+            WHERE true
+            ON CONFLICT (kind, key) DO UPDATE
+            SET count = count + excluded.count, total = total + excluded.total;
+            INSERT INTO study_item_stats (kind, key, count, total)
+            SELECT 'status', old.status, -1, 0
+            WHERE true
+            ON CONFLICT (kind, key) DO UPDATE
+            SET count = count + excluded.count, total = total + excluded.total;
+            INSERT INTO study_item_stats (kind, key, count, total)
+            SELECT 'category', old.category_id, -1, 0
+            WHERE old.category_id IS NOT NULL
+            ON CONFLICT (kind, key) DO UPDATE
+            SET count = count + excluded.count, total = total + excluded.total;
+            INSERT INTO study_item_stats (kind, key, count, total)
+            SELECT 'rating', '', -1, -old.rating
+            WHERE old.rating IS NOT NULL
+            ON CONFLICT (kind, key) DO UPDATE
+            SET count = count + excluded.count, total = total + excluded.total;
+            INSERT INTO study_item_stats (kind, key, count, total)
+            SELECT 'all', '', 1, IFNULL(new.hours_spent, 0)
+            WHERE true
+            ON CONFLICT (kind, key) DO UPDATE
+            SET count = count + excluded.count, total = total + excluded.total;
+            INSERT INTO study_item_stats (kind, key, count, total)
+            SELECT 'status', new.status, 1, 0
+            WHERE true
+            ON CONFLICT (kind, key) DO UPDATE
+            SET count = count + excluded.count, total = total + excluded.total;
+            INSERT INTO study_item_stats (kind, key, count, total)
+            SELECT 'category', new.category_id, 1, 0
+            WHERE new.category_id IS NOT NULL
+            ON CONFLICT (kind, key) DO UPDATE
+            SET count = count + excluded.count, total = total + excluded.total;
+            INSERT INTO study_item_stats (kind, key, count, total)
+            SELECT 'rating', '', 1, new.rating
+            WHERE new.rating IS NOT NULL
+            ON CONFLICT (kind, key) DO UPDATE
+            SET count = count + excluded.count, total = total + excluded.total;
+        END
+    """,
+}
+
+
+def rebuild_statistics(conn=None):
+    """Пересчёт сводной статистики с нуля"""
+    if conn is None:
+        with transaction() as conn:
+            return rebuild_statistics(conn)
+
+    conn.execute("DELETE FROM study_item_stats")
+    conn.execute("""
+        INSERT INTO study_item_stats (kind, key, count, total)
+        SELECT 'all', '', COUNT(*), IFNULL(SUM(hours_spent), 0) FROM study_items
+    """)
+    conn.execute("""
+        INSERT INTO study_item_stats (kind, key, count, total)
+        SELECT 'status', status, COUNT(*), 0 FROM study_items GROUP BY status
+    """)
+    conn.execute("""
+        INSERT INTO study_item_stats (kind, key, count, total)
+        SELECT 'category', category_id, COUNT(*), 0 FROM study_items
+        WHERE category_id IS NOT NULL GROUP BY category_id
+    """)
+    conn.execute("""
+        INSERT INTO study_item_stats (kind, key, count, total)
+        SELECT 'rating', '', COUNT(*), IFNULL(SUM(rating), 0) FROM study_items
+        WHERE rating IS NOT NULL
+    """)
+
+
+def _migration_materialized_statistics(conn):
+    """Сводная статистика, поддерживаемая триггерами"""
+    conn.execute(STATS_TABLE_SQL)
+    for trigger_sql in STATS_TRIGGERS.values():
+        conn.execute(trigger_sql)
+    rebuild_statistics(conn)
+
+
+def _migration_drop_rating_hours_index(conn):
+    """Индекс под агрегаты рейтинга не нужен после перехода на сводную таблицу"""
+    conn.execute("DROP INDEX IF EXISTS idx_study_items_rating_hours")
+
+
+# Часы материала складываются из ручной оценки и учебных сессий: каждая
+# сессия прибавляет свою длительность к hours_spent, поэтому сумма по
+# всем сессиям никогда не пересчитывается
+SESSION_TRIGGERS = {
+    'study_sessions_hours_ai': """
+        CREATE TRIGGER IF NOT EXISTS study_sessions_hours_ai
+        AFTER INSERT ON study_sessions BEGIN
+            UPDATE study_items
+            SET hours_spent = IFNULL(hours_spent, 0) + new.duration_minutes / 60.0
+            WHERE id = new.study_item_id AND new.duration_minutes;
+        END
+    """,
+    'study_sessions_hours_ad': """
+        CREATE TRIGGER IF NOT EXISTS study_sessions_hours_ad
+        AFTER DELETE ON study_sessions BEGIN
+            UPDATE study_items
+            SET hours_spent = IFNULL(hours_spent, 0) - old.duration_minutes / 60.0
+            WHERE id = old.study_item_id AND old.duration_minutes;
+        END
+    """,
+    'study_sessions_hours_au': """
+        CREATE TRIGGER IF NOT EXISTS study_sessions_hours_au
+        AFTER UPDATE OF study_item_id, duration_minutes ON study_sessions BEGIN
+            UPDATE study_items
+            SET hours_spent = IFNULL(hours_spent, 0) - old.duration_minutes / 60.0
+            WHERE id = old.study_item_id AND old.duration_minutes;
+            UPDATE study_items
+            SET hours_spent = IFNULL(hours_spent, 0) + new.duration_minutes / 60.0
+            WHERE id = new.study_item_id AND new.duration_minutes;
+        END
+    """,
+}
+
+
+# Минуты занятий по периодам (день, ISO-неделя, месяц) в разрезе всех
+# материалов ('all', key = 0), категорий и тегов. Поддерживается
+# триггерами на сессиях, материалах и тегах материалов; bucket - день
+# 'ГГГГ-ММ-ДД', неделя 'ГГГГ-Wнн' или месяц 'ГГГГ-ММ'
+ROLLUP_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS session_rollup (
+        period TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        key INTEGER NOT NULL,
+        bucket TEXT NOT NULL,
+        minutes INTEGER NOT NULL DEFAULT 0,
+        sessions INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (period, kind, key, bucket)
+    ) WITHOUT ROWID
+"""
+
+ROLLUP_PERIODS = ('day', 'week', 'month')
+
+_ROLLUP_PERIODS_SQL = "(" + " UNION ALL ".join(
+    f"SELECT '{period}' AS period" for period in ROLLUP_PERIODS) + ")"
+
+_ROLLUP_UPSERT = """
+    ON CONFLICT (period, kind, key, bucket) DO UPDATE
+    SET minutes = minutes + excluded.minutes, sessions = sessions + excluded.sessions;"""
+
+
+def _rollup_bucket_sql(date):
+    """Выражение SQL: корзина периода p.period для даты
+
+    Неделя по ISO 8601: год и номер недели берутся от её четверга.
+    """
+    thursday = f"{date}, '-3 days', 'weekday 4'"
+    return (f"CASE p.period WHEN 'day' THEN {date} WHEN 'month' THEN substr({date}, 1, 7) "
+            f"ELSE strftime('%Y', {thursday}) || '-W' || "
+            f"printf('%02d', (strftime('%j', {thursday}) - 1) / 7 + 1) END")
+
+
+def _rollup_session_delta(row, sign):
+    """Вклад одной сессии (new или old) во все её разрезы"""
+    return f"""
+            INSERT INTO session_rollup (period, kind, key, bucket, minutes, sessions)
+            SELECT p.period, k.kind, k.key, {_rollup_bucket_sql(f'{row}.date')},
+                   {sign}{row}.duration_minutes, {sign}1
+            FROM {_ROLLUP_PERIODS_SQL} p, (
+                SELECT 'all' AS kind, 0 AS key
+                UNION ALL
+                SELECT 'category', category_id FROM study_items
+                WHERE id = {row}.study_item_id AND category_id IS NOT NULL
+                UNION ALL
+                SELECT 'tag', sit.tag_id FROM study_item_tags sit
+                JOIN study_items si ON si.id = sit.study_item_id
+                WHERE sit.study_item_id = {row}.study_item_id
+            ) k
+            WHERE {row}.date IS NOT NULL AND {row}.duration_minutes{_ROLLUP_UPSERT}"""
+
+
+def _rollup_item_delta(item, keys, sign, where="true"):
+    """Вклад всех сессий материала в разрезы keys (подзапрос kind, key)"""
+    return f"""
+            INSERT INTO session_rollup (period, kind, key, bucket, minutes, sessions)
+            SELECT p.period, k.kind, k.key, {_rollup_bucket_sql('s.date')} AS bucket,
+                   {sign}SUM(s.duration_minutes), {sign}COUNT(*)
+            FROM study_sessions s, {_ROLLUP_PERIODS_SQL} p, {keys} k
+            WHERE s.study_item_id = {item} AND s.date IS NOT NULL AND s.duration_minutes
+                AND {where}
+            GROUP BY p.period, k.kind, k.key, bucket{_ROLLUP_UPSERT}"""
+
+
+# Сессии удалённого материала вычитаются из категории и тегов до удаления,
+# пока материал и его теги ещё в базе; каскадные удаления сессий и связей
+# с тегами после этого учитывают только разрез 'all'
+ROLLUP_TRIGGERS = {
+    'study_sessions_rollup_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS study_sessions_rollup_ai
+        AFTER INSERT ON study_sessions BEGIN{_rollup_session_delta('new', '')}
+        END
+    """,
+    'study_sessions_rollup_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS study_sessions_rollup_ad
+        AFTER DELETE ON study_sessions BEGIN{_rollup_session_delta('old', '-')}
+        END
+    """,
+    'study_sessions_rollup_au': f"""
+        CREATE TRIGGER IF NOT EXISTS study_sessions_rollup_au
+        AFTER UPDATE OF study_item_id, date, duration_minutes ON study_sessions BEGIN
+            {_rollup_session_delta('old', '-')}{_rollup_session_delta('new', '')}
+        END
+    """,
+    'study_items_rollup_au': f"""
+        CREATE TRIGGER IF NOT EXISTS study_items_rollup_au
+        AFTER UPDATE OF category_id ON study_items
+        WHEN old.category_id IS NOT new.category_id BEGIN{
+            _rollup_item_delta('old.id', "(SELECT 'category' AS kind, old.category_id AS key)",
+                               '-', 'old.category_id IS NOT NULL')}{
+            _rollup_item_delta('new.id', "(SELECT 'category' AS kind, new.category_id AS key)",
+                               '', 'new.category_id IS NOT NULL')}
+        END
+    """,
+    'study_items_rollup_bd': f"""
+        CREATE TRIGGER IF NOT EXISTS study_items_rollup_bd
+        BEFORE DELETE ON study_items BEGIN{
+            _rollup_item_delta('old.id', "(SELECT 'category' AS kind, old.category_id AS key)",
+                               '-', 'old.category_id IS NOT NULL')}{
+            _rollup_item_delta('old.id', "(SELECT 'tag' AS kind, tag_id AS key FROM study_item_tags"
+                                         " WHERE study_item_id = old.id)", '-')}
+        END
+    """,
+    'study_item_tags_rollup_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS study_item_tags_rollup_ai
+        AFTER INSERT ON study_item_tags BEGIN{
+            _rollup_item_delta('new.study_item_id', "(SELECT 'tag' AS kind, new.tag_id AS key)", '')}
+        END
+    """,
+    'study_item_tags_rollup_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS study_item_tags_rollup_ad
+        AFTER DELETE ON study_item_tags BEGIN{
+            _rollup_item_delta('old.study_item_id', "(SELECT 'tag' AS kind, old.tag_id AS key)", '-',
+                               'EXISTS (SELECT 1 FROM study_items WHERE id = old.study_item_id)')}
+        END
+    """,
+}
+
+
+def rebuild_rollups(conn=None):
+    """Пересчёт сводок по периодам с нуля по всем сессиям"""
+    if conn is None:
+        with transaction() as conn:
+            return rebuild_rollups(conn)
+
+    conn.execute("DELETE FROM session_rollup")
+    for kind, key, join in (
+        ('all', '0', "JOIN study_items si ON si.id = s.study_item_id"),
+        ('category', 'si.category_id',
+         "JOIN study_items si ON si.id = s.study_item_id AND si.category_id IS NOT NULL"),
+        ('tag', 'sit.tag_id', "JOIN study_item_tags sit ON sit.study_item_id = s.study_item_id"),
+    ):
+        conn.execute(f"""
+            INSERT INTO session_rollup (period, kind, key, bucket, minutes, sessions)
+            SELECT p.period, '{kind}', {key} AS key, {_rollup_bucket_sql('s.date')} AS bucket,
+                   SUM(s.duration_minutes), COUNT(*)
+            FROM study_sessions s {join}, {_ROLLUP_PERIODS_SQL} p
+            WHERE s.date IS NOT NULL AND s.duration_minutes
+            GROUP BY p.period, key, bucket
+        """)
+
+
+def _migration_session_rollups(conn):
+    """Сводки минут занятий по дням, неделям и месяцам"""
+    conn.execute(ROLLUP_TABLE_SQL)
+    for trigger_sql in ROLLUP_TRIGGERS.values():
+        conn.execute(trigger_sql)
+    rebuild_rollups(conn)
+
+
+def _migration_session_hours(conn):
+    """Учёт часов материала по учебным сессиям"""
+    for trigger_sql in SESSION_TRIGGERS.values():
+        conn.execute(trigger_sql)
+
+
+def _migration_session_item_index(conn):
+    """Индекс сессий по материалу для каскадного удаления"""
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_study_sessions_item
+        ON study_sessions (study_item_id, date)
+    """)
+
+
+# Счётчик изменений справочников: по нему кэш отличает правку категорий
+# и тегов от прочих коммитов, которые тоже меняют PRAGMA data_version
+REFERENCE_VERSION_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS reference_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL DEFAULT 0
+    )
+"""
+
+REFERENCE_TRIGGERS = {
+    f'{table}_version_a{event[0].lower()}': f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_version_a{event[0].lower()}
+        AFTER {event} ON {table} BEGIN
+            UPDATE reference_version SET version = version + 1;
+        END
+    """
+    for table in ('categories', 'tags')
+    for event in ('INSERT', 'UPDATE', 'DELETE')
+}
+
+
+def _migration_reference_version(conn):
+    """Счётчик изменений категорий и тегов для кэша справочников"""
+    conn.execute(REFERENCE_VERSION_TABLE_SQL)
+    conn.execute("INSERT OR IGNORE INTO reference_version (id, version) VALUES (1, 0)")
+    for trigger_sql in REFERENCE_TRIGGERS.values():
+        conn.execute(trigger_sql)
+
+
+# Нумерованные миграции схемы; номер последней хранится в PRAGMA user_version
+MIGRATIONS = [
+    (1, _migration_base_schema),
+    (2, _migration_hot_path_indexes),
+    (3, _migration_full_text_search),
+    (4, _migration_materialized_statistics),
+    (5, _migration_drop_rating_hours_index),
+    (6, _migration_reference_version),
+    (7, _migration_session_item_index),
+    (8, _migration_session_hours),
+    (9, _migration_session_rollups),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    """Текущая версия схемы базы"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Применение недостающих миграций; возвращает исходную версию схемы"""
+    current = get_schema_version(conn)
+    for version, apply_migration in MIGRATIONS:
+        if version <= current:
+            continue
+        apply_migration(conn)
+        conn.execute(f"PRAGMA user_version = {version}")
+        conn.execute("ANALYZE")
+    return current
+
+
+def _existing_objects(conn, kind):
+    return {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = ?", (kind,))}
+
+
+def _maintenance_objects(conn):
+    """Индексы и триггеры, которые должны быть в базе текущей схемы"""
+    names = set(INDEXES) | set(STATS_TRIGGERS) | set(SESSION_TRIGGERS) | set(ROLLUP_TRIGGERS)
+    if 'study_items_fts' in _existing_objects(conn, 'table'):
+        names |= set(FTS_TRIGGERS)
+    return names
+
+
+def suspend_maintenance(conn):
+    """Удаление вторичных индексов и триггеров перед массовой загрузкой
+
+    Возвращает имена удалённых объектов для resume_maintenance().
+    Триггеры часов по сессиям остаются: сессии, записанные во время
+    импорта, должны прибавить часы, а пересчитать их потом нечем.
+    """
+    suspended = set()
+    names = _maintenance_objects(conn) - set(SESSION_TRIGGERS)
+    for kind in ('index', 'trigger'):
+        for name in _existing_objects(conn, kind) & names:
+            conn.execute(f"DROP {kind.upper()} {name}")
+            suspended.add(name)
+    return suspended
+
+
+def resume_maintenance(conn, suspended):
+    """Восстановление индексов и триггеров и пересчёт производных данных"""
+    for name in suspended:
+        if name in INDEXES:
+            conn.execute(INDEXES[name])
+    for name in suspended:
+        if name in FTS_TRIGGERS:
+            conn.execute(FTS_TRIGGERS[name])
+        elif name in STATS_TRIGGERS:
+            conn.execute(STATS_TRIGGERS[name])
+        elif name in ROLLUP_TRIGGERS:
+            conn.execute(ROLLUP_TRIGGERS[name])
+
+    if suspended & set(FTS_TRIGGERS):
+        conn.execute("INSERT INTO study_items_fts (study_items_fts) VALUES ('rebuild')")
+    if suspended & set(STATS_TRIGGERS):
+        rebuild_statistics(conn)
+    if suspended & set(ROLLUP_TRIGGERS):
+        rebuild_rollups(conn)
+    # Для планировщика достаточно выборки, полный проход по большой таблице долог
+    conn.execute("PRAGMA analysis_limit = 1000")
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA analysis_limit = 0")
+
+
+def schema_ready(conn):
+    """Схема актуальна: последняя версия, все индексы и триггеры на месте,
+    справочник категорий заполнен"""
+    if get_schema_version(conn) != MIGRATIONS[-1][0]:
+        return False
+    if _maintenance_objects(conn) - _existing_objects(conn, 'index') - _existing_objects(conn, 'trigger'):
+        return False
+    return bool(conn.execute("SELECT EXISTS (SELECT 1 FROM categories)").fetchone()[0])
 
 
 def init_database():
-    """Инициализация базы данных"""
-    conn = create_connection()
-    if conn:
-        create_main_table(conn)
-        create_categories_table(conn)
-        create_tags_table(conn)
-        create_record_tags_table(conn)
-        create_study_sessions_table(conn)
-        add_default_data(conn)
-        conn.close()
-        print("База данных успешно инициализирована")
+    """Инициализация базы данных
+
+    Обычный запуск с актуальной схемой обходится несколькими чтениями
+    на читающем соединении и не ждёт блокировки записи.
+    """
+    with reader() as conn:
+        ready = schema_ready(conn)
+
+    if not ready:
+        # Все недостающие миграции применяются в одной транзакции
+        with transaction() as conn:
+            migrate(conn)
+            # Загрузка с отложенными индексами могла прерваться до их восстановления
+            missing = (_maintenance_objects(conn)
+                       - _existing_objects(conn, 'index') - _existing_objects(conn, 'trigger'))
+            if missing:
+                resume_maintenance(conn, missing)
+            add_default_data(conn)
+    print("База данных успешно инициализирована")
 
 
 def add_default_data(conn):
@@ -187,328 +1469,793 @@ def add_default_data(conn):
             item_tags
         )
 
-        conn.commit()
         print("Тестовые данные добавлены")
 
 
 def add_study_item(data):
     """Добавление нового учебного материала"""
-    conn = create_connection()
-    cursor = conn.cursor()
-
     sql = '''
     INSERT INTO study_items
     (title, description, category_id, rating, status, deadline, hours_spent, priority)
     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
     '''
-    cursor.execute(sql, (
-        data['title'],
-        data['description'],
-        data['category_id'],
-        data['rating'],
-        data['status'],
-        data['deadline'],
-        data.get('hours_spent', 0),
-        data['priority']
-    ))
-    item_id = cursor.lastrowid
-
-    if data.get('tags'):
-        for tag_id in data['tags']:
-            cursor.execute(
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, (
+            data['title'],
+            data['description'],
+            data['category_id'],
+            data['rating'],
+            data['status'],
+            data['deadline'],
+            data.get('hours_spent', 0),
+            data['priority']
+        ))
+        item_id = cursor.lastrowid
+
+        if data.get('tags'):
+            cursor.executemany(
                 "INSERT INTO study_item_tags (study_item_id, tag_id) VALUES (?, ?)",
-                (item_id, tag_id)
+                [(item_id, tag_id) for tag_id in set(data['tags'])]
             )
 
-    conn.commit()
-    conn.close()
     return item_id
 
 
+@cached_query()
 def get_all_study_items():
     """Получение всех учебных материалов с информацией о категориях и тегах"""
-    conn = create_connection()
-    cursor = conn.cursor()
+    with reader() as conn:
+        cursor = conn.cursor()
+        cursor.execute(ITEM_LIST_SELECT + ITEM_LIST_ORDER)
+        return decode_study_items(cursor.fetchall())
 
-    sql = '''
-    SELECT
-        si.*,
-        c.name as category_name,
-        c.color as category_color,
-        GROUP_CONCAT(t.name, ', ') as tags
-    FROM study_items si
-    LEFT JOIN categories c ON si.category_id = c.id
-    LEFT JOIN study_item_tags sit ON si.id = sit.study_item_id
-    LEFT JOIN tags t ON sit.tag_id = t.id
-    GROUP BY si.id
-    ORDER BY
-        CASE si.status
-            WHEN 'in_progress' THEN 1
-            WHEN 'planned' THEN 2
-            WHEN 'on_hold' THEN 3
-            WHEN 'completed' THEN 4
-        END,
-        si.deadline ASC
-    '''
 
-    cursor.execute(sql)
-    items = cursor.fetchall()
-    conn.close()
-    return items
+def item_sort_key(item):
+    """Ключ сортировки строки списка: (ранг статуса, дедлайн, id)"""
+    return (STATUS_RANKS.get(item.status), item.deadline or '', item.id)
 
 
-def get_study_item_by_id(item_id):
-    """Получение одного материала по ID"""
-    conn = create_connection()
-    cursor = conn.cursor()
+def _list_filters(status=None, category_id=None, tag_id=None):
+    """Условия WHERE и параметры для фильтров списка"""
+    sql = " WHERE 1=1"
+    params = []
 
-    sql = "SELECT * FROM study_items WHERE id = ?"
-    cursor.execute(sql, (item_id,))
-    item = cursor.fetchone()
+    if status:
+        sql += " AND si.status = ?"
+        params.append(status)
 
+    if category_id:
+        sql += " AND si.category_id = ?"
+        params.append(category_id)
+
+    if tag_id:
+        sql += " AND si.id IN (SELECT study_item_id FROM study_item_tags WHERE tag_id = ?)"
+        params.append(tag_id)
+
+    return sql, params
+
+
+def ids_param(item_ids):
+    """Список id одним параметром для условия IN (SELECT value FROM json_each(?))"""
+    return json.dumps([int(item_id) for item_id in item_ids])
+
+
+@cached_query()
+def count_study_items(status=None, category_id=None, tag_id=None, before=None):
+    """Количество материалов под фильтрами
+
+    before — ключ сортировки: считаются только строки, стоящие раньше него.
+    """
+    where, params = _list_filters(status, category_id, tag_id)
+    if before is not None:
+        where += " AND (si.status_rank, si.deadline_key, si.id) < (?, ?, ?)"
+        params.extend(before)
+    with reader() as conn:
+        return conn.execute(
+            "SELECT COUNT(*) FROM study_items si" + where, params).fetchone()[0]
+
+
+def get_study_item_ids(status=None, category_id=None, tag_id=None):
+    """id всех материалов под фильтрами в порядке списка"""
+    where, params = _list_filters(status, category_id, tag_id)
+    with reader() as conn:
+        return [row[0] for row in conn.execute(
+            "SELECT si.id FROM study_items si" + where + ITEM_LIST_ORDER, params)]
+
+
+def get_study_items_by_ids(item_ids, status=None, category_id=None, tag_id=None):
+    """Строки списка для указанных id, прошедшие фильтры, в виде {id: строка}"""
+    where, params = _list_filters(status, category_id, tag_id)
+    sql = ITEM_LIST_SELECT + where + " AND si.id IN (SELECT value FROM json_each(?))"
+    params.append(ids_param(item_ids))
+
+    with reader() as conn:
+        return {item.id: item for item in decode_study_items(conn.execute(sql, params))}
+
+
+def get_study_items_page(after=None, before=None, offset=0, limit=PAGE_SIZE,
+                         status=None, category_id=None, tag_id=None):
+    """Страница списка в порядке (status_rank, deadline_key, id)
+
+    after/before — ключ сортировки (см. item_sort_key) крайней строки
+    соседней страницы: следующая или предыдущая страница выбирается по
+    индексу без OFFSET. offset используется только для перехода к
+    произвольной позиции, например при перетаскивании ползунка.
+    Строки всегда возвращаются в прямом порядке.
+    """
+    where, params = _list_filters(status, category_id, tag_id)
+    sql = ITEM_LIST_SELECT + where
+
+    if after is not None:
+        sql += " AND (si.status_rank, si.deadline_key, si.id) > (?, ?, ?)"
+        params.extend(after)
+    elif before is not None:
+        sql += " AND (si.status_rank, si.deadline_key, si.id) < (?, ?, ?)"
+        params.extend(before)
+
+    if before is not None:
+        sql += " ORDER BY si.status_rank DESC, si.deadline_key DESC, si.id DESC LIMIT ?"
+        params.append(limit)
+    else:
+        sql += ITEM_LIST_ORDER + " LIMIT ? OFFSET ?"
+        params.extend([limit, offset if after is None else 0])
+
+    with reader() as conn:
+        rows = decode_study_items(conn.execute(sql, params).fetchall())
+
+    if before is not None:
+        rows.reverse()
+    return rows
+
+
+def get_study_item_by_id(item_id):
+    """Получение одного материала по ID"""
+    sql = f"SELECT {', '.join(ITEM_COLUMNS)} FROM study_items WHERE id = ?"
     sql_tags = """
     SELECT t.* FROM tags t
     JOIN study_item_tags sit ON t.id = sit.tag_id
     WHERE sit.study_item_id = ?
     """
-    cursor.execute(sql_tags, (item_id,))
-    tags = cursor.fetchall()
 
-    conn.close()
+    with reader() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = study_item_row
+        item = cursor.execute(sql, (item_id,)).fetchone()
+        tags = conn.execute(sql_tags, (item_id,)).fetchall()
+
     return item, tags
 
 
 def update_study_item(item_id, data):
-    """Обновление учебного материала"""
-    conn = create_connection()
-    cursor = conn.cursor()
+    """Обновление учебного материала
 
+    Без hours_spent в data часы не меняются: их могли увеличить сессии,
+    записанные, пока открыто окно редактирования.
+    """
     sql = '''
     UPDATE study_items
     SET title = ?, description = ?, category_id = ?, rating = ?,
-        status = ?, deadline = ?, hours_spent = ?, priority = ?
+        status = ?, deadline = ?, hours_spent = COALESCE(?, hours_spent), priority = ?
     WHERE id = ?
     '''
-    cursor.execute(sql, (
-        data['title'],
-        data['description'],
-        data['category_id'],
-        data['rating'],
-        data['status'],
-        data['deadline'],
-        data['hours_spent'],
-        data['priority'],
-        item_id
-    ))
-
-    cursor.execute(
-        "DELETE FROM study_item_tags WHERE study_item_id = ?", (item_id,))
-    if data.get('tags'):
-        for tag_id in data['tags']:
-            cursor.execute(
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, (
+            data['title'],
+            data['description'],
+            data['category_id'],
+            data['rating'],
+            data['status'],
+            data['deadline'],
+            data.get('hours_spent'),
+            data['priority'],
+            item_id
+        ))
+
+        set_item_tags(item_id, data.get('tags') or [])
+
+
+def get_upcoming_deadlines(date_from, date_to):
+    """Активные материалы с дедлайном в периоде (включительно) по
+    возрастанию дедлайна: [(id, название, дедлайн)]
+
+    Читается по индексу idx_study_items_deadline: отрезок дедлайнов уже
+    упорядочен, статус проверяется по тому же индексу.
+    """
+    statuses = ', '.join('?' * len(ACTIVE_STATUSES))
+    with reader() as conn:
+        return conn.execute(f"""
+            SELECT id, title, deadline FROM study_items
+            WHERE deadline BETWEEN ? AND ? AND status IN ({statuses})
+            ORDER BY deadline
+        """, (date_from, date_to) + ACTIVE_STATUSES).fetchall()
+
+
+def patch_study_items(item_ids, **fields):
+    """Изменение отдельных полей у одного или многих материалов
+
+    Выполняется одним UPDATE только переданных столбцов, теги не
+    трогаются. Строки, где значения уже совпадают, пропускаются, чтобы
+    не срабатывали триггеры. Возвращает число изменённых материалов.
+    """
+    unknown = set(fields) - PATCHABLE_COLUMNS
+    if unknown:
+        raise ValueError(f"Нельзя изменить поля: {', '.join(sorted(unknown))}")
+    if not fields or not item_ids:
+        return 0
+
+    columns = sorted(fields)
+    values = [fields[column] for column in columns]
+    sql = (
+        f"UPDATE study_items SET {', '.join(f'{column} = ?' for column in columns)}"
+        " WHERE id IN (SELECT value FROM json_each(?))"
+        f" AND NOT ({' AND '.join(f'{column} IS ?' for column in columns)})"
+    )
+    with transaction() as conn:
+        return conn.execute(sql, values + [ids_param(item_ids)] + values).rowcount
+
+
+def set_item_tags(item_id, tag_ids):
+    """Замена набора тегов материала
+
+    Меняются только расхождения с текущим набором: лишние связи
+    удаляются, недостающие добавляются, совпадающие не трогаются.
+    Возвращает (добавленные, удалённые) id тегов.
+    """
+    wanted = {int(tag_id) for tag_id in tag_ids}
+    with transaction() as conn:
+        current = {row[0] for row in conn.execute(
+            "SELECT tag_id FROM study_item_tags WHERE study_item_id = ?", (item_id,))}
+        added, removed = wanted - current, current - wanted
+        if removed:
+            conn.executemany(
+                "DELETE FROM study_item_tags WHERE study_item_id = ? AND tag_id = ?",
+                [(item_id, tag_id) for tag_id in removed]
+            )
+        if added:
+            conn.executemany(
                 "INSERT INTO study_item_tags (study_item_id, tag_id) VALUES (?, ?)",
-                (item_id, tag_id)
+                [(item_id, tag_id) for tag_id in added]
             )
+    return added, removed
 
-    conn.commit()
-    conn.close()
+
+def _item_selection(item_ids=None, status=None, category_id=None):
+    """Подзапрос id материалов: явный список и/или фильтры списка"""
+    where, params = _list_filters(status, category_id)
+    if item_ids is not None:
+        where += " AND si.id IN (SELECT value FROM json_each(?))"
+        params.append(ids_param(item_ids))
+    return "SELECT si.id FROM study_items si" + where, params
+
+
+def add_tag_to_items(tag_id, item_ids=None, status=None, category_id=None):
+    """Добавление тега материалам одним запросом; возвращает число новых связей
+
+    Материалы задаются списком item_ids и/или фильтрами status и
+    category_id; без них тег получают все материалы.
+    """
+    selection, params = _item_selection(item_ids, status, category_id)
+    with transaction() as conn:
+        return conn.execute(
+            f"""INSERT OR IGNORE INTO study_item_tags (study_item_id, tag_id)
+                SELECT id, ? FROM ({selection})""",
+            [tag_id] + params
+        ).rowcount
+
+
+def remove_tag_from_items(tag_id, item_ids=None, status=None, category_id=None):
+    """Снятие тега с материалов одним запросом; возвращает число удалённых связей
+
+    Выбор материалов как в add_tag_to_items.
+    """
+    selection, params = _item_selection(item_ids, status, category_id)
+    with transaction() as conn:
+        return conn.execute(
+            f"DELETE FROM study_item_tags WHERE tag_id = ? AND study_item_id IN ({selection})",
+            [tag_id] + params
+        ).rowcount
 
 
 def delete_study_item(item_id):
     """Удаление учебного материала"""
-    conn = create_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM study_items WHERE id = ?", (item_id,))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute("DELETE FROM study_items WHERE id = ?", (item_id,))
+
+
+def delete_study_items(item_ids):
+    """Удаление нескольких материалов одним запросом; возвращает число удалённых"""
+    with transaction() as conn:
+        return conn.execute(
+            "DELETE FROM study_items WHERE id IN (SELECT value FROM json_each(?))",
+            (ids_param(item_ids),)
+        ).rowcount
+
+
+class ReferenceCache:
+    """Категории и теги в памяти процесса
+
+    Справочники маленькие и меняются редко, а нужны почти каждому окну,
+    поэтому читаются целиком один раз и дальше отдаются из словарей
+    id -> строка и название -> id. Функции изменения категорий и тегов
+    сбрасывают кэш сами. Изменения из других процессов (и любые записи
+    в обход этих функций, например импорт) видны по PRAGMA data_version:
+    если он сдвинулся, сверяется счётчик reference_version, и только при
+    его изменении справочники перечитываются.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables = None
+        self._data_version = None
+        self._version = None
+
+    def invalidate(self):
+        """Сброс кэша; следующее обращение перечитает справочники"""
+        with self._lock:
+            self._tables = None
+
+    def table(self, name):
+        """Справочник 'categories' или 'tags': {'rows', 'by_id', 'by_name'}"""
+        with self._lock:
+            if self._tables is None or self._changed():
+                self._load()
+            return self._tables[name]
+
+    def _changed(self):
+        with get_manager().watcher() as conn:
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return False
+            self._data_version = data_version
+            version = conn.execute("SELECT version FROM reference_version").fetchone()[0]
+        return version != self._version
+
+    def _load(self):
+        with get_manager().watcher() as conn:
+            # Счётчик и строки читаются из одного снимка базы
+            conn.execute("BEGIN")
+            try:
+                data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+                version = conn.execute("SELECT version FROM reference_version").fetchone()[0]
+                tables = {
+                    name: conn.execute(f"SELECT * FROM {name} ORDER BY name").fetchall()
+                    for name in ('categories', 'tags')
+                }
+            finally:
+                conn.execute("COMMIT")
+
+        self._tables = {
+            name: {
+                'rows': rows,
+                'by_id': {row[0]: row for row in rows},
+                'by_name': {row[1]: row[0] for row in rows},
+            }
+            for name, rows in tables.items()
+        }
+        self._data_version = data_version
+        self._version = version
+
+
+_references = ReferenceCache()
+
+
+def invalidate_reference_cache():
+    """Сброс кэша категорий и тегов"""
+    _references.invalidate()
 
 
 def get_all_categories():
     """Получение всех категорий"""
-    conn = create_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM categories ORDER BY name")
-    categories = cursor.fetchall()
-    conn.close()
-    return categories
+    return list(_references.table('categories')['rows'])
+
+
+def get_category(category_id):
+    """Категория по id или None"""
+    return _references.table('categories')['by_id'].get(category_id)
+
+
+def get_category_id(name):
+    """id категории по названию или None"""
+    return _references.table('categories')['by_name'].get(name)
+
+
+def get_default_category():
+    """Категория по умолчанию, иначе первая по названию, или None"""
+    rows = _references.table('categories')['rows']
+    return next((cat for cat in rows if cat[4]), rows[0] if rows else None)
 
 
 def add_category(name, description, color, is_default=0):
     """Добавление категории"""
-    conn = create_connection()
-    cursor = conn.cursor()
+    with transaction() as conn:
+        cursor = conn.cursor()
 
-    if is_default:
-        cursor.execute("UPDATE categories SET is_default = 0")
+        if is_default:
+            cursor.execute("UPDATE categories SET is_default = 0")
 
-    cursor.execute(
-        "INSERT INTO categories (name, description, color, is_default) VALUES (?, ?, ?, ?)",
-        (name, description, color, is_default)
-    )
-    conn.commit()
-    category_id = cursor.lastrowid
-    conn.close()
+        cursor.execute(
+            "INSERT INTO categories (name, description, color, is_default) VALUES (?, ?, ?, ?)",
+            (name, description, color, is_default)
+        )
+        category_id = cursor.lastrowid
+    _references.invalidate()
     return category_id
 
 
 def update_category(category_id, name, description, color, is_default):
     """Обновление категории"""
-    conn = create_connection()
-    cursor = conn.cursor()
+    with transaction() as conn:
+        cursor = conn.cursor()
 
-    if is_default:
-        cursor.execute("UPDATE categories SET is_default = 0")
+        if is_default:
+            cursor.execute("UPDATE categories SET is_default = 0")
 
-    cursor.execute(
-        "UPDATE categories SET name = ?, description = ?, color = ?, is_default = ? WHERE id = ?",
-        (name, description, color, is_default, category_id)
-    )
-    conn.commit()
-    conn.close()
+        cursor.execute(
+            "UPDATE categories SET name = ?, description = ?, color = ?, is_default = ? WHERE id = ?",
+            (name, description, color, is_default, category_id)
+        )
+    _references.invalidate()
 
 
 def delete_category(category_id):
     """Удаление категории"""
-    conn = create_connection()
-    cursor = conn.cursor()
+    with transaction() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute(
-        "SELECT COUNT(*) FROM study_items WHERE category_id = ?", (category_id,))
-    if cursor.fetchone()[0] > 0:
-        # Если используется, спрашиваем подтверждение в GUI
-        pass
+        cursor.execute(
+            "SELECT COUNT(*) FROM study_items WHERE category_id = ?", (category_id,))
+        if cursor.fetchone()[0] > 0:
+            # Если используется, спрашиваем подтверждение в GUI
+            pass
 
-    cursor.execute("DELETE FROM categories WHERE id = ?", (category_id,))
-    conn.commit()
-    conn.close()
+        cursor.execute("DELETE FROM categories WHERE id = ?", (category_id,))
+    _references.invalidate()
 
 
 def get_all_tags():
     """Получение всех тегов"""
-    conn = create_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM tags ORDER BY name")
-    tags = cursor.fetchall()
-    conn.close()
-    return tags
+    return list(_references.table('tags')['rows'])
+
+
+def get_tag(tag_id):
+    """Тег по id или None"""
+    return _references.table('tags')['by_id'].get(tag_id)
+
+
+def get_tag_id(name):
+    """id тега по названию или None"""
+    return _references.table('tags')['by_name'].get(name)
 
 
 def add_tag(name, color):
     """Добавление тега"""
-    conn = create_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO tags (name, color) VALUES (?, ?)", (name, color))
-    conn.commit()
-    tag_id = cursor.lastrowid
-    conn.close()
+    with transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO tags (name, color) VALUES (?, ?)", (name, color))
+        tag_id = cursor.lastrowid
+    _references.invalidate()
     return tag_id
 
 
 def update_tag(tag_id, name, color):
     """Обновление тега"""
-    conn = create_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE tags SET name = ?, color = ? WHERE id = ?", (name, color, tag_id))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute(
+            "UPDATE tags SET name = ?, color = ? WHERE id = ?", (name, color, tag_id))
+    _references.invalidate()
 
 
 def delete_tag(tag_id):
     """Удаление тега"""
-    conn = create_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM tags WHERE id = ?", (tag_id,))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute("DELETE FROM tags WHERE id = ?", (tag_id,))
+    _references.invalidate()
+
+
+def add_study_session(item_id, duration_minutes, date=None, notes=None):
+    """Запись учебной сессии; часы материала увеличивает триггер"""
+    with transaction() as conn:
+        return conn.execute(
+            """INSERT INTO study_sessions (study_item_id, date, duration_minutes, notes)
+               VALUES (?, COALESCE(?, DATE('now', 'localtime')), ?, ?)""",
+            (item_id, date, duration_minutes, notes)
+        ).lastrowid
+
+
+def update_study_session(session_id, duration_minutes, date, notes=None):
+    """Изменение учебной сессии"""
+    with transaction() as conn:
+        conn.execute(
+            "UPDATE study_sessions SET duration_minutes = ?, date = ?, notes = ? WHERE id = ?",
+            (duration_minutes, date, notes, session_id)
+        )
 
 
-def search_study_items(query, status=None, category_id=None, tag_id=None):
-    """Поиск учебных материалов с фильтрацией"""
-    conn = create_connection()
-    cursor = conn.cursor()
+def delete_study_session(session_id):
+    """Удаление учебной сессии"""
+    with transaction() as conn:
+        conn.execute("DELETE FROM study_sessions WHERE id = ?", (session_id,))
+
+
+def _session_filters(item_id, date_from=None, date_to=None):
+    """Условия WHERE по материалу и периоду (включительно)"""
+    sql = " WHERE study_item_id = ?"
+    params = [item_id]
+
+    if date_from:
+        sql += " AND date >= ?"
+        params.append(date_from)
+
+    if date_to:
+        sql += " AND date <= ?"
+        params.append(date_to)
+
+    return sql, params
+
+
+def get_item_sessions(item_id, date_from=None, date_to=None):
+    """Сессии материала за период, новые первыми"""
+    where, params = _session_filters(item_id, date_from, date_to)
+    sql = ("SELECT id, study_item_id, date, duration_minutes, notes FROM study_sessions"
+           + where + " ORDER BY date DESC, id DESC")
+    with reader() as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def get_item_daily_minutes(item_id, date_from=None, date_to=None):
+    """Минуты занятий материалом по дням: [(дата, минуты)] по возрастанию даты"""
+    where, params = _session_filters(item_id, date_from, date_to)
+    sql = ("SELECT date, SUM(duration_minutes) FROM study_sessions"
+           + where + " GROUP BY date ORDER BY date")
+    with reader() as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def rollup_bucket(day, period):
+    """Корзина периода для даты, как в session_rollup"""
+    if period == 'day':
+        return day.isoformat()
+    if period == 'month':
+        return day.strftime('%Y-%m')
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def rollup_buckets(period, count, last_day):
+    """Последние count корзин периода по last_day включительно, по возрастанию"""
+    buckets = []
+    day = last_day
+    while len(buckets) < count:
+        bucket = rollup_bucket(day, period)
+        if not buckets or buckets[-1] != bucket:
+            buckets.append(bucket)
+        # Шаг назад на день, неделю или к последнему дню прошлого месяца
+        if period == 'day':
+            day -= datetime.timedelta(days=1)
+        elif period == 'week':
+            day -= datetime.timedelta(days=7)
+        else:
+            day = day.replace(day=1) - datetime.timedelta(days=1)
+    buckets.reverse()
+    return buckets
+
+
+@cached_query()
+def get_rollup_series(period, kind='category', since=None, keys=None):
+    """Минуты занятий по корзинам периода: {key: [(bucket, минуты)]}
+
+    since - первая корзина (см. rollup_bucket), keys - id категорий или
+    тегов; без keys - все. Читается только сводка, без сессий.
+    """
+    sql = "SELECT key, bucket, minutes FROM session_rollup WHERE period = ? AND kind = ?"
+    params = [period, kind]
+    if keys is not None:
+        sql += " AND key IN (SELECT value FROM json_each(?))"
+        params.append(ids_param(keys))
+    if since:
+        sql += " AND bucket >= ?"
+        params.append(since)
+    sql += " AND minutes != 0 ORDER BY key, bucket"
+
+    series = {}
+    with reader() as conn:
+        for key, bucket, minutes in conn.execute(sql, params):
+            series.setdefault(key, []).append((bucket, minutes))
+    return series
+
+
+# Маркеры подсветки совпадений во фрагментах поиска
+SNIPPET_START = '['
+SNIPPET_END = ']'
+
+_fts_enabled = None
+
+
+def fts_enabled():
+    """Есть ли в базе полнотекстовый индекс"""
+    global _fts_enabled
+    if _fts_enabled is None:
+        with reader() as conn:
+            _fts_enabled = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'study_items_fts'"
+            ).fetchone() is not None
+    return _fts_enabled
+
+
+def build_fts_query(text):
+    """Перевод пользовательского ввода в запрос FTS5
+
+    Фраза в двойных кавычках ищется целиком, остальные слова — по префиксу,
+    все условия объединяются через AND. Возвращает None, если искать нечего.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|([^\s"]+)', text):
+        if phrase:
+            tokens = re.findall(r'\w+', phrase)
+            if tokens:
+                terms.append('"' + ' '.join(tokens) + '"')
+        else:
+            tokens = re.findall(r'\w+', word)
+            terms.extend(f'"{token}"*' for token in tokens)
+    return ' AND '.join(terms) if terms else None
 
-    sql = """
-    SELECT DISTINCT
-        si.*,
-        c.name as category_name,
-        c.color as category_color,
-        GROUP_CONCAT(t.name, ', ') as tags
-    FROM study_items si
-    LEFT JOIN categories c ON si.category_id = c.id
-    LEFT JOIN study_item_tags sit ON si.id = sit.study_item_id
-    LEFT JOIN tags t ON sit.tag_id = t.id
-    WHERE 1=1
+
+# Комбинируемые диакритические знаки, которые отбрасывает remove_diacritics
+_DIACRITICS = re.compile('[\u0300-\u036f]')
+
+
+def fold_text(text):
+    """Текст в том виде, в котором его сравнивает полнотекстовый индекс
+
+    Регистр и диакритика (й, ё, é) не учитываются, как в токенизаторе
+    unicode61 с remove_diacritics.
+    """
+    return _DIACRITICS.sub('', unicodedata.normalize('NFD', text or '')).casefold()
+
+
+def search_terms(query, fts=None):
+    """Префиксные термы запроса для проверки совпадения в памяти
+
+    Запись подходит, если в её fold_text() для каждого терма есть слово,
+    начинающееся с него, как в FTS-запросе из build_fts_query(). None -
+    запрос так проверить нельзя: фраза в кавычках или поиск через LIKE.
+    fts - уже известный результат fts_enabled(), тогда база не читается.
     """
+    if fts is None:
+        fts = fts_enabled()
+    if not query or not fts or '"' in query:
+        return None
+    return re.findall(r'\w+', fold_text(query)) or None
+
+
+def build_search_query(query, status=None, category_id=None, tag_id=None,
+                       snippets=False, columns=ITEM_LIST_COLUMNS):
+    """SQL и параметры поиска с фильтрами
+
+    При текстовом запросе и наличии FTS5 результаты упорядочены по
+    релевантности bm25, иначе — по дедлайну. С snippets=True в конец
+    строки добавляется фрагмент текста с подсвеченными совпадениями.
+    columns заменяет список столбцов строки списка.
+    """
+    joins = ""
     params = []
+    order = " ORDER BY si.deadline ASC"
+
+    fts_query = build_fts_query(query) if query and fts_enabled() else None
+    if fts_query:
+        snippet_sql = ""
+        if snippets:
+            snippet_sql = (f", snippet(study_items_fts, -1, '{SNIPPET_START}', "
+                           f"'{SNIPPET_END}', '…', 12) AS snippet")
+            columns += ", m.snippet"
+        joins = f"""
+    JOIN (SELECT rowid, rank{snippet_sql}
+          FROM study_items_fts
+          WHERE study_items_fts MATCH ?) m ON m.rowid = si.id
+    """
+        params.append(fts_query)
+        order = " ORDER BY m.rank"
+    elif snippets:
+        columns += ", NULL as snippet"
 
-    if query:
+    where, filter_params = _list_filters(status, category_id, tag_id)
+    sql = "SELECT" + columns + ITEM_LIST_FROM + joins + where
+    params.extend(filter_params)
+
+    if query and not fts_query:
         sql += " AND (LOWER(si.title) LIKE LOWER(?) OR LOWER(si.description) LIKE LOWER(?))"
         params.extend([f'%{query}%', f'%{query}%'])
 
-    if status:
-        sql += " AND si.status = ?"
-        params.append(status)
+    sql += order
+    return sql, params
 
-    if category_id:
-        sql += " AND si.category_id = ?"
-        params.append(category_id)
 
-    if tag_id:
-        sql += " AND sit.tag_id = ?"
-        params.append(tag_id)
+@cached_query()
+def search_study_items(query, status=None, category_id=None, tag_id=None,
+                       snippets=False):
+    """Поиск учебных материалов с фильтрацией"""
+    sql, params = build_search_query(query, status, category_id, tag_id, snippets)
 
-    sql += " GROUP BY si.id ORDER BY si.deadline ASC"
+    with reader() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        return decode_study_items(cursor.fetchall())
 
-    cursor.execute(sql, params)
-    items = cursor.fetchall()
-    conn.close()
-    return items
 
+@cached_query()
+def search_study_item_ids(query, status=None, category_id=None, tag_id=None, interrupt=None):
+    """id найденных материалов в порядке релевантности вместе с текстом
 
+    Текст (название и описание) возвращается для уточнения результата
+    в памяти через search_matcher(). interrupt (QueryInterrupt) позволяет
+    прервать запрос, если результат больше не нужен.
+    """
+    sql, params = build_search_query(
+        query, status, category_id, tag_id,
+        columns=" si.id, si.title || ' ' || IFNULL(si.description, '')")
+
+    with reader() as conn:
+        # Внутри транзакции reader() отдаёт писателя - его не прерываем
+        if interrupt is None or get_manager().in_transaction():
+            return conn.execute(sql, params).fetchall()
+        with interrupt.running(conn):
+            return conn.execute(sql, params).fetchall()
+
+
+def get_search_snippet(query, item_id):
+    """Фрагмент текста материала с подсвеченными совпадениями запроса"""
+    fts_query = build_fts_query(query) if query and fts_enabled() else None
+    if not fts_query:
+        return None
+
+    with reader() as conn:
+        row = conn.execute(f"""
+            SELECT snippet(study_items_fts, -1, '{SNIPPET_START}', '{SNIPPET_END}', '…', 12)
+            FROM study_items_fts
+            WHERE study_items_fts MATCH ? AND rowid = ?
+        """, (fts_query, item_id)).fetchone()
+    return row[0] if row else None
+
+
+@cached_query(by_date=True)
 def get_statistics():
     """Получение статистики для отчета"""
-    conn = create_connection()
-    cursor = conn.cursor()
-    stats = {}
+    stats = {'total': 0, 'total_hours': 0, 'avg_rating': 0, 'by_status': {}}
 
-    # Общее количество
-    cursor.execute("SELECT COUNT(*) FROM study_items")
-    stats['total'] = cursor.fetchone()[0]
-
-    # По статусам
-    cursor.execute("""
-        SELECT status, COUNT(*)
-        FROM study_items
-        GROUP BY status
-    """)
-    stats['by_status'] = dict(cursor.fetchall())
-
-    # По категориям
-    cursor.execute("""
-        SELECT c.name, COUNT(*)
-        FROM study_items si
-        JOIN categories c ON si.category_id = c.id
-        GROUP BY c.name
-    """)
-    stats['by_category'] = dict(cursor.fetchall())
-
-    # Средний рейтинг
-    cursor.execute(
-        "SELECT AVG(rating) FROM study_items WHERE rating IS NOT NULL")
-    stats['avg_rating'] = cursor.fetchone()[0] or 0
-
-    # Всего часов
-    cursor.execute("SELECT SUM(hours_spent) FROM study_items")
-    stats['total_hours'] = cursor.fetchone()[0] or 0
+    with reader() as conn:
+        cursor = conn.cursor()
 
-    # Просроченные задачи
-    cursor.execute("""
-        SELECT COUNT(*) FROM study_items
-        WHERE deadline < DATE('now') AND status != 'completed'
-    """)
-    stats['overdue'] = cursor.fetchone()[0]
+        # Счётчики из сводной таблицы, которую поддерживают триггеры
+        cursor.execute("""
+            SELECT kind, key, count, total FROM study_item_stats
+            WHERE kind IN ('all', 'status', 'rating')
+        """)
+        for kind, key, count, total in cursor.fetchall():
+            if kind == 'all':
+                stats['total'] = count
+                stats['total_hours'] = round(total, 2)
+            elif kind == 'status' and count:
+                stats['by_status'][key] = count
+            elif kind == 'rating' and count:
+                stats['avg_rating'] = total / count
+
+        # По категориям
+        cursor.execute("""
+            SELECT c.name, s.count
+            FROM study_item_stats s
+            JOIN categories c ON c.id = s.key
+            WHERE s.kind = 'category' AND s.count > 0
+        """)
+        stats['by_category'] = dict(cursor.fetchall())
+
+        # Просроченные задачи: единственный запрос, зависящий от даты
+        cursor.execute("""
+            SELECT COUNT(*) FROM study_items
+            WHERE deadline < DATE('now') AND status != 'completed'
+        """)
+        stats['overdue'] = cursor.fetchone()[0]
 
-    conn.close()
     return stats
@@ -0,0 +1,280 @@
+"""Потоковый экспорт учебных материалов в CSV, JSON Lines и копию базы
+
+Строки читаются курсором через fetchmany и сразу пишутся в файл, поэтому
+расход памяти не зависит от размера базы. Все запросы выполняются в одной
+читающей транзакции и видят согласованный снимок данных. Файл пишется
+под временным именем и переименовывается только после успешного
+завершения; суффикс .gz включает сжатие.
+
+Форматы выбираются по расширению:
+    .csv    - материалы; учебные сессии в соседнем файле *.sessions.csv
+    .jsonl  - по объекту на материал, теги и сессии вложены в него
+    .db     - полная копия базы SQLite
+
+Запуск без GUI из корня проекта:
+    python exporter.py backup.jsonl.gz [--db study_tracker.db]
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import time
+
+import database as db
+
+FETCH_SIZE = 1000
+# Страниц базы за один шаг копирования
+BACKUP_PAGES = 1024
+# Уровень 6 сжимает почти как 9, но заметно быстрее
+GZIP_LEVEL = 6
+
+# Поля совпадают с теми, что понимает importer.py
+ITEM_FIELDS = ('id', 'title', 'description', 'category', 'rating', 'status',
+               'created_at', 'deadline', 'hours_spent', 'priority', 'tags')
+SESSION_FIELDS = ('id', 'study_item_id', 'date', 'duration_minutes', 'notes')
+
+ITEM_EXPORT_SQL = """
+    SELECT si.id, si.title, si.description, c.name, si.rating, si.status,
+           si.created_at, si.deadline, si.hours_spent, si.priority,
+           (SELECT json_group_array(t.name) FROM study_item_tags sit
+            JOIN tags t ON sit.tag_id = t.id
+            WHERE sit.study_item_id = si.id)
+    FROM study_items si
+    LEFT JOIN categories c ON si.category_id = c.id
+    ORDER BY si.id
+"""
+SESSION_EXPORT_SQL = """
+    SELECT id, study_item_id, date, duration_minutes, notes
+    FROM study_sessions
+    ORDER BY study_item_id, id
+"""
+# Для JSON Lines: сессии без материала вложить некуда
+ITEM_SESSION_EXPORT_SQL = """
+    SELECT id, study_item_id, date, duration_minutes, notes
+    FROM study_sessions
+    WHERE study_item_id IS NOT NULL
+    ORDER BY study_item_id, id
+"""
+
+
+class ExportCancelled(Exception):
+    """Экспорт остановлен через cancel_event"""
+
+
+def export_format(path):
+    """Формат по расширению файла без учёта .gz"""
+    name = path[:-3] if path.endswith('.gz') else path
+    suffix = os.path.splitext(name)[1].lower()
+    if suffix not in WRITERS:
+        raise ValueError(f"Неподдерживаемый формат файла: {suffix or path}")
+    return suffix
+
+
+def sessions_path(path):
+    """Имя файла сессий рядом с CSV материалов"""
+    compressed = path.endswith('.gz')
+    base = os.path.splitext(path[:-3] if compressed else path)[0]
+    return base + '.sessions.csv' + ('.gz' if compressed else '')
+
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, 'wb', compresslevel=GZIP_LEVEL),
+                                encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def _stream(conn, sql):
+    """Построчный обход результата запроса пачками по FETCH_SIZE"""
+    cursor = conn.execute(sql)
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+
+class _Progress:
+    def __init__(self, total, progress, cancel_event):
+        self.total = total
+        self.done = 0
+        self.progress = progress
+        self.cancel_event = cancel_event
+
+    def step(self):
+        """Учёт одной записи; раз в FETCH_SIZE записей - отчёт и проверка отмены"""
+        self.done += 1
+        if self.done % FETCH_SIZE == 0:
+            self.report()
+
+    def report(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ExportCancelled()
+        if self.progress:
+            self.progress(self.done, self.done / (self.total or 1))
+
+
+def _partial(path):
+    """Временное имя файла с сохранением суффикса .gz"""
+    if path.endswith('.gz'):
+        return path[:-3] + '.part.gz'
+    return path + '.part'
+
+
+def _remove(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _write_csv(conn, outputs, tracker):
+    items_out, sessions_out = outputs
+    with _open_text(items_out) as out:
+        writer = csv.writer(out)
+        writer.writerow(ITEM_FIELDS)
+        for row in _stream(conn, ITEM_EXPORT_SQL):
+            writer.writerow(row[:-1] + (','.join(json.loads(row[-1])),))
+            tracker.step()
+
+    sessions = 0
+    with _open_text(sessions_out) as out:
+        writer = csv.writer(out)
+        writer.writerow(SESSION_FIELDS)
+        for row in _stream(conn, SESSION_EXPORT_SQL):
+            writer.writerow(row)
+            sessions += 1
+            if sessions % FETCH_SIZE == 0:
+                tracker.report()
+    return sessions
+
+
+def _write_jsonl(conn, outputs, tracker):
+    # Сессии идут тем же порядком по id материала, что и сами материалы,
+    # и подклеиваются к ним слиянием двух курсоров
+    sessions = _stream(conn, ITEM_SESSION_EXPORT_SQL)
+    session = next(sessions, None)
+    count = 0
+
+    with _open_text(outputs[0]) as out:
+        for row in _stream(conn, ITEM_EXPORT_SQL):
+            item = dict(zip(ITEM_FIELDS, row))
+            item['tags'] = json.loads(item['tags'])
+            item['sessions'] = []
+            while session is not None and session[1] <= item['id']:
+                if session[1] == item['id']:
+                    item['sessions'].append(dict(zip(SESSION_FIELDS, session)))
+                    count += 1
+                session = next(sessions, None)
+
+            out.write(json.dumps(item, ensure_ascii=False))
+            out.write('\n')
+            tracker.step()
+    return count
+
+
+def _write_snapshot(conn, outputs, tracker):
+    path = outputs[0]
+    items = tracker.total
+
+    def report(status, remaining, pages):
+        # Ход копирования в страницах пересчитываем в записи
+        tracker.done = items * (pages - remaining) // (pages or 1)
+        tracker.report()
+
+    copy_path = path[:-3] if path.endswith('.gz') else path
+    target = sqlite3.connect(copy_path)
+    try:
+        conn.backup(target, pages=BACKUP_PAGES, progress=report)
+    finally:
+        target.close()
+
+    if copy_path != path:
+        with open(copy_path, 'rb') as src, gzip.open(path, 'wb', compresslevel=GZIP_LEVEL) as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(copy_path)
+
+    tracker.done = items
+    return 0
+
+
+WRITERS = {
+    '.csv': _write_csv,
+    '.jsonl': _write_jsonl,
+    '.db': _write_snapshot,
+    '.sqlite': _write_snapshot,
+}
+
+
+def export_file(path, progress=None, cancel_event=None):
+    """Экспорт базы в файл; возвращает отчёт о выгруженных записях
+
+    progress(exported, fraction) вызывается по ходу выгрузки, установка
+    cancel_event прерывает её и удаляет недописанные файлы.
+    """
+    write = WRITERS[export_format(path)]
+    paths = [path]
+    if write is _write_csv:
+        paths.append(sessions_path(path))
+    partials = [_partial(p) for p in paths]
+
+    report = {'exported': 0, 'sessions': 0, 'cancelled': False, 'paths': paths}
+    try:
+        with db.reader() as conn:
+            # Одна читающая транзакция: все запросы видят один снимок базы
+            conn.execute("BEGIN")
+            try:
+                total = conn.execute("SELECT COUNT(*) FROM study_items").fetchone()[0]
+                tracker = _Progress(total, progress, cancel_event)
+                report['sessions'] = write(conn, partials, tracker)
+                report['exported'] = tracker.done
+            finally:
+                conn.execute("COMMIT")
+    except ExportCancelled:
+        report['cancelled'] = True
+    except BaseException:
+        _remove(partials)
+        raise
+
+    if report['cancelled']:
+        _remove(partials)
+    else:
+        for partial, final in zip(partials, paths):
+            os.replace(partial, final)
+
+    if progress and not report['cancelled']:
+        progress(report['exported'], 1.0)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Экспорт учебных материалов в CSV, JSON Lines или копию базы")
+    parser.add_argument('path', help="файл .csv, .jsonl или .db, можно сжатый .gz")
+    parser.add_argument('--db', default=db.DB_NAME, help="файл базы данных")
+    args = parser.parse_args()
+
+    db.use_database(args.db)
+
+    start = time.perf_counter()
+    try:
+        report = export_file(
+            args.path,
+            progress=lambda count, fraction: print(f"\rВыгружено: {count} ({fraction:.0%})",
+                                                   end='', flush=True))
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"\nОшибка экспорта: {e}")
+        return 1
+
+    print(f"\nГотово за {time.perf_counter() - start:.1f} с: материалов {report['exported']}, "
+          f"сессий {report['sessions']}")
+    for path in report['paths']:
+        print(f"  {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,20 @@
-from .main_window import MainWindow
-from .add_edit_dialog import AddEditDialog
-from .categories_dialog import CategoriesDialog
-from .tags_dialog import TagsDialog
+import importlib
+
+# Окна импортируются при первом обращении: запуск не ждёт диалогов,
+# которые могут и не понадобиться
+_MODULES = {
+    'MainWindow': '.main_window',
+    'AddEditDialog': '.add_edit_dialog',
+    'CategoriesDialog': '.categories_dialog',
+    'TagsDialog': '.tags_dialog',
+}
 
 __all__ = ['MainWindow', 'AddEditDialog', 'CategoriesDialog', 'TagsDialog']
+
+
+def __getattr__(name):
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_MODULES[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -33,6 +33,7 @@ class AddEditDialog:
         default_deadline = (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d")
         self.deadline_var = tk.StringVar(value=default_deadline)
         self.hours_var = tk.DoubleVar(value=0)
+        self.loaded_hours = None
         self.priority_var = tk.IntVar(value=3)
         
         # Для тегов
@@ -147,8 +148,7 @@ class AddEditDialog:
         # Категория
         self.create_label(fields_frame, "Категория", 2)
         
-        categories = db.get_all_categories()
-        category_list = [cat[1] for cat in categories]
+        category_list = [cat[1] for cat in db.get_all_categories()]
         
         if category_list:
             self.category_combo = ttk.Combobox(fields_frame, textvariable=self.category_var, 
@@ -157,14 +157,7 @@ class AddEditDialog:
             self.category_combo.grid(row=2, column=1, columnspan=3, sticky=tk.W, pady=5)
             
             # Выбираем категорию по умолчанию
-            default_selected = False
-            for cat in categories:
-                if len(cat) > 4 and cat[4]:  # is_default
-                    self.category_var.set(cat[1])
-                    default_selected = True
-                    break
-            if not default_selected and categories:
-                self.category_var.set(categories[0][1])
+            self.category_var.set(db.get_default_category()[1])
         
         # Статус
         self.create_label(fields_frame, "Статус", 3)
@@ -301,30 +294,30 @@ class AddEditDialog:
             item, tags = None, []
         
         if item:
-            self.title_var.set(item[1] if item[1] else "")
+            self.title_var.set(item.title or "")
             
-            if self.description_text and len(item) > 2 and item[2]:
+            if self.description_text and item.description:
                 self.description_text.delete('1.0', tk.END)
-                self.description_text.insert('1.0', item[2])
+                self.description_text.insert('1.0', item.description)
             
             # Получаем название категории
-            if len(item) > 3 and item[3]:
-                categories = db.get_all_categories()
-                for cat in categories:
-                    if cat[0] == item[3]:
-                        self.category_var.set(cat[1])
-                        break
+            if item.category_id:
+                category = db.get_category(item.category_id)
+                if category:
+                    self.category_var.set(category[1])
             
-            if len(item) > 4 and item[4]:
-                self.rating_var.set(item[4])
-            if len(item) > 5 and item[5]:
-                self.status_var.set(item[5])
-            if len(item) > 7 and item[7]:
-                self.deadline_var.set(item[7])
-            if len(item) > 8 and item[8]:
-                self.hours_var.set(item[8])
-            if len(item) > 9 and item[9]:
-                self.priority_var.set(item[9])
+            if item.rating:
+                self.rating_var.set(item.rating)
+            if item.status:
+                self.status_var.set(item.status)
+            if item.deadline:
+                self.deadline_var.set(item.deadline)
+            if item.hours_spent:
+                self.hours_var.set(round(item.hours_spent, 2))
+            # Часы, которые пользователь не трогал, при сохранении не пишутся
+            self.loaded_hours = self.hours_var.get()
+            if item.priority:
+                self.priority_var.set(item.priority)
             
             # Отмечаем теги
             if tags:
@@ -344,11 +337,7 @@ class AddEditDialog:
         category_id = None
         category_name = self.category_var.get()
         if category_name:
-            categories = db.get_all_categories()
-            for cat in categories:
-                if cat[1] == category_name:
-                    category_id = cat[0]
-                    break
+            category_id = db.get_category_id(category_name)
         
         # Получаем выбранные теги
         selected_tags = [tag_id for tag_id, var in self.tag_vars.items() if var.get()]
@@ -368,6 +357,12 @@ class AddEditDialog:
                                    parent=self.dialog)
                 return
         
+        try:
+            hours = self.hours_var.get()
+        except tk.TclError:
+            messagebox.showerror("Ошибка", "Часы должны быть числом", parent=self.dialog)
+            return
+        
         # Собираем данные
         data = {
             'title': self.title_var.get().strip(),
@@ -376,21 +371,23 @@ class AddEditDialog:
             'rating': self.rating_var.get(),
             'status': self.status_var.get(),
             'deadline': deadline if deadline else None,
-            'hours_spent': self.hours_var.get(),
+            'hours_spent': hours if hours != self.loaded_hours else None,
             'priority': self.priority_var.get(),
             'tags': selected_tags
         }
         
         try:
             if self.item_id:
-                db.update_study_item(self.item_id, data)
+                db.write(db.update_study_item, self.item_id, data)
+                item_id = self.item_id
                 messagebox.showinfo("Успех", "Запись успешно обновлена", parent=self.dialog)
             else:
-                db.add_study_item(data)
+                item_id = db.write(db.add_study_item, data)
                 messagebox.showinfo("Успех", "Запись успешно добавлена", parent=self.dialog)
             
+            # Сообщаем id изменённой записи для точечного обновления таблицы
             if self.callback:
-                self.callback()
+                self.callback(item_id)
             self.on_close()
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось сохранить запись:\n{str(e)}", 
@@ -113,7 +113,7 @@ class CategoriesDialog:
 
         if messagebox.askyesno("Подтверждение", "Вы уверены, что хотите удалить эту категорию?"):
             category_id = self.tree.item(selected[0])['values'][0]
-            db.delete_category(category_id)
+            db.write(db.delete_category, category_id)
             self.load_categories()
             if self.callback:
                 self.callback()
@@ -136,11 +136,11 @@ class CategoryEditDialog:
         self.color_var = tk.StringVar(value="#3498db")
         self.default_var = tk.BooleanVar()
 
+        self.setup_ui()
+
         if category_id:
             self.load_category()
 
-        self.setup_ui()
-
     def setup_ui(self):
         main_frame = ttk.Frame(self.dialog, padding=20)
         main_frame.pack(fill=tk.BOTH, expand=True)
@@ -188,15 +188,13 @@ class CategoryEditDialog:
             self.color_btn.config(bg=color[1])
 
     def load_category(self):
-        categories = db.get_all_categories()
-        for cat in categories:
-            if cat[0] == self.category_id:
-                self.name_var.set(cat[1])
-                self.description_var.set(cat[2])
-                self.color_var.set(cat[3])
-                self.default_var.set(cat[4])
-                self.color_btn.config(bg=cat[3])
-                break
+        cat = db.get_category(self.category_id)
+        if cat:
+            self.name_var.set(cat[1])
+            self.description_var.set(cat[2])
+            self.color_var.set(cat[3])
+            self.default_var.set(cat[4])
+            self.color_btn.config(bg=cat[3])
 
     def save(self):
         if not self.name_var.get().strip():
@@ -205,7 +203,8 @@ class CategoryEditDialog:
 
         try:
             if self.category_id:
-                db.update_category(
+                db.write(
+                    db.update_category,
                     self.category_id,
                     self.name_var.get().strip(),
                     self.description_var.get().strip(),
@@ -213,7 +212,8 @@ class CategoryEditDialog:
                     self.default_var.get()
                 )
             else:
-                db.add_category(
+                db.write(
+                    db.add_category,
                     self.name_var.get().strip(),
                     self.description_var.get().strip(),
                     self.color_var.get(),
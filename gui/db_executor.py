@@ -0,0 +1,126 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DbExecutor:
+    """Выполнение запросов к базе в рабочих потоках
+
+    Готовые результаты складываются в очередь, которая разбирается в
+    потоке Tk через root.after, поэтому обработчики on_done/on_error
+    всегда вызываются из главного цикла. Новая задача с тем же ключом
+    отменяет предыдущую: если та уже выполняется, её результат будет
+    отброшен как устаревший, а переданный с ней interrupt() вызван,
+    чтобы долгий запрос не занимал рабочий поток и читателя базы.
+    """
+
+    POLL_MS = 15
+
+    def __init__(self, root, on_busy=None, workers=2):
+        self.root = root
+        self.on_busy = on_busy
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='db')
+        self.results = queue.Queue()
+        self.calls = queue.Queue()
+        self.latest = {}
+        self.interrupts = {}
+        self.pending = 0
+        self._poll_id = None
+
+    def submit(self, func, *args, on_done=None, on_error=None, key=None, interrupt=None,
+               **kwargs):
+        """Запуск func(*args, **kwargs) в рабочем потоке
+
+        interrupt - функция без аргументов, прерывающая уже начатую
+        задачу с ключом при её отмене (например, QueryInterrupt.interrupt).
+        """
+        if key is not None:
+            self.cancel(key)
+
+        future = self.pool.submit(func, *args, **kwargs)
+        if key is not None:
+            self.latest[key] = future
+            if interrupt is not None:
+                self.interrupts[key] = interrupt
+
+        self.pending += 1
+        future.add_done_callback(
+            lambda f: self.results.put((f, key, on_done, on_error)))
+
+        self._notify_busy()
+        self._schedule_poll()
+        return future
+
+    def call_soon(self, func, *args):
+        """Вызов func(*args) в потоке Tk; можно вызывать из рабочего потока
+
+        Очередь разбирается, пока есть незавершённые задачи, поэтому
+        так задача сообщает о ходе выполнения.
+        """
+        self.calls.put((func, args))
+
+    def cancel(self, key):
+        """Отмена последней задачи с ключом"""
+        future = self.latest.pop(key, None)
+        interrupt = self.interrupts.pop(key, None)
+        if future is not None and not future.cancel() and interrupt is not None:
+            # Задача уже выполняется: прерываем её запрос
+            interrupt()
+
+    def _schedule_poll(self):
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.POLL_MS, self._drain)
+
+    def _drain(self):
+        self._poll_id = None
+        while True:
+            try:
+                func, args = self.calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Ошибка обработки результата запроса: {e}")
+
+        while True:
+            try:
+                future, key, on_done, on_error = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            self.pending -= 1
+            if key is not None:
+                if self.latest.get(key) is not future:
+                    # Задачу вытеснила более новая с тем же ключом
+                    continue
+                del self.latest[key]
+                self.interrupts.pop(key, None)
+            if future.cancelled():
+                continue
+
+            error = future.exception()
+            try:
+                if error is not None:
+                    if on_error:
+                        on_error(error)
+                    else:
+                        print(f"Ошибка фонового запроса: {error}")
+                elif on_done:
+                    on_done(future.result())
+            except Exception as e:
+                print(f"Ошибка обработки результата запроса: {e}")
+
+        self._notify_busy()
+        if self.pending > 0:
+            self._schedule_poll()
+
+    def _notify_busy(self):
+        if self.on_busy:
+            self.on_busy(self.pending)
+
+    def shutdown(self):
+        """Остановка рабочих потоков без ожидания незавершённых задач"""
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self.pool.shutdown(wait=False, cancel_futures=True)
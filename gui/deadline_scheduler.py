@@ -0,0 +1,178 @@
+import datetime
+import heapq
+import itertools
+import time
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database as db
+
+
+class DeadlineScheduler:
+    """Напоминания о дедлайнах и перекраска строк при наступлении просрочки
+
+    Активные материалы с дедлайном на HORIZON_DAYS вперёд читаются
+    одним запросом по индексу, их события лежат в куче по времени:
+    напоминания в полночь за REMIND_DAYS дней до дедлайна и просрочка в
+    полночь после него. Один таймер root.after заведён на ближайшее
+    событие, опроса нет. Незадолго до конца горизонта в куче стоит
+    событие перечитывания.
+
+    Изменённые материалы передаются в update(): их дедлайны
+    перечитываются по id, и в кучу добавляются новые события. Старые
+    события не удаляются, а отбрасываются при извлечении, если дедлайн
+    материала уже другой.
+    """
+
+    HORIZON_DAYS = 14
+    # За сколько дней до дедлайна напоминать (0 — в сам день)
+    REMIND_DAYS = (1, 0)
+    # Таймер не длиннее часа: часы могли перевести или компьютер спал
+    MAX_DELAY_MS = 3600 * 1000
+    # Больше изменённых материалов — дешевле перечитать весь горизонт
+    UPDATE_LIMIT = 500
+
+    def __init__(self, root, executor, on_reminder=None, on_overdue=None, now=time.time):
+        self.root = root
+        self.executor = executor
+        self.on_reminder = on_reminder  # ([(id, название, дедлайн, дней до него)])
+        self.on_overdue = on_overdue    # ([id]) — у материалов наступила просрочка
+        self.now = now
+        self.deadlines = {}  # id -> (дедлайн, название)
+        self.heap = []       # (время, номер, событие, id, дедлайн)
+        self.reminded = set()  # (id, дедлайн, дней до него) уже показанных напоминаний
+        self.horizon = None  # (первый, последний) день загруженных дедлайнов
+        self._counter = itertools.count()
+        self._after_id = None
+
+    def today(self):
+        return datetime.date.fromtimestamp(self.now())
+
+    @staticmethod
+    def midnight(day):
+        """Начало дня по местному времени как отметка time.time()"""
+        return datetime.datetime.combine(day, datetime.time()).timestamp()
+
+    def reload(self):
+        """Перечитывание дедлайнов горизонта в рабочем потоке"""
+        first = self.today()
+        last = first + datetime.timedelta(days=self.HORIZON_DAYS)
+        self.executor.submit(
+            db.get_upcoming_deadlines, first.isoformat(), last.isoformat(),
+            key='deadlines',
+            on_done=lambda rows: self.load(first, last, rows),
+            on_error=lambda e: print(f"Ошибка загрузки дедлайнов: {e}")
+        )
+
+    def load(self, first, last, rows):
+        """Новая куча по строкам get_upcoming_deadlines за [first, last]"""
+        self.horizon = (first.isoformat(), last.isoformat())
+        self.deadlines = {item_id: (deadline, title) for item_id, title, deadline in rows}
+        self.heap = []
+        for item_id, (deadline, _) in self.deadlines.items():
+            self.heap.extend(self._events(item_id, deadline))
+        # Перечитывание до того, как начнутся напоминания за пределами горизонта
+        reload_day = last - datetime.timedelta(days=max(self.REMIND_DAYS))
+        self.heap.append((self.midnight(reload_day), next(self._counter), 'reload', None, None))
+        heapq.heapify(self.heap)
+        self.reminded = {key for key in self.reminded if key[0] in self.deadlines}
+        self._reschedule()
+
+    def _events(self, item_id, deadline):
+        """События материала; прошедшие до сегодняшнего дня пропускаются,
+        чтобы напоминание «завтра» не пришло вместе с «сегодня»"""
+        day = datetime.date.fromisoformat(deadline)
+        today_start = self.midnight(self.today())
+        events = []
+        for days in self.REMIND_DAYS:
+            when = self.midnight(day - datetime.timedelta(days=days))
+            if when >= today_start:
+                events.append((when, next(self._counter), days, item_id, deadline))
+        when = self.midnight(day + datetime.timedelta(days=1))
+        events.append((when, next(self._counter), 'overdue', item_id, deadline))
+        return events
+
+    def update(self, item_ids):
+        """Учёт изменённых, добавленных или удалённых материалов"""
+        if self.horizon is None:
+            return
+        if len(item_ids) > self.UPDATE_LIMIT:
+            self.reload()
+            return
+        item_ids = list(item_ids)
+        self.executor.submit(
+            db.get_study_items_by_ids, item_ids,
+            on_done=lambda rows: self.apply(item_ids, rows),
+            on_error=lambda e: print(f"Ошибка обновления дедлайнов: {e}")
+        )
+
+    def apply(self, item_ids, rows):
+        """Замена дедлайнов материалов свежими строками {id: StudyItem}"""
+        first, last = self.horizon
+        for item_id in item_ids:
+            item = rows.get(item_id)
+            deadline = item.deadline if item is not None else None
+            if (not deadline or item.status not in db.ACTIVE_STATUSES
+                    or not first <= deadline <= last):
+                self.deadlines.pop(item_id, None)
+                continue
+            if self.deadlines.get(item_id, (None,))[0] != deadline:
+                for event in self._events(item_id, deadline):
+                    heapq.heappush(self.heap, event)
+            self.deadlines[item_id] = (deadline, item.title)
+
+        # Отброшенные события копятся в куче при частых правках
+        if len(self.heap) > 4 * (len(self.deadlines) + 1) * len(self.REMIND_DAYS):
+            self.heap = [event for event in self.heap if self._valid(event)]
+            heapq.heapify(self.heap)
+        self._reschedule()
+
+    def _valid(self, event):
+        _, _, _, item_id, deadline = event
+        return item_id is None or self.deadlines.get(item_id, (None,))[0] == deadline
+
+    def _reschedule(self):
+        """Один таймер на ближайшее действующее событие"""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        while self.heap and not self._valid(self.heap[0]):
+            heapq.heappop(self.heap)
+        if not self.heap:
+            return
+        delay = int((self.heap[0][0] - self.now()) * 1000)
+        self._after_id = self.root.after(max(0, min(delay, self.MAX_DELAY_MS)), self._fire)
+
+    def _fire(self):
+        """Обработка наступивших событий"""
+        self._after_id = None
+        now = self.now()
+        reminders, overdue, reload = [], [], False
+        while self.heap and self.heap[0][0] <= now:
+            event = heapq.heappop(self.heap)
+            if not self._valid(event):
+                continue
+            _, _, kind, item_id, deadline = event
+            if kind == 'reload':
+                reload = True
+            elif kind == 'overdue':
+                overdue.append(item_id)
+                self.deadlines.pop(item_id, None)
+            elif (item_id, deadline, kind) not in self.reminded:
+                self.reminded.add((item_id, deadline, kind))
+                reminders.append((item_id, self.deadlines[item_id][1], deadline, kind))
+
+        if reminders and self.on_reminder:
+            self.on_reminder(reminders)
+        if overdue and self.on_overdue:
+            self.on_overdue(overdue)
+        if reload:
+            self.reload()
+        else:
+            self._reschedule()
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
@@ -0,0 +1,161 @@
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import profiler
+
+
+class DiagnosticsWindow:
+    """Окно «Диагностика»: замеры профилировщика слоя данных
+
+    Сводка строится в рабочем потоке: для новых запросов снимается
+    EXPLAIN QUERY PLAN. Запросы с полным просмотром большой таблицы
+    стоят первыми и выделены цветом.
+    """
+
+    # Столбики гистограммы по возрастанию; пустая корзина - точка
+    BARS = "▁▂▃▄▅▆▇█"
+
+    def __init__(self, parent, executor):
+        self.executor = executor
+        self.profiler = profiler.get_profiler()
+
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Диагностика")
+        self.dialog.geometry("1000x550")
+        self.dialog.transient(parent)
+
+        self.enabled_var = tk.BooleanVar(value=self.profiler.enabled)
+        self.setup_ui()
+        self.refresh()
+
+    def setup_ui(self):
+        main_frame = ttk.Frame(self.dialog, padding=10)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        top_frame = ttk.Frame(main_frame)
+        top_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Checkbutton(top_frame, text="Профилирование запросов", variable=self.enabled_var,
+                        command=self.toggle).pack(side=tk.LEFT)
+        ttk.Button(top_frame, text="Обновить", command=self.refresh).pack(side=tk.LEFT, padx=5)
+        ttk.Button(top_frame, text="Сбросить", command=self.reset).pack(side=tk.LEFT)
+        ttk.Button(top_frame, text="Сохранить JSON...", command=self.save).pack(side=tk.LEFT, padx=5)
+        self.status_label = ttk.Label(top_frame, text="")
+        self.status_label.pack(side=tk.RIGHT)
+
+        notebook = ttk.Notebook(main_frame)
+        notebook.pack(fill=tk.BOTH, expand=True)
+
+        columns = ('calls', 'p50', 'p95', 'p99', 'max', 'rows', 'histogram')
+        self.functions_tree = self._tree(notebook, columns, {
+            '#0': ("Функция", 200),
+            'calls': ("Вызовов", 70),
+            'p50': ("p50, мс", 70),
+            'p95': ("p95, мс", 70),
+            'p99': ("p99, мс", 70),
+            'max': ("Макс., мс", 80),
+            'rows': ("Строк", 70),
+            'histogram': (self._histogram_heading(), 250),
+        })
+        notebook.add(self.functions_tree.master, text="Функции")
+
+        columns = ('executions', 'functions', 'sql')
+        self.statements_tree = self._tree(notebook, columns, {
+            '#0': ("План", 220),
+            'executions': ("Выполнений", 80),
+            'functions': ("Функции", 180),
+            'sql': ("Запрос", 600),
+        })
+        self.statements_tree.tag_configure('scan', foreground='#c0392b')
+        notebook.add(self.statements_tree.master, text="Запросы")
+
+    @staticmethod
+    def _tree(parent, columns, headings):
+        frame = ttk.Frame(parent)
+        tree = ttk.Treeview(frame, columns=columns, show='tree headings')
+        for column, (text, width) in headings.items():
+            tree.heading(column, text=text, anchor=tk.W)
+            tree.column(column, width=width, stretch=column in ('sql', 'histogram'))
+        vsb = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        return tree
+
+    @staticmethod
+    def _histogram_heading():
+        bounds = profiler.HISTOGRAM_BOUNDS_MS
+        return f"Гистограмма {bounds[0]:g}…{bounds[-1]:g}+ мс"
+
+    def histogram_text(self, counts):
+        """Гистограмма строкой столбиков, по символу на корзину"""
+        top = max(counts) or 1
+        return ''.join(self.BARS[(count * len(self.BARS) - 1) // top] if count else '·'
+                       for count in counts)
+
+    def toggle(self):
+        if self.enabled_var.get():
+            self.profiler.enable()
+        else:
+            self.profiler.disable()
+        self.refresh()
+
+    def reset(self):
+        self.profiler.reset()
+        self.refresh()
+
+    def refresh(self):
+        """Построение сводки в рабочем потоке"""
+        self.status_label.config(text="Обновление...")
+        self.executor.submit(
+            self.profiler.report, key='diagnostics',
+            on_done=self.show,
+            on_error=lambda e: self.status_label.config(text=f"Ошибка: {e}")
+        )
+
+    def show(self, report):
+        if not self.dialog.winfo_exists():
+            return
+        for tree in (self.functions_tree, self.statements_tree):
+            tree.delete(*tree.get_children())
+
+        for name, stats in report['functions'].items():
+            self.functions_tree.insert('', tk.END, text=name, values=(
+                stats['calls'], stats['p50_ms'], stats['p95_ms'], stats['p99_ms'],
+                stats['max_ms'], '-' if stats['avg_rows'] is None else stats['avg_rows'],
+                self.histogram_text(stats['histogram']),
+            ))
+
+        scans = 0
+        for statement in report['statements']:
+            if statement['full_scans']:
+                scans += 1
+                plan, tags = "⚠ " + "; ".join(statement['full_scans']), ('scan',)
+            else:
+                plan, tags = "", ()
+            self.statements_tree.insert('', tk.END, text=plan, tags=tags, values=(
+                statement['executions'], ', '.join(statement['functions']), statement['sql'],
+            ))
+
+        state = "включено" if report['enabled'] else "выключено"
+        cache = report['query_cache']
+        self.status_label.config(
+            text=f"Профилирование {state} | функций: {len(report['functions'])} | "
+                 f"запросов: {len(report['statements'])} | с полным просмотром: {scans} | "
+                 f"кэш запросов: {cache['hits']} попаданий, {cache['misses']} промахов")
+
+    def save(self):
+        """Сохранение сводки в JSON для разбора вне приложения"""
+        path = filedialog.asksaveasfilename(
+            parent=self.dialog, title="Сохранить диагностику",
+            defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+        self.executor.submit(
+            self.profiler.dump, path, key='diagnostics_dump',
+            on_done=lambda result: self.status_label.config(text=f"Сохранено: {path}"),
+            on_error=lambda e: messagebox.showerror(
+                "Ошибка", f"Не удалось сохранить диагностику:\n{str(e)}", parent=self.dialog)
+        )
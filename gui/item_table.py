@@ -0,0 +1,553 @@
+import tkinter as tk
+from tkinter import ttk
+from datetime import date
+import bisect
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database as db
+
+STATUS_TEXTS = {
+    'planned': '📅 Запланировано',
+    'in_progress': '⚡ В процессе',
+    'completed': '✅ Завершено',
+    'on_hold': '⏸ На паузе'
+}
+
+
+def format_item(item, current_date):
+    """Значения колонок и тег цвета для строки списка (db.StudyItem)
+
+    current_date — сегодняшняя дата строкой ГГГГ-ММ-ДД: даты в этом
+    формате сравниваются как строки, без разбора на каждой строке.
+    """
+    status = item.status or ''
+    deadline = item.deadline
+
+    rating_val = item.rating or 0
+    priority_val = item.priority or 3
+    hours = item.hours_spent or 0
+
+    values = (
+        item.id,
+        item.title or '',
+        item.category_name or 'Без категории',
+        STATUS_TEXTS.get(status, status),
+        '★' * rating_val if rating_val else '-',
+        deadline or '-',
+        f"{round(hours, 2):g} ч",
+        '⚡' * priority_val,
+        item.tags or ''
+    )
+
+    # Определяем тег для цвета строки
+    row_tag = status
+    if deadline and status in db.ACTIVE_STATUSES and deadline < current_date:
+        row_tag = 'overdue'
+
+    return values, (row_tag,)
+
+
+class KeysetSource:
+    """Список под фильтрами: страницы выбираются по ключу сортировки"""
+
+    # Строки упорядочены по item_sort_key, новые строки встают на своё место
+    ordered = True
+
+    def __init__(self, status=None, category_id=None, tag_id=None):
+        self.filters = {'status': status, 'category_id': category_id, 'tag_id': tag_id}
+
+    def count(self):
+        return db.count_study_items(**self.filters)
+
+    def count_before(self, item):
+        return db.count_study_items(before=db.item_sort_key(item), **self.filters)
+
+    def all_ids(self):
+        return db.get_study_item_ids(**self.filters)
+
+    def fetch_ids(self, item_ids):
+        return db.get_study_items_by_ids(item_ids, **self.filters)
+
+    def fetch_at(self, position, limit):
+        return db.get_study_items_page(offset=position, limit=limit, **self.filters)
+
+    def fetch_after(self, item, position, limit):
+        return db.get_study_items_page(after=db.item_sort_key(item), limit=limit, **self.filters)
+
+    def fetch_before(self, item, position, limit):
+        return db.get_study_items_page(before=db.item_sort_key(item), limit=limit, **self.filters)
+
+
+class ResultSource:
+    """Готовый упорядоченный список id, например результаты поиска
+
+    Строки окна читаются по id той страницы, которая нужна таблице.
+    """
+
+    # Порядок задан заранее: строки обновляются на месте, новые не добавляются
+    ordered = False
+
+    def __init__(self, item_ids, status=None, category_id=None):
+        self.item_ids = list(item_ids)
+        self.filters = {'status': status, 'category_id': category_id}
+
+    def count(self):
+        return len(self.item_ids)
+
+    def all_ids(self):
+        return list(self.item_ids)
+
+    def fetch_ids(self, item_ids):
+        return db.get_study_items_by_ids(item_ids, **self.filters)
+
+    def apply(self, fresh, item_ids):
+        """Удаление записей, которые исчезли или перестали подходить под фильтры"""
+        gone = set(item_ids) - set(fresh)
+        if gone:
+            self.item_ids = [item_id for item_id in self.item_ids if item_id not in gone]
+
+    def fetch_at(self, position, limit):
+        page = self.item_ids[max(0, position):position + limit]
+        rows = self.fetch_ids(page)
+        return [rows[item_id] for item_id in page if item_id in rows]
+
+    def fetch_after(self, item, position, limit):
+        return self.fetch_at(position, limit)
+
+    def fetch_before(self, item, position, limit):
+        return self.fetch_at(max(0, position - limit), min(limit, position))
+
+
+class ItemTable:
+    """Таблица материалов в виртуальном режиме
+
+    В Treeview хранится только окно из нескольких страниц вокруг видимой
+    области. При прокрутке к краю окна соседняя страница подгружается
+    из источника, а дальняя удаляется; ползунок показывает позицию
+    во всём списке по количеству строк из COUNT.
+
+    Выделение живёт в Treeview и ограничено окном; «выделить все»
+    запоминается флагом all_selected, и тогда выделенными считаются
+    все строки источника, включая не загруженные.
+    """
+
+    WINDOW_PAGES = 3
+    EDGE_FRACTION = 0.15
+
+    # Ключи фоновых запросов таблицы: новый запрос вытесняет старый с тем же ключом
+    FETCH_KEY = 'item_table'
+    REFRESH_KEY = 'item_table_refresh'
+    OFFSET_KEY = 'item_table_offset'
+    SELECTION_KEY = 'item_table_selection'
+
+    def __init__(self, parent, page_size=db.PAGE_SIZE, executor=None):
+        self.page_size = page_size
+        self.executor = executor
+        self.source = None
+        self.rows = []
+        self.offset = 0  # позиция первой строки окна во всём списке
+        self.total = 0
+        self._loading = False
+        self._extending = False
+        self._pending_refresh = set()  # id, ждущие точечного обновления
+        self.all_selected = False
+
+        columns = ('id', 'title', 'category', 'status', 'rating', 'deadline', 'hours', 'priority', 'tags')
+        self.tree = ttk.Treeview(parent, columns=columns, show='headings', height=20,
+                                 selectmode='extended')
+
+        # Настройка колонок
+        self.tree.column('id', width=50, anchor=tk.CENTER)
+        self.tree.column('title', width=250, anchor=tk.W)
+        self.tree.column('category', width=150, anchor=tk.W)
+        self.tree.column('status', width=120, anchor=tk.CENTER)
+        self.tree.column('rating', width=80, anchor=tk.CENTER)
+        self.tree.column('deadline', width=100, anchor=tk.CENTER)
+        self.tree.column('hours', width=80, anchor=tk.CENTER)
+        self.tree.column('priority', width=80, anchor=tk.CENTER)
+        self.tree.column('tags', width=200, anchor=tk.W)
+
+        # Заголовки
+        self.tree.heading('id', text='ID')
+        self.tree.heading('title', text='Название')
+        self.tree.heading('category', text='Категория')
+        self.tree.heading('status', text='Статус')
+        self.tree.heading('rating', text='Рейтинг')
+        self.tree.heading('deadline', text='Дедлайн')
+        self.tree.heading('hours', text='Часов')
+        self.tree.heading('priority', text='Приоритет')
+        self.tree.heading('tags', text='Теги')
+
+        # Вертикальный скроллбар управляется таблицей, а не Treeview
+        self.vsb = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.hsb = ttk.Scrollbar(parent, orient=tk.HORIZONTAL, command=self.tree.xview)
+        self.tree.configure(yscrollcommand=self.on_tree_scrolled, xscrollcommand=self.hsb.set)
+
+        # Настройка цветов для статусов
+        self.tree.tag_configure('completed', background='#e8f5e9')
+        self.tree.tag_configure('in_progress', background='#fff3e0')
+        self.tree.tag_configure('planned', background='#e3f2fd')
+        self.tree.tag_configure('on_hold', background='#ffebee')
+        self.tree.tag_configure('overdue', background='#ffcdd2')
+
+        self.tree.bind('<<TreeviewSelect>>', self.on_selection_changed, add='+')
+
+    def grid(self, row=0, column=0):
+        """Размещение таблицы и скроллбаров"""
+        self.tree.grid(row=row, column=column, sticky='nsew')
+        self.vsb.grid(row=row, column=column + 1, sticky='ns')
+        self.hsb.grid(row=row + 1, column=column, sticky='ew')
+
+    @property
+    def window_size(self):
+        return self.page_size * self.WINDOW_PAGES
+
+    def _run(self, func, *args, on_done, key=FETCH_KEY):
+        """Запрос к источнику: в фоне, если задан исполнитель, иначе сразу"""
+        if self.executor is None:
+            on_done(func(*args))
+        else:
+            self.executor.submit(func, *args, on_done=on_done,
+                                 on_error=self._on_fetch_error, key=key)
+
+    def _on_fetch_error(self, error):
+        self._loading = False
+        self._extending = False
+        self._pending_refresh.clear()
+        print(f"Ошибка загрузки строк таблицы: {error}")
+
+    def load(self, source, position=0, on_loaded=None, changed=None):
+        """Показ нового источника строк начиная с позиции
+
+        on_loaded(total) вызывается, когда окно заполнено; changed - id
+        изменённых записей, которые источник должен перепроверить.
+        """
+        if source is not self.source:
+            self.all_selected = False
+        self.source = source
+        self._loading = True
+        self._run(self._fetch_window, source, position, changed,
+                  on_done=lambda result: self._show_window(source, result, on_loaded))
+
+    def reload(self, on_loaded=None, changed=None):
+        """Перечитывание текущего источника с сохранением позиции"""
+        if self.source is not None:
+            position = self.offset + self._top_index()
+            self.load(self.source, position, on_loaded, changed)
+
+    def _fetch_window(self, source, position, changed=None):
+        # Может выполняться в рабочем потоке: только запросы, без Tk
+        if changed and not source.ordered:
+            source.apply(source.fetch_ids(changed), changed)
+        total = source.count()
+        position = max(0, min(position, total - 1))
+        # Окно начинается на страницу выше нужной позиции
+        start = max(0, position - self.page_size)
+        return total, start, position, source.fetch_at(start, self.window_size)
+
+    def _show_window(self, source, result, on_loaded):
+        if source is not self.source:
+            return
+
+        self.total, self.offset, position, self.rows = result
+        self._extending = True
+        try:
+            self._render()
+            if self.rows:
+                self.tree.yview_moveto((position - self.offset) / len(self.rows))
+        finally:
+            self._loading = False
+            self._extending = False
+
+        if on_loaded:
+            on_loaded(self.total)
+
+    def _render(self):
+        self.tree.delete(*self.tree.get_children())
+        current_date = date.today().isoformat()
+        for item in self.rows:
+            self._insert(tk.END, item, current_date)
+
+    def _insert(self, index, item, current_date):
+        values, tags = format_item(item, current_date)
+        iid = self.tree.insert('', index, iid=str(item.id), values=values, tags=tags)
+        if self.all_selected:
+            self.tree.selection_add(iid)
+
+    def select_all(self):
+        """Выделение всех строк источника, а не только загруженного окна"""
+        self.all_selected = True
+        self.tree.selection_set(self.tree.get_children())
+
+    def selected_ids(self, on_done):
+        """Передача в on_done id выделенных записей
+
+        При «выделить все» это id всех записей источника: они читаются в
+        фоне, и on_done вызывается, когда запрос выполнен.
+        """
+        if self.all_selected and self.source is not None:
+            self._run(self.source.all_ids, on_done=on_done, key=self.SELECTION_KEY)
+        else:
+            on_done([int(iid) for iid in self.tree.selection()])
+
+    def on_selection_changed(self, event=None):
+        # Снятие выделения хотя бы с одной строки окна отменяет «выделить все»
+        if self.all_selected and len(self.tree.selection()) < len(self.tree.get_children()):
+            self.all_selected = False
+
+    def _top_index(self):
+        if not self.rows:
+            return 0
+        first = float(self.tree.yview()[0])
+        return int(round(first * len(self.rows)))
+
+    def _top_iid(self):
+        if not self.rows:
+            return None
+        return str(self.rows[min(self._top_index(), len(self.rows) - 1)].id)
+
+    def refresh_items(self, item_ids):
+        """Точечное обновление строк по id без перезагрузки таблицы
+
+        id строки служит её iid в Treeview, поэтому изменённые строки
+        перечитываются в фоне, затем обновляются, перемещаются или
+        удаляются на месте. Выделение и позиция прокрутки сохраняются.
+        Обновления, пришедшие до ответа, объединяются в один запрос.
+        """
+        if self.source is None or not item_ids:
+            return
+        if self._loading or len(item_ids) + len(self._pending_refresh) > self.window_size:
+            # Окно ещё грузится или изменений слишком много — перечитываем его
+            changed = list(self._pending_refresh.union(item_ids))
+            self._pending_refresh.clear()
+            if self.executor is not None:
+                self.executor.cancel(self.REFRESH_KEY)
+            self.reload(changed=changed)
+            return
+
+        self._pending_refresh.update(item_ids)
+        source = self.source
+        item_ids = list(self._pending_refresh)
+        self._run(self._fetch_changed, source, item_ids, key=self.REFRESH_KEY,
+                  on_done=lambda result: self._apply_changed(source, item_ids, result))
+
+    @staticmethod
+    def _fetch_changed(source, item_ids):
+        # Выполняется в рабочем потоке: только запросы, без Tk
+        fresh = source.fetch_ids(item_ids)
+        if not source.ordered:
+            source.apply(fresh, item_ids)
+        return fresh, source.count()
+
+    def _apply_changed(self, source, item_ids, result):
+        self._pending_refresh.difference_update(item_ids)
+        if source is not self.source or self._loading:
+            return  # окно перечитывается заново и так увидит изменения
+
+        fresh, total = result
+        top_iid = self._top_iid()
+        top_index = self._top_index()
+        current_date = date.today().isoformat()
+
+        self._extending = True
+        try:
+            if source.ordered:
+                self._merge_ordered(item_ids, fresh, current_date)
+            else:
+                self._merge_in_place(item_ids, fresh, current_date)
+            self.total = total
+
+            if self.rows:
+                if top_iid is not None and self.tree.exists(top_iid):
+                    top_index = self.tree.index(top_iid)
+                self.tree.yview_moveto(min(top_index, len(self.rows) - 1) / len(self.rows))
+        finally:
+            self._extending = False
+
+        if not self.rows and self.total:
+            # Окно опустело целиком — заполняем его заново
+            self.load(source, min(self.offset, self.total - 1))
+            return
+        if source.ordered and self.rows:
+            # Позиция окна могла сдвинуться: она дочитывается в фоне
+            anchor = self.rows[0]
+            self._run(source.count_before, anchor, key=self.OFFSET_KEY,
+                      on_done=lambda count: self._apply_offset(source, anchor, count))
+        self.on_tree_scrolled(*self.tree.yview())
+
+    def _apply_offset(self, source, anchor, count):
+        """Позиция окна по числу записей перед строкой anchor"""
+        iid = str(anchor.id)
+        if source is not self.source or self._loading or not self.tree.exists(iid):
+            return
+        self.offset = count - self.tree.index(iid)
+        self.on_tree_scrolled(*self.tree.yview())
+
+    def _merge_ordered(self, item_ids, fresh, current_date):
+        keys = [db.item_sort_key(item) for item in self.rows]
+        at_start = self.offset == 0
+        at_end = self.offset + len(self.rows) >= self.total
+
+        for item_id in item_ids:
+            iid = str(item_id)
+            present = self.tree.exists(iid)
+            if present:
+                index = self.tree.index(iid)
+                del self.rows[index]
+                del keys[index]
+
+            item = fresh.get(item_id)
+            if item is None:
+                if present:
+                    self.tree.delete(iid)
+                continue
+
+            key = db.item_sort_key(item)
+            new_index = bisect.bisect_left(keys, key)
+            fits = not self.rows or (
+                (new_index > 0 or at_start) and (new_index < len(self.rows) or at_end))
+            if not fits:
+                # Строка ушла за пределы окна
+                if present:
+                    self.tree.delete(iid)
+                continue
+
+            self.rows.insert(new_index, item)
+            keys.insert(new_index, key)
+            if present:
+                values, tags = format_item(item, current_date)
+                self.tree.move(iid, '', new_index)
+                self.tree.item(iid, values=values, tags=tags)
+            else:
+                self._insert(new_index, item, current_date)
+
+    def _merge_in_place(self, item_ids, fresh, current_date):
+        for item_id in item_ids:
+            iid = str(item_id)
+            if not self.tree.exists(iid):
+                continue
+            index = self.tree.index(iid)
+            item = fresh.get(item_id)
+            if item is None:
+                self.tree.delete(iid)
+                del self.rows[index]
+            else:
+                self.rows[index] = item
+                values, tags = format_item(item, current_date)
+                self.tree.item(iid, values=values, tags=tags)
+
+    def retag(self, item_ids):
+        """Пересчёт цвета строк окна, например когда у них наступила просрочка
+
+        Данные строк не перечитываются: меняется только дата сравнения.
+        """
+        current_date = date.today().isoformat()
+        for item_id in item_ids:
+            iid = str(item_id)
+            if self.tree.exists(iid):
+                item = self.rows[self.tree.index(iid)]
+                self.tree.item(iid, tags=format_item(item, current_date)[1])
+
+    def on_tree_scrolled(self, first, last):
+        """Перевод локальной позиции Treeview в позицию во всём списке"""
+        first, last = float(first), float(last)
+        count = len(self.rows)
+        if not count or not self.total:
+            self.vsb.set(0, 1)
+            return
+
+        self.vsb.set((self.offset + first * count) / self.total,
+                     (self.offset + last * count) / self.total)
+
+        if self._loading or self._extending:
+            return
+        if last > 1 - self.EDGE_FRACTION and self.offset + count < self.total:
+            self._extending = True
+            self.tree.after_idle(self._extend_down)
+        elif first < self.EDGE_FRACTION and self.offset > 0:
+            self._extending = True
+            self.tree.after_idle(self._extend_up)
+
+    def _extend_down(self):
+        if not self.rows:
+            self._extending = False
+            return
+        source = self.source
+        edge = self.rows[-1]
+        self._run(source.fetch_after, edge, self.offset + len(self.rows), self.page_size,
+                  on_done=lambda page: self._append_page(source, edge, page))
+
+    def _append_page(self, source, edge, page):
+        try:
+            if source is not self.source or not self.rows or self.rows[-1] is not edge:
+                return  # окно изменилось, пока страница загружалась
+
+            top = self._top_index()
+            current_date = date.today().isoformat()
+            for item in page:
+                self._insert(tk.END, item, current_date)
+            self.rows.extend(page)
+
+            # Удаляем дальние строки сверху
+            excess = len(self.rows) - self.window_size
+            if excess > 0:
+                self.tree.delete(*[str(item.id) for item in self.rows[:excess]])
+                del self.rows[:excess]
+                self.offset += excess
+                top -= excess
+
+            if self.rows:
+                self.tree.yview_moveto(max(0, top) / len(self.rows))
+        finally:
+            self._extending = False
+
+    def _extend_up(self):
+        if not self.rows:
+            self._extending = False
+            return
+        source = self.source
+        edge = self.rows[0]
+        self._run(source.fetch_before, edge, self.offset, self.page_size,
+                  on_done=lambda page: self._prepend_page(source, edge, page))
+
+    def _prepend_page(self, source, edge, page):
+        try:
+            if source is not self.source or not self.rows or self.rows[0] is not edge:
+                return  # окно изменилось, пока страница загружалась
+
+            top = self._top_index()
+            current_date = date.today().isoformat()
+            for index, item in enumerate(page):
+                self._insert(index, item, current_date)
+            self.rows[:0] = page
+            self.offset -= len(page)
+            top += len(page)
+
+            # Удаляем дальние строки снизу
+            excess = len(self.rows) - self.window_size
+            if excess > 0:
+                self.tree.delete(*[str(item.id) for item in self.rows[-excess:]])
+                del self.rows[-excess:]
+
+            if self.rows:
+                self.tree.yview_moveto(top / len(self.rows))
+        finally:
+            self._extending = False
+
+    def on_scrollbar(self, *args):
+        """Команда скроллбара: прокрутка внутри окна или переход по позиции"""
+        if not self.rows or self._loading:
+            return
+
+        if args[0] == 'moveto':
+            target = int(float(args[1]) * self.total)
+            target = max(0, min(target, self.total - 1))
+            visible = int(self.tree.cget('height'))
+            if self.offset <= target and target + visible <= self.offset + len(self.rows):
+                self.tree.yview_moveto((target - self.offset) / len(self.rows))
+            else:
+                self.load(self.source, target)
+        else:
+            self.tree.yview(*args)
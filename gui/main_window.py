@@ -7,13 +7,24 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import database as db
-from .add_edit_dialog import AddEditDialog
-from .categories_dialog import CategoriesDialog
-from .tags_dialog import TagsDialog
-from datetime import datetime
+from .item_table import ItemTable, KeysetSource, ResultSource, STATUS_TEXTS
+from .db_executor import DbExecutor
+from .search_cache import SearchCache
+from .session_timer import SessionTimer
+from .deadline_scheduler import DeadlineScheduler
+
+# Диалоги, отчёты, импорт и экспорт импортируются при первом открытии:
+# запуск не тратит на них время
 
 class MainWindow:
-    def __init__(self):
+    # Пауза после ввода, по истечении которой запускается поиск
+    SEARCH_DELAY_MS = 120
+    # Названий в напоминании о дедлайнах, дальше только число
+    REMINDER_TITLES = 3
+    
+    def __init__(self, profile=None):
+        # profile.mark(фаза) отмечает этапы запуска (main.py --startup-profile)
+        self.profile = profile
         self.root = tk.Tk()
         self.root.title("Трекер учебы - Управление учебными материалами")
         self.root.geometry("1200x700")
@@ -24,10 +35,21 @@ class MainWindow:
         self.search_var = tk.StringVar()
         self.status_filter_var = tk.StringVar(value="all")
         self.category_filter_var = tk.StringVar(value="all")
+        # Категории для фильтра и меню: читаются в фоне, см. update_category_filter
+        self.categories = []
+        self.category_ids = {}
+        
+        # Текст последнего показанного поиска: по нему строится фрагмент
+        # с подсветкой для выбранной строки
+        self.search_query = None
+        self.search_cache = SearchCache()
+        self._search_after_id = None
         
-        # Контекстное меню (создаём один раз)
+        # Запросы к базе выполняются в фоне, результаты разбираются в цикле Tk
+        self.executor = DbExecutor(self.root, on_busy=self.show_busy)
+        
+        # Контекстное меню создаётся при первом показе
         self.context_menu = None
-        self.create_context_menu()
         
         self.setup_menu()
         self.setup_toolbar()
@@ -35,20 +57,47 @@ class MainWindow:
         self.setup_main_area()
         self.setup_status_bar()
         
-        # Загружаем данные
-        self.load_data()
+        # Напоминания о дедлайнах и перекраска строк, ставших просроченными
+        self.deadlines = DeadlineScheduler(self.root, self.executor,
+                                           on_reminder=self.show_reminders,
+                                           on_overdue=self.table.retag)
         
-        # Обновляем статистику
-        self.update_statistics()
+        # Данные загружаются, когда окно уже отрисовано: idle-обработчики
+        # выполняются после перерисовки виджетов, созданных выше
+        self.root.after_idle(self.fill_window)
         
         # Привязываем глобальное событие для скрытия меню
         self.root.bind('<Button-1>', self.hide_context_menu)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+    def fill_window(self):
+        """Заполнение показанного окна: фильтр категорий, список, статистика, дедлайны"""
+        self.mark_startup("первая отрисовка")
+        self.update_category_filter()
+        
+        def loaded(total):
+            self.mark_startup("список загружен", last=True)
+            # Напоминания после списка, чтобы их не сменило сообщение о загрузке
+            self.deadlines.reload()
+            
+        self.load_data(on_loaded=loaded)
+        self.update_statistics()
+        
+    def mark_startup(self, phase, last=False):
+        """Отметка этапа запуска; last - последний, после него вывод отчёта"""
+        if self.profile is None:
+            return
+        self.profile.mark(phase)
+        if last:
+            self.profile.report()
+            self.profile = None
         
     def create_context_menu(self):
-        """Создание контекстного меню (один раз)"""
+        """Создание контекстного меню (один раз, при первом показе)"""
         self.context_menu = tk.Menu(self.root, tearoff=0)
         self.context_menu.add_command(label="✏️ Редактировать", command=self.edit_item)
         self.context_menu.add_command(label="🗑️ Удалить", command=self.delete_item)
+        self.context_menu.add_command(label="⏱ Начать занятие", command=self.start_session)
         self.context_menu.add_separator()
         
         # Подменю для изменения статуса
@@ -64,6 +113,29 @@ class MainWindow:
         
         self.context_menu.add_cascade(label="📊 Изменить статус", menu=status_menu)
         
+        # Категории заполняются при показе меню: справочник мог измениться
+        self.category_menu = tk.Menu(self.context_menu, tearoff=0)
+        self.context_menu.add_cascade(label="📁 Изменить категорию", menu=self.category_menu)
+        
+        priority_menu = tk.Menu(self.context_menu, tearoff=0)
+        for priority in range(1, 6):
+            priority_menu.add_command(label=f"{'⚡' * priority} ({priority})",
+                                      command=lambda p=priority: self.change_priority(p))
+        self.context_menu.add_cascade(label="⚡ Изменить приоритет", menu=priority_menu)
+        
+        self.context_menu.add_separator()
+        self.context_menu.add_command(label="Выделить все", command=self.select_all)
+        
+    def fill_category_menu(self):
+        """Пункты подменю категорий из последнего прочитанного справочника"""
+        self.category_menu.delete(0, tk.END)
+        for category in self.categories:
+            self.category_menu.add_command(
+                label=category[1], command=lambda c=category[0]: self.change_category(c))
+        self.category_menu.add_separator()
+        self.category_menu.add_command(label="Без категории",
+                                       command=lambda: self.change_category(None))
+        
     def hide_context_menu(self, event):
         """Скрытие контекстного меню при клике вне его"""
         try:
@@ -83,7 +155,7 @@ class MainWindow:
         file_menu.add_command(label="Экспорт данных", command=self.export_data)
         file_menu.add_command(label="Импорт данных", command=self.import_data)
         file_menu.add_separator()
-        file_menu.add_command(label="Выход", command=self.root.quit)
+        file_menu.add_command(label="Выход", command=self.on_close)
         
         # Меню Данные
         data_menu = tk.Menu(menubar, tearoff=0)
@@ -91,6 +163,8 @@ class MainWindow:
         data_menu.add_command(label="Добавить", command=self.add_item)
         data_menu.add_command(label="Редактировать", command=self.edit_item)
         data_menu.add_command(label="Удалить", command=self.delete_item)
+        data_menu.add_command(label="Выделить все", command=self.select_all,
+                              accelerator="Ctrl+A")
         data_menu.add_separator()
         data_menu.add_command(label="Управление категориями", command=self.manage_categories)
         data_menu.add_command(label="Управление тегами", command=self.manage_tags)
@@ -111,6 +185,8 @@ class MainWindow:
         menubar.add_cascade(label="Отчеты", menu=reports_menu)
         reports_menu.add_command(label="Статистика", command=self.show_statistics)
         reports_menu.add_command(label="Прогресс по категориям", command=self.show_category_progress)
+        reports_menu.add_separator()
+        reports_menu.add_command(label="Диагностика", command=self.show_diagnostics)
         
     def setup_toolbar(self):
         """Создание панели инструментов"""
@@ -124,7 +200,12 @@ class MainWindow:
         
         ttk.Separator(toolbar, orient=tk.VERTICAL).pack(side=tk.LEFT, fill=tk.Y, padx=5, pady=2)
         
-        ttk.Button(toolbar, text="🔄 Обновить", command=self.load_data).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="🔄 Обновить", command=self.reload_all).pack(side=tk.LEFT, padx=2)
+        
+        # Секундомер занятия с выбранным материалом
+        self.timer = SessionTimer(toolbar, self.selected_item, on_logged=self.on_session_logged,
+                                  executor=self.executor)
+        self.timer.pack(side=tk.RIGHT, padx=2)
         
     def setup_search_panel(self):
         """Создание панели поиска"""
@@ -136,6 +217,7 @@ class MainWindow:
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=40)
         search_entry.grid(row=0, column=1, padx=5, pady=5, sticky=tk.W)
         search_entry.bind('<Return>', lambda e: self.search())
+        self.search_var.trace_add('write', self.on_search_changed)
         
         ttk.Button(search_frame, text="🔍 Найти", command=self.search).grid(row=0, column=2, padx=2)
         ttk.Button(search_frame, text="🔄 Сбросить", command=self.reset_filters).grid(row=0, column=3, padx=2)
@@ -152,48 +234,16 @@ class MainWindow:
         self.category_combo = ttk.Combobox(search_frame, textvariable=self.category_filter_var, 
                                           state='readonly', width=20)
         self.category_combo.grid(row=1, column=3, padx=5, pady=5, sticky=tk.W)
-        self.update_category_filter()
         
     def setup_main_area(self):
         """Создание основной области с таблицей"""
         main_frame = ttk.Frame(self.root)
         main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
         
-        # Создаем таблицу
-        columns = ('id', 'title', 'category', 'status', 'rating', 'deadline', 'hours', 'priority', 'tags')
-        self.tree = ttk.Treeview(main_frame, columns=columns, show='headings', height=20)
-        
-        # Настройка колонок
-        self.tree.column('id', width=50, anchor=tk.CENTER)
-        self.tree.column('title', width=250, anchor=tk.W)
-        self.tree.column('category', width=150, anchor=tk.W)
-        self.tree.column('status', width=120, anchor=tk.CENTER)
-        self.tree.column('rating', width=80, anchor=tk.CENTER)
-        self.tree.column('deadline', width=100, anchor=tk.CENTER)
-        self.tree.column('hours', width=80, anchor=tk.CENTER)
-        self.tree.column('priority', width=80, anchor=tk.CENTER)
-        self.tree.column('tags', width=200, anchor=tk.W)
-        
-        # Заголовки
-        self.tree.heading('id', text='ID')
-        self.tree.heading('title', text='Название')
-        self.tree.heading('category', text='Категория')
-        self.tree.heading('status', text='Статус')
-        self.tree.heading('rating', text='Рейтинг')
-        self.tree.heading('deadline', text='Дедлайн')
-        self.tree.heading('hours', text='Часов')
-        self.tree.heading('priority', text='Приоритет')
-        self.tree.heading('tags', text='Теги')
-        
-        # Добавляем скроллбары
-        vsb = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        hsb = ttk.Scrollbar(main_frame, orient=tk.HORIZONTAL, command=self.tree.xview)
-        self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-        
-        # Размещение
-        self.tree.grid(row=0, column=0, sticky='nsew')
-        vsb.grid(row=0, column=1, sticky='ns')
-        hsb.grid(row=1, column=0, sticky='ew')
+        # Таблица в виртуальном режиме: в Treeview только окно строк
+        self.table = ItemTable(main_frame, executor=self.executor)
+        self.tree = self.table.tree
+        self.table.grid(row=0, column=0)
         
         main_frame.grid_rowconfigure(0, weight=1)
         main_frame.grid_columnconfigure(0, weight=1)
@@ -202,18 +252,27 @@ class MainWindow:
         self.tree.bind('<Double-Button-1>', lambda e: self.edit_item())
         self.tree.bind('<Button-3>', self.show_context_menu)
         self.tree.bind('<Button-1>', self.on_tree_click)  # Скрываем меню при клике на таблицу
-        
-        # Настройка цветов для статусов
-        self.tree.tag_configure('completed', background='#e8f5e9')
-        self.tree.tag_configure('in_progress', background='#fff3e0')
-        self.tree.tag_configure('planned', background='#e3f2fd')
-        self.tree.tag_configure('on_hold', background='#ffebee')
-        self.tree.tag_configure('overdue', background='#ffcdd2')
+        self.tree.bind('<<TreeviewSelect>>', self.on_tree_select, add='+')
+        self.tree.bind('<Control-a>', self.select_all)
         
     def on_tree_click(self, event):
         """Обработка клика по таблице - скрываем контекстное меню"""
         self.hide_context_menu(event)
         
+    def on_tree_select(self, event):
+        """Показ фрагмента с совпадением для выбранного результата поиска"""
+        selected = self.tree.selection()
+        if not selected or not self.search_query:
+            return
+        self.executor.submit(
+            db.get_search_snippet, self.search_query, int(selected[0]), key='snippet',
+            on_done=self.show_snippet
+        )
+        
+    def show_snippet(self, snippet):
+        if snippet:
+            self.update_status(f"Совпадение: {snippet}")
+        
     def setup_status_bar(self):
         """Создание статусной панели"""
         self.status_bar = ttk.Frame(self.root)
@@ -225,117 +284,107 @@ class MainWindow:
         self.stats_label = ttk.Label(self.status_bar, text="", relief=tk.SUNKEN, anchor=tk.E)
         self.stats_label.pack(side=tk.RIGHT, padx=5)
         
-    def load_data(self):
+        # Индикатор фоновых запросов
+        self.busy_label = ttk.Label(self.status_bar, text="", width=14, relief=tk.SUNKEN, anchor=tk.CENTER)
+        self.busy_label.pack(side=tk.RIGHT)
+        
+    def show_busy(self, pending):
+        """Отображение количества выполняющихся запросов"""
+        self.busy_label.config(text=f"⏳ Запросов: {pending}" if pending else "")
+        
+    def load_data(self, on_loaded=None):
         """Загрузка данных в таблицу"""
-        # Очищаем таблицу
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        
-        # Получаем данные
-        items = db.get_all_study_items()
-        
-        # Заполняем таблицу
-        current_date = datetime.now().date()
-        
-        for item in items:
-            try:
-                # Определяем статус просрочки
-                deadline = item[7] if len(item) > 7 else None  # deadline
-                status = item[5] if len(item) > 5 else ''     # status
-                tags = item[11] if len(item) > 11 else ''
-                
-                # Форматируем данные
-                title = item[1] if len(item) > 1 else ''
-                category = item[9] if len(item) > 9 and item[9] else 'Без категории'
-                status_text = self.get_status_text(status)
-                
-                # Рейтинг
-                rating_val = item[4] if len(item) > 4 and item[4] else 0
-                rating = '★' * rating_val if rating_val else '-'
-                
-                # Дедлайн
-                deadline_str = item[7] if len(item) > 7 and item[7] else '-'
-                
-                # Часы
-                hours = item[8] if len(item) > 8 and item[8] else 0
-                hours_str = f"{hours} ч"
-                
-                # Приоритет
-                priority_val = item[9] if len(item) > 9 and item[9] else 3
-                priority = '⚡' * priority_val
-                
-                values = (
-                    item[0],  # id
-                    title,
-                    category,
-                    status_text,
-                    rating,
-                    deadline_str,
-                    hours_str,
-                    priority,
-                    tags
-                )
+        self.search_query = None
+        self.search_cache.clear()
+        self.cancel_pending_search()
+        self.executor.cancel('search')
+        self.update_status("Загрузка...")
+        
+        def loaded(total):
+            self.update_status(f"Загружено записей: {total}")
+            if on_loaded:
+                on_loaded(total)
                 
-                # Определяем тег для цвета строки
-                row_tags = []
-                if deadline and deadline != '-' and status not in ['completed', 'on_hold']:
-                    try:
-                        deadline_date = datetime.strptime(deadline, "%Y-%m-%d").date()
-                        if deadline_date < current_date:
-                            row_tags.append('overdue')
-                        else:
-                            row_tags.append(status)
-                    except:
-                        row_tags.append(status)
-                else:
-                    row_tags.append(status)
-                
-                self.tree.insert('', tk.END, values=values, tags=row_tags)
-                
-            except Exception as e:
-                print(f"Ошибка при загрузке строки: {e}")
-                continue
+        self.table.load(KeysetSource(), on_loaded=loaded)
         
-        self.update_status(f"Загружено записей: {len(items)}")
+    def reload_all(self):
+        """Перечитывание списка, статистики и дедлайнов, например после
+        изменений из другой программы"""
+        self.load_data()
+        self.update_category_filter()
+        self.update_statistics()
+        self.deadlines.reload()
         
     def get_status_text(self, status):
         """Получение текстового представления статуса"""
-        statuses = {
-            'planned': '📅 Запланировано',
-            'in_progress': '⚡ В процессе',
-            'completed': '✅ Завершено',
-            'on_hold': '⏸ На паузе'
-        }
-        return statuses.get(status, status)
+        return STATUS_TEXTS.get(status, status)
     
+    def refresh_items(self, item_ids, message=None):
+        """Точечное обновление изменённых строк таблицы"""
+        self.search_cache.clear()
+        self.table.refresh_items(item_ids)
+        self.update_statistics()
+        self.deadlines.update(item_ids)
+        if message:
+            self.update_status(message)
+        
+    def on_item_saved(self, item_id):
+        """Обработка сохранения записи в окне добавления/редактирования"""
+        self.refresh_items([item_id], "Запись сохранена")
+        
     def update_status(self, message):
         """Обновление статусной строки"""
         self.status_label.config(text=message)
         
+    def show_reminders(self, reminders):
+        """Напоминание о близких дедлайнах в статусной строке"""
+        by_days = {}
+        for item_id, title, deadline, days in reminders:
+            by_days.setdefault(days, []).append(title)
+        parts = []
+        for days, titles in sorted(by_days.items()):
+            when = {0: "сегодня", 1: "завтра"}.get(days, f"через {days} дн.")
+            if len(titles) > self.REMINDER_TITLES:
+                parts.append(f"{when} — {len(titles)} материалов")
+            else:
+                parts.append(f"{when}: {', '.join(titles)}")
+        self.update_status("⏰ Дедлайн " + "; ".join(parts))
+        self.root.bell()
+        
     def update_statistics(self):
         """Обновление статистики"""
-        try:
-            stats = db.get_statistics()
-            self.stats_label.config(
-                text=f"Всего: {stats['total']} | Завершено: {stats['by_status'].get('completed', 0)} | "
-                     f"Часов: {stats['total_hours']} | Ср. рейтинг: {stats['avg_rating']:.1f}"
-            )
-        except Exception as e:
-            print(f"Ошибка при обновлении статистики: {e}")
+        self.executor.submit(
+            db.get_statistics, key='statistics',
+            on_done=self.show_statistics_line,
+            on_error=lambda e: print(f"Ошибка при обновлении статистики: {e}")
+        )
+        
+    def show_statistics_line(self, stats):
+        """Вывод статистики в статусную строку"""
+        self.stats_label.config(
+            text=f"Всего: {stats['total']} | Завершено: {stats['by_status'].get('completed', 0)} | "
+                 f"Часов: {stats['total_hours']} | Ср. рейтинг: {stats['avg_rating']:.1f}"
+        )
         
     def update_category_filter(self):
-        """Обновление списка категорий в фильтре"""
-        try:
-            categories = db.get_all_categories()
-            category_list = ['all'] + [cat[1] for cat in categories]
-            self.category_combo['values'] = category_list
-        except Exception as e:
-            print(f"Ошибка при обновлении фильтра категорий: {e}")
+        """Перечитывание категорий для фильтра и контекстного меню в фоне"""
+        self.executor.submit(
+            db.get_all_categories, key='categories',
+            on_done=self.show_categories,
+            on_error=lambda e: print(f"Ошибка при обновлении фильтра категорий: {e}")
+        )
+        
+    def show_categories(self, categories):
+        """Список категорий в фильтре; меню заполняется из него при показе"""
+        self.categories = categories
+        self.category_ids = {category[1]: category[0] for category in categories}
+        self.category_combo['values'] = ['all'] + [category[1] for category in categories]
         
     def add_item(self):
         """Добавление новой записи"""
+        from .add_edit_dialog import AddEditDialog
         try:
-            dialog = AddEditDialog(self.root, self.load_data)
+            dialog = AddEditDialog(self.root, self.on_item_saved)
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось открыть окно добавления:\n{str(e)}")
         
@@ -346,78 +395,125 @@ class MainWindow:
             messagebox.showwarning("Предупреждение", "Выберите запись для редактирования")
             return
         
+        from .add_edit_dialog import AddEditDialog
         try:
             # Получаем ID записи
             item_id = self.tree.item(selected[0])['values'][0]
             
-            dialog = AddEditDialog(self.root, self.load_data, item_id)
+            dialog = AddEditDialog(self.root, self.on_item_saved, item_id)
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось открыть окно редактирования:\n{str(e)}")
         
     def delete_item(self):
-        """Удаление записи"""
-        selected = self.tree.selection()
-        if not selected:
+        """Удаление выделенных записей"""
+        self.table.selected_ids(self.confirm_delete)
+        
+    def confirm_delete(self, item_ids):
+        """Подтверждение и удаление записей"""
+        if not item_ids:
             messagebox.showwarning("Предупреждение", "Выберите запись для удаления")
             return
         
-        if messagebox.askyesno("Подтверждение", "Вы уверены, что хотите удалить эту запись?"):
-            try:
-                item_id = self.tree.item(selected[0])['values'][0]
-                db.delete_study_item(item_id)
-                self.load_data()
-                self.update_statistics()
-                self.update_status("Запись удалена")
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось удалить запись:\n{str(e)}")
-            
-    def search(self):
-        """Поиск записей"""
-        try:
-            query = self.search_var.get()
-            status = self.status_filter_var.get()
-            category = self.category_filter_var.get()
+        question = ("Вы уверены, что хотите удалить эту запись?" if len(item_ids) == 1
+                    else f"Вы уверены, что хотите удалить выделенные записи ({len(item_ids)})?")
+        if messagebox.askyesno("Подтверждение", question):
+            self.apply_to_selection(item_ids, db.delete_study_items, "Удалено записей")
             
-            # Очищаем таблицу
-            for row in self.tree.get_children():
-                self.tree.delete(row)
-            
-            # Выполняем поиск
-            items = db.search_study_items(
-                query if query else None,
-                status if status != 'all' else None,
-                category if category != 'all' else None
-            )
+    def selected_item(self):
+        """(id, название) первой выделенной записи или None"""
+        selected = self.tree.selection()
+        if not selected:
+            messagebox.showwarning("Предупреждение", "Выберите запись для занятия")
+            return None
+        values = self.tree.item(selected[0])['values']
+        return int(values[0]), str(values[1])
+        
+    def start_session(self):
+        """Запуск секундомера для выделенной записи"""
+        item = self.selected_item()
+        if item:
+            self.timer.start(*item)
             
-            # Заполняем таблицу
-            current_date = datetime.now().date()
+    def on_session_logged(self, item_id, minutes):
+        """Сессия записана: часы записи изменились"""
+        self.refresh_items([item_id], f"Записано занятие: {minutes} мин")
+        
+    def select_all(self, event=None):
+        """Выделение всех записей текущего списка"""
+        self.table.select_all()
+        self.update_status(f"Выделено записей: {self.table.total}")
+        return 'break'
+        
+    def apply_to_selection(self, item_ids, action, message, **fields):
+        """Групповое действие над записями: одна транзакция через очередь
+        записи в фоне, затем точечное обновление затронутых строк"""
+        if not item_ids:
+            return
+        self.update_status(f"{message}: ...")
+        self.executor.submit(
+            db.write, action, item_ids, **fields,
+            on_done=lambda count: self.refresh_items(item_ids, f"{message}: {count}"),
+            on_error=lambda e: messagebox.showerror(
+                "Ошибка", f"Не удалось изменить записи:\n{str(e)}")
+        )
+        
+    def on_search_changed(self, *args):
+        """Поиск по мере ввода: запускается после паузы в наборе"""
+        self.cancel_pending_search()
+        self._search_after_id = self.root.after(self.SEARCH_DELAY_MS, self.search)
+        
+    def cancel_pending_search(self):
+        """Отмена поиска, отложенного до паузы во вводе"""
+        if self._search_after_id is not None:
+            self.root.after_cancel(self._search_after_id)
+            self._search_after_id = None
             
-            for item in items:
-                try:
-                    status = item[5] if len(item) > 5 else ''
-                    deadline = item[7] if len(item) > 7 else None
-                    
-                    row_tags = []
-                    if deadline and status not in ['completed', 'on_hold']:
-                        try:
-                            deadline_date = datetime.strptime(deadline, "%Y-%m-%d").date()
-                            if deadline_date < current_date:
-                                row_tags.append('overdue')
-                            else:
-                                row_tags.append(status)
-                        except:
-                            row_tags.append(status)
-                    else:
-                        row_tags.append(status)
-                    
-                    self.tree.insert('', tk.END, values=item[:9], tags=row_tags)
-                except:
-                    continue
+    def search(self):
+        """Поиск записей"""
+        self.cancel_pending_search()
+        query = self.search_var.get().strip()
+        status = self.status_filter_var.get()
+        category = self.category_filter_var.get()
+        
+        status = status if status != 'all' else None
+        category_id = self.category_ids.get(category) if category != 'all' else None
+        
+        if not query:
+            # Без текста — тот же постраничный список, но с фильтрами
+            self.executor.cancel('search')
+            self.search_query = None
+            self.update_status("Поиск...")
+            self.table.load(KeysetSource(status, category_id), on_loaded=self.show_found_count)
+            return
             
-            self.update_status(f"Найдено записей: {len(items)}")
+        # Повтор или продолжение недавнего запроса отвечается из кэша
+        item_ids = self.search_cache.lookup(query, status, category_id)
+        if item_ids is not None:
+            self.executor.cancel('search')
+            self.show_search_results(item_ids, query, status, category_id)
+            return
             
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Ошибка при поиске:\n{str(e)}")
+        # Результаты текстового поиска упорядочены по релевантности;
+        # более новый запрос прерывает ещё не завершённый старый
+        self.update_status("Поиск...")
+        interrupt = db.QueryInterrupt()
+        self.executor.submit(
+            SearchCache.fetch, query, status, category_id, self.search_cache.max_rows, interrupt,
+            interrupt=interrupt.interrupt,
+            key='search',
+            on_done=lambda fetched: self.show_search_results(
+                self.search_cache.store(query, status, category_id, fetched),
+                query, status, category_id),
+            on_error=lambda e: messagebox.showerror("Ошибка", f"Ошибка при поиске:\n{str(e)}")
+        )
+        
+    def show_search_results(self, item_ids, query, status, category_id):
+        """Показ результатов текстового поиска"""
+        self.search_query = query
+        self.table.load(ResultSource(item_ids, status, category_id), on_loaded=self.show_found_count)
+        
+    def show_found_count(self, total):
+        self.update_status(f"Найдено записей: {total}")
         
     def reset_filters(self):
         """Сброс фильтров"""
@@ -444,8 +540,15 @@ class MainWindow:
             # Определяем строку, на которой был клик
             row_id = self.tree.identify_row(event.y)
             if row_id:
-                # Выделяем строку
-                self.tree.selection_set(row_id)
+                # Клик вне выделения выделяет строку, внутри - сохраняет
+                # выделение нескольких строк для групповых действий
+                if row_id not in self.tree.selection():
+                    self.tree.selection_set(row_id)
+                if self.context_menu is None:
+                    self.create_context_menu()
+                # Меню — из уже прочитанных категорий, справочник сверяется в фоне
+                self.fill_category_menu()
+                self.update_category_filter()
                 
                 # Показываем меню
                 self.context_menu.post(event.x_root, event.y_root)
@@ -453,41 +556,26 @@ class MainWindow:
             print(f"Ошибка при показе контекстного меню: {e}")
             
     def change_status(self, status):
-        """Изменение статуса записи"""
-        selected = self.tree.selection()
-        if not selected:
-            return
+        """Изменение статуса выделенных записей"""
+        self.table.selected_ids(lambda item_ids: self.apply_to_selection(
+            item_ids, db.patch_study_items,
+            f"Статус изменен на {self.get_status_text(status)}, записей", status=status))
             
-        try:
-            item_id = self.tree.item(selected[0])['values'][0]
-            # Получаем текущие данные
-            result = db.get_study_item_by_id(item_id)
-            if result:
-                item, tags = result
-            else:
-                item, tags = None, []
+    def change_category(self, category_id):
+        """Перенос выделенных записей в другую категорию"""
+        self.table.selected_ids(lambda item_ids: self.apply_to_selection(
+            item_ids, db.patch_study_items,
+            "Категория изменена, записей", category_id=category_id))
             
-            if item:
-                # Обновляем статус
-                data = {
-                    'title': item[1] if len(item) > 1 else '',
-                    'description': item[2] if len(item) > 2 else '',
-                    'category_id': item[3] if len(item) > 3 else None,
-                    'rating': item[4] if len(item) > 4 else 3,
-                    'status': status,
-                    'deadline': item[7] if len(item) > 7 else None,
-                    'hours_spent': item[8] if len(item) > 8 else 0,
-                    'priority': item[9] if len(item) > 9 else 3,
-                    'tags': [t[0] for t in tags] if tags else []
-                }
-                db.update_study_item(item_id, data)
-                self.load_data()
-                self.update_status(f"Статус изменен на {self.get_status_text(status)}")
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось изменить статус:\n{str(e)}")
+    def change_priority(self, priority):
+        """Изменение приоритета выделенных записей"""
+        self.table.selected_ids(lambda item_ids: self.apply_to_selection(
+            item_ids, db.patch_study_items,
+            "Приоритет изменен, записей", priority=priority))
             
     def manage_categories(self):
         """Управление категориями"""
+        from .categories_dialog import CategoriesDialog
         try:
             dialog = CategoriesDialog(self.root, self.update_category_filter)
         except Exception as e:
@@ -495,24 +583,124 @@ class MainWindow:
         
     def manage_tags(self):
         """Управление тегами"""
+        from .tags_dialog import TagsDialog
         try:
             dialog = TagsDialog(self.root)
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось открыть управление тегами:\n{str(e)}")
         
     def export_data(self):
-        """Экспорт данных"""
-        messagebox.showinfo("Информация", "Функция экспорта будет доступна в следующей версии")
+        """Экспорт данных в CSV, JSON Lines или копию базы"""
+        from tkinter import filedialog
+        import exporter
+        from .progress_dialog import ProgressDialog
+        
+        path = filedialog.asksaveasfilename(
+            parent=self.root,
+            title="Экспорт данных",
+            defaultextension=".jsonl",
+            filetypes=[("JSON Lines", "*.jsonl"), ("CSV", "*.csv"),
+                       ("Копия базы SQLite", "*.db"),
+                       ("Сжатые файлы", "*.jsonl.gz *.csv.gz *.db.gz")]
+        )
+        if not path:
+            return
+            
+        try:
+            exporter.export_format(path)
+        except ValueError as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
+            
+        progress = ProgressDialog(self.root, "Экспорт данных", "Подготовка...")
+        
+        def report_progress(count, fraction):
+            self.executor.call_soon(
+                progress.update, fraction, f"Выгружено записей: {count}")
+            
+        self.executor.submit(
+            exporter.export_file, path, key='export',
+            progress=report_progress, cancel_event=progress.cancel_event,
+            on_done=lambda report: self.on_export_finished(progress, report),
+            on_error=lambda e: self.on_export_failed(progress, e)
+        )
+        
+    def on_export_finished(self, progress, report):
+        """Итог экспорта"""
+        progress.close()
+        if report['cancelled']:
+            self.update_status("Экспорт отменён")
+            return
+        self.update_status(f"Выгружено записей: {report['exported']}")
+        messagebox.showinfo(
+            "Экспорт данных",
+            f"Выгружено записей: {report['exported']}\n\n" + "\n".join(report['paths'])
+        )
+        
+    def on_export_failed(self, progress, error):
+        """Ошибка экспорта"""
+        progress.close()
+        messagebox.showerror("Ошибка", f"Не удалось экспортировать данные:\n{str(error)}")
         
     def import_data(self):
-        """Импорт данных"""
-        messagebox.showinfo("Информация", "Функция импорта будет доступна в следующей версии")
+        """Импорт данных из CSV или JSON Lines"""
+        from tkinter import filedialog
+        import importer
+        from .progress_dialog import ProgressDialog
+        
+        path = filedialog.askopenfilename(
+            parent=self.root,
+            title="Импорт данных",
+            filetypes=[("CSV и JSON Lines", "*.csv *.jsonl *.csv.gz *.jsonl.gz"),
+                       ("Все файлы", "*.*")]
+        )
+        if not path:
+            return
+            
+        progress = ProgressDialog(self.root, "Импорт данных", "Чтение файла...")
+        
+        def report_progress(count, fraction):
+            # Вызывается из рабочего потока, окно обновляется в цикле Tk
+            self.executor.call_soon(
+                progress.update, fraction, f"Импортировано записей: {count}")
+            
+        self.executor.submit(
+            importer.import_file, path, key='import',
+            progress=report_progress, cancel_event=progress.cancel_event,
+            on_done=lambda report: self.on_import_finished(progress, report),
+            on_error=lambda e: self.on_import_failed(progress, e)
+        )
+        
+    def on_import_finished(self, progress, report):
+        """Обновление списка после импорта"""
+        progress.close()
+        self.reload_all()
+        
+        message = f"Импортировано записей: {report['imported']}"
+        if report['cancelled']:
+            message += " (импорт прерван)"
+        if report['skipped']:
+            message += f"\nПропущено строк с ошибками: {report['skipped']}"
+            message += "\n\n" + "\n".join(report['errors'])
+        messagebox.showinfo("Импорт данных", message)
+        
+    def on_import_failed(self, progress, error):
+        """Ошибка импорта: уже записанные пачки остаются в базе"""
+        progress.close()
+        self.reload_all()
+        messagebox.showerror("Ошибка", f"Не удалось импортировать данные:\n{str(error)}")
         
     def show_statistics(self):
         """Показать окно статистики"""
+        self.executor.submit(
+            db.get_statistics, key='statistics_window',
+            on_done=self.open_statistics_window,
+            on_error=lambda e: messagebox.showerror("Ошибка", f"Не удалось показать статистику:\n{str(e)}")
+        )
+        
+    def open_statistics_window(self, stats):
+        """Окно статистики по готовым данным"""
         try:
-            stats = db.get_statistics()
-            
             stats_window = tk.Toplevel(self.root)
             stats_window.title("Статистика")
             stats_window.geometry("400x350")
@@ -560,7 +748,21 @@ class MainWindow:
         
     def show_category_progress(self):
         """Показать прогресс по категориям"""
-        messagebox.showinfo("Информация", "Функция графиков будет доступна в следующей версии")
+        from .progress_report import ProgressReport
+        ProgressReport(self.root, self.executor)
+        
+    def show_diagnostics(self):
+        """Окно профилировщика запросов"""
+        from .diagnostics_window import DiagnosticsWindow
+        DiagnosticsWindow(self.root, self.executor)
+        
+    def on_close(self):
+        """Закрытие приложения"""
+        # Идущее занятие не теряется при выходе
+        self.timer.stop(notify=False)
+        self.deadlines.stop()
+        self.executor.shutdown()
+        self.root.destroy()
         
     def run(self):
         """Запуск приложения"""
@@ -0,0 +1,47 @@
+import threading
+import tkinter as tk
+from tkinter import ttk
+
+
+class ProgressDialog:
+    """Окно хода длительной операции с кнопкой отмены
+
+    Отмена только выставляет cancel_event; фоновая задача проверяет его
+    и завершается сама, после чего окно закрывают через close().
+    """
+
+    def __init__(self, parent, title, text):
+        self.cancel_event = threading.Event()
+
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title(title)
+        self.dialog.geometry("400x130")
+        self.dialog.transient(parent)
+        self.dialog.resizable(False, False)
+        self.dialog.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        main_frame = ttk.Frame(self.dialog, padding=15)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.label = ttk.Label(main_frame, text=text, anchor=tk.W)
+        self.label.pack(fill=tk.X)
+
+        self.progress = ttk.Progressbar(main_frame, maximum=1.0, mode='determinate')
+        self.progress.pack(fill=tk.X, pady=10)
+
+        self.cancel_btn = ttk.Button(main_frame, text="Отмена", command=self.cancel)
+        self.cancel_btn.pack()
+
+    def update(self, fraction, text):
+        """Обновление полосы и подписи"""
+        self.progress['value'] = fraction
+        self.label.config(text=text)
+
+    def cancel(self):
+        """Запрос отмены операции"""
+        self.cancel_event.set()
+        self.cancel_btn.config(state=tk.DISABLED)
+        self.label.config(text="Отмена...")
+
+    def close(self):
+        self.dialog.destroy()
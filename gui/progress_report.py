@@ -0,0 +1,162 @@
+import datetime
+import tkinter as tk
+from tkinter import ttk
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database as db
+
+
+class ProgressReport:
+    """Отчёт «Прогресс по категориям»: часы занятий по периодам
+
+    Данные берутся из сводки session_rollup, которую ведут триггеры,
+    поэтому запрос читает десятки строк независимо от числа сессий.
+    Линия на категорию её цветом и пунктиром общий итог.
+    """
+
+    # Период: (подпись, число корзин на графике)
+    PERIODS = {
+        'day': ("День", 30),
+        'week': ("Неделя", 26),
+        'month': ("Месяц", 24),
+    }
+    WIDTH = 760
+    HEIGHT = 380
+    MARGIN_LEFT = 50
+    MARGIN_RIGHT = 20
+    MARGIN_TOP = 20
+    MARGIN_BOTTOM = 40
+    GRID_LINES = 5
+
+    def __init__(self, parent, executor):
+        self.executor = executor
+
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Прогресс по категориям")
+        self.dialog.transient(parent)
+
+        self.period_var = tk.StringVar(value=self.PERIODS['week'][0])
+        self.setup_ui()
+        self.load()
+
+    def setup_ui(self):
+        main_frame = ttk.Frame(self.dialog, padding=10)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        top_frame = ttk.Frame(main_frame)
+        top_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(top_frame, text="Период:").pack(side=tk.LEFT)
+        period_combo = ttk.Combobox(
+            top_frame, textvariable=self.period_var, state='readonly', width=10,
+            values=[label for label, _ in self.PERIODS.values()])
+        period_combo.pack(side=tk.LEFT, padx=5)
+        period_combo.bind('<<ComboboxSelected>>', lambda e: self.load())
+        self.status_label = ttk.Label(top_frame, text="")
+        self.status_label.pack(side=tk.RIGHT)
+
+        chart_frame = ttk.Frame(main_frame)
+        chart_frame.pack(fill=tk.BOTH, expand=True)
+        self.canvas = tk.Canvas(chart_frame, width=self.WIDTH, height=self.HEIGHT,
+                                background='white', highlightthickness=0)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.legend = ttk.Treeview(chart_frame, columns=('hours',), show='tree headings',
+                                   height=15)
+        self.legend.heading('#0', text='Категория')
+        self.legend.heading('hours', text='Часов')
+        self.legend.column('#0', width=160)
+        self.legend.column('hours', width=60, anchor=tk.E)
+        self.legend.pack(side=tk.RIGHT, fill=tk.Y, padx=(10, 0))
+
+        ttk.Button(main_frame, text="Закрыть",
+                   command=self.dialog.destroy).pack(anchor=tk.E, pady=(10, 0))
+
+    def period(self):
+        label = self.period_var.get()
+        return next(key for key, (text, _) in self.PERIODS.items() if text == label)
+
+    def load(self):
+        """Запрос сводки за выбранный период в рабочем потоке"""
+        period = self.period()
+        buckets = db.rollup_buckets(period, self.PERIODS[period][1], datetime.date.today())
+        self.status_label.config(text="Загрузка...")
+        self.executor.submit(
+            self.fetch, period, buckets[0],
+            key='progress_report',
+            on_done=lambda result: self.show(buckets, *result),
+            on_error=self.show_error,
+        )
+
+    @staticmethod
+    def fetch(period, since):
+        return (db.get_rollup_series(period, 'category', since),
+                db.get_rollup_series(period, 'all', since).get(0, []))
+
+    def show_error(self, error):
+        if self.dialog.winfo_exists():
+            self.status_label.config(text=f"Ошибка: {error}")
+
+    def show(self, buckets, series, total):
+        """Отрисовка линий, осей и легенды"""
+        if not self.dialog.winfo_exists():
+            return
+        self.status_label.config(text="")
+        self.canvas.delete('all')
+        for row in self.legend.get_children():
+            self.legend.delete(row)
+
+        lines = []
+        for category_id, points in series.items():
+            category = db.get_category(category_id)
+            name, color = (category[1], category[3]) if category else (f"#{category_id}", '#808080')
+            lines.append((name, color, dict(points)))
+        lines.sort(key=lambda line: -sum(line[2].values()))
+        total = dict(total)
+
+        width = max(self.canvas.winfo_width(), self.WIDTH)
+        height = max(self.canvas.winfo_height(), self.HEIGHT)
+        left, top = self.MARGIN_LEFT, self.MARGIN_TOP
+        right, bottom = width - self.MARGIN_RIGHT, height - self.MARGIN_BOTTOM
+        top_hours = max([minutes / 60 for minutes in total.values()] + [1])
+        step_x = (right - left) / max(len(buckets) - 1, 1)
+
+        def y_of(minutes):
+            return bottom - (bottom - top) * minutes / 60 / top_hours
+
+        # Сетка и подписи оси часов
+        for i in range(self.GRID_LINES + 1):
+            y = bottom - (bottom - top) * i / self.GRID_LINES
+            self.canvas.create_line(left, y, right, y, fill='#e0e0e0')
+            self.canvas.create_text(left - 5, y, anchor=tk.E, font=('Arial', 8),
+                                    text=f"{top_hours * i / self.GRID_LINES:.1f}")
+        self.canvas.create_line(left, top, left, bottom)
+        self.canvas.create_line(left, bottom, right, bottom)
+
+        # Подписи корзин, не чаще чем через 60 пикселей
+        every = max(1, int(60 // step_x) + 1)
+        for i, bucket in enumerate(buckets):
+            if i % every == 0 or i == len(buckets) - 1:
+                x = left + i * step_x
+                self.canvas.create_line(x, bottom, x, bottom + 4)
+                self.canvas.create_text(x, bottom + 6, anchor=tk.N, font=('Arial', 8), text=bucket)
+
+        def draw(points, **options):
+            coords = []
+            for i, bucket in enumerate(buckets):
+                coords += [left + i * step_x, y_of(points.get(bucket, 0))]
+            if len(coords) >= 4:
+                self.canvas.create_line(*coords, width=2, **options)
+
+        for name, color, points in reversed(lines):
+            draw(points, fill=color)
+        draw(total, fill='black', dash=(4, 3))
+
+        self.legend.insert('', tk.END, text="Всего",
+                           values=(f"{sum(total.get(b, 0) for b in buckets) / 60:.1f}",))
+        for name, color, points in lines:
+            tag = f"color{color}"
+            self.legend.tag_configure(tag, foreground=color)
+            self.legend.insert('', tk.END, text=f"● {name}", tags=(tag,),
+                               values=(f"{sum(points.get(b, 0) for b in buckets) / 60:.1f}",))
@@ -0,0 +1,144 @@
+from collections import OrderedDict
+import bisect
+import re
+import sqlite3
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database as db
+
+
+class SearchCache:
+    """LRU-кэш результатов текстового поиска
+
+    Ключ - (запрос, статус, категория), значение - id найденных записей
+    в порядке релевантности. Запрос, который продолжает закэшированный
+    (пользователь дописал буквы или слово), даёт подмножество его
+    результатов, поэтому отвечается фильтрацией этого набора в памяти
+    без обращения к базе; порядок наследуется от исходного запроса.
+
+    Для фильтрации у результата, пришедшего из базы, строится индекс
+    слово -> номера строк. Уточнённые результаты хранят номера строк
+    исходного и пользуются его индексом.
+
+    lookup() вызывается в потоке Tk и базу не читает: есть ли в ней
+    полнотекстовый индекс, узнаёт fetch() в рабочем потоке.
+    """
+
+    def __init__(self, max_entries=32, max_rows=200000):
+        self.max_entries = max_entries
+        self.max_rows = max_rows  # сколько проиндексированных строк держать в памяти
+        self.entries = OrderedDict()
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.fts = None  # fts_enabled() базы, известен после первого fetch()
+
+    @staticmethod
+    def fetch(query, status=None, category_id=None, max_rows=200000, interrupt=None):
+        """Запрос к базе и индекс слов результата; безопасно в рабочем потоке
+
+        interrupt (db.QueryInterrupt) прерывает запрос, ставший ненужным;
+        прерванный fetch() завершается sqlite3.OperationalError.
+        """
+        rows = db.search_study_item_ids(query, status, category_id, interrupt=interrupt)
+        index = None
+        if interrupt is not None and interrupt.interrupted:
+            # Запрос успел завершиться, но результат уже не нужен
+            raise sqlite3.OperationalError("interrupted")
+        if len(rows) <= max_rows:
+            postings = {}
+            for position, (item_id, text) in enumerate(rows):
+                for word in set(re.findall(r'\w+', db.fold_text(text))):
+                    postings.setdefault(word, []).append(position)
+            index = {'words': sorted(postings), 'postings': postings}
+        return {'ids': [row[0] for row in rows], 'index': index, 'fts': db.fts_enabled()}
+
+    def lookup(self, query, status=None, category_id=None):
+        """id результатов из кэша или None, если нужен запрос к базе"""
+        key = (query, status, category_id)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry['ids']
+
+        terms = db.search_terms(query, self.fts) if self.fts is not None else None
+        base = self._longest_prefix(query, status, category_id) if terms else None
+        if base is None:
+            self.misses += 1
+            return None
+
+        root = base['root']
+        if root['key'] in self.entries:
+            self.entries.move_to_end(root['key'])
+        keep = None
+        # Термы, совпавшие с термами исходного запроса, уже проверены
+        for term in set(terms) - set(db.search_terms(base['query'], self.fts) or ()):
+            matched = self._matching_positions(root['index'], term)
+            keep = matched if keep is None else keep & matched
+
+        positions = base['positions']
+        if keep is not None:
+            positions = [position for position in positions if position in keep]
+        self.hits += 1
+        return self._put(key, {
+            'key': key,
+            'query': query,
+            'root': root,
+            'positions': positions,
+            'ids': [root['ids'][position] for position in positions],
+        })
+
+    def store(self, query, status, category_id, fetched):
+        """Сохранение результата fetch(); возвращает id"""
+        self.fts = fetched.pop('fts')
+        fetched['key'] = (query, status, category_id)
+        fetched['query'] = query
+        fetched['root'] = fetched
+        fetched['positions'] = range(len(fetched['ids']))
+        self.rows += len(fetched['ids']) if fetched['index'] else 0
+        return self._put(fetched['key'], fetched)
+
+    def clear(self):
+        """Сброс кэша после изменения данных"""
+        self.entries.clear()
+        self.rows = 0
+
+    @staticmethod
+    def _matching_positions(index, term):
+        """Строки, в которых есть слово, начинающееся с term"""
+        words = index['words']
+        matched = set()
+        for position in range(bisect.bisect_left(words, term), len(words)):
+            if not words[position].startswith(term):
+                break
+            matched.update(index['postings'][words[position]])
+        return matched
+
+    def _longest_prefix(self, query, status, category_id):
+        best = None
+        for (cached_query, cached_status, cached_category), entry in self.entries.items():
+            if (cached_status == status and cached_category == category_id
+                    and entry['root']['index'] is not None and query.startswith(cached_query)
+                    and (best is None or len(cached_query) > len(best['query']))):
+                best = entry
+        return best
+
+    def _put(self, key, entry):
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = entry
+        while len(self.entries) > self.max_entries or self.rows > self.max_rows:
+            self._drop(next(iter(self.entries)))
+        return entry['ids']
+
+    def _drop(self, key):
+        entry = self.entries.pop(key)
+        if entry['root'] is entry:
+            if entry['index']:
+                self.rows -= len(entry['ids'])
+            # Уточнённые результаты держат индекс исходного, уходят вместе с ним
+            for derived in [k for k, e in self.entries.items() if e['root'] is entry]:
+                del self.entries[derived]
@@ -0,0 +1,124 @@
+import sqlite3
+import time
+import tkinter as tk
+from tkinter import ttk, messagebox
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database as db
+
+
+class SessionTimer:
+    """Секундомер учебной сессии на панели инструментов
+
+    Идёт по монотонным часам, поэтому перевод системного времени не
+    искажает длительность. При остановке сессия записывается в базу в
+    рабочем потоке исполнителя, а часы материала увеличивает триггер.
+    """
+
+    TICK_MS = 1000
+    # Более короткие занятия не записываются
+    MIN_SECONDS = 30
+
+    def __init__(self, parent, get_item, on_logged=None, executor=None):
+        self.get_item = get_item  # () -> (id, название) выбранного материала или None
+        self.on_logged = on_logged
+        self.executor = executor
+        self.item_id = None
+        self.title = None
+        self.started = None
+        self._tick_id = None
+
+        self.frame = ttk.Frame(parent)
+        self.label = ttk.Label(self.frame, text="", width=40, anchor=tk.E)
+        self.label.pack(side=tk.LEFT, padx=5)
+        self.button = ttk.Button(self.frame, text="⏱ Начать занятие", command=self.toggle)
+        self.button.pack(side=tk.LEFT)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    @property
+    def running(self):
+        return self.started is not None
+
+    def elapsed(self):
+        """Прошедшее время в секундах"""
+        return time.monotonic() - self.started if self.running else 0
+
+    def toggle(self):
+        """Кнопка: остановка идущей сессии или запуск для выбранного материала"""
+        if self.running:
+            self.stop()
+            return
+        item = self.get_item()
+        if item:
+            self.start(*item)
+
+    def start(self, item_id, title):
+        """Запуск отсчёта; идущая сессия другого материала сначала записывается"""
+        if self.running:
+            self.stop()
+        self.item_id = item_id
+        self.title = title
+        self.started = time.monotonic()
+        self.button.config(text="⏹ Остановить")
+        self._tick()
+
+    def stop(self, notify=True):
+        """Остановка и запись сессии; возвращает её длительность в минутах
+
+        notify=False - без вызова on_logged, например при закрытии окна:
+        тогда сессия записывается сразу, не дожидаясь рабочего потока.
+        """
+        if not self.running:
+            return 0
+        seconds = self.elapsed()
+        item_id = self.item_id
+        title = self.title
+        self.started = None
+        if self._tick_id is not None:
+            self.label.after_cancel(self._tick_id)
+            self._tick_id = None
+        self.label.config(text="")
+        self.button.config(text="⏱ Начать занятие")
+
+        if seconds < self.MIN_SECONDS:
+            return 0
+        minutes = max(1, round(seconds / 60))
+        if notify and self.executor is not None:
+            self.executor.submit(
+                db.write, db.add_study_session, item_id, minutes,
+                on_done=lambda _: self._logged(item_id, minutes),
+                on_error=lambda e: self.report_lost(title, minutes, e)
+            )
+        else:
+            try:
+                db.write(db.add_study_session, item_id, minutes)
+            except sqlite3.Error as e:
+                self.report_lost(title, minutes, e)
+                return 0
+            if notify:
+                self._logged(item_id, minutes)
+        return minutes
+
+    def _logged(self, item_id, minutes):
+        if self.on_logged:
+            self.on_logged(item_id, minutes)
+
+    def report_lost(self, title, minutes, error):
+        """Сессия остановлена, но не записана"""
+        if isinstance(error, sqlite3.IntegrityError):
+            reason = "материал был удалён, пока шло занятие"
+        else:
+            reason = str(error)
+        messagebox.showwarning(
+            "Занятие не записано",
+            f"Занятие «{title}» ({minutes} мин) не записано:\n{reason}")
+
+    def _tick(self):
+        seconds = int(self.elapsed())
+        self.label.config(
+            text=f"⏱ {self.title[:25]}  {seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}")
+        self._tick_id = self.label.after(self.TICK_MS, self._tick)
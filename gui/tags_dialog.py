@@ -95,7 +95,7 @@ class TagsDialog:
 
         if messagebox.askyesno("Подтверждение", "Вы уверены, что хотите удалить этот тег?"):
             tag_id = self.tree.item(selected[0])['values'][0]
-            db.delete_tag(tag_id)
+            db.write(db.delete_tag, tag_id)
             self.load_tags()
 
 
@@ -114,11 +114,11 @@ class TagEditDialog:
         self.name_var = tk.StringVar()
         self.color_var = tk.StringVar(value="#2ecc71")
 
+        self.setup_ui()
+
         if tag_id:
             self.load_tag()
 
-        self.setup_ui()
-
     def setup_ui(self):
         main_frame = ttk.Frame(self.dialog, padding=20)
         main_frame.pack(fill=tk.BOTH, expand=True)
@@ -153,13 +153,11 @@ class TagEditDialog:
             self.color_btn.config(bg=color[1])
 
     def load_tag(self):
-        tags = db.get_all_tags()
-        for tag in tags:
-            if tag[0] == self.tag_id:
-                self.name_var.set(tag[1])
-                self.color_var.set(tag[2])
-                self.color_btn.config(bg=tag[2])
-                break
+        tag = db.get_tag(self.tag_id)
+        if tag:
+            self.name_var.set(tag[1])
+            self.color_var.set(tag[2])
+            self.color_btn.config(bg=tag[2])
 
     def save(self):
         if not self.name_var.get().strip():
@@ -168,13 +166,15 @@ class TagEditDialog:
 
         try:
             if self.tag_id:
-                db.update_tag(
+                db.write(
+                    db.update_tag,
                     self.tag_id,
                     self.name_var.get().strip(),
                     self.color_var.get()
                 )
             else:
-                db.add_tag(
+                db.write(
+                    db.add_tag,
                     self.name_var.get().strip(),
                     self.color_var.get()
                 )
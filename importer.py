@@ -0,0 +1,298 @@
+"""Потоковый импорт учебных материалов из CSV и JSON Lines
+
+Записи читаются лениво и вставляются пачками через executemany, каждая
+пачка - одна операция очереди записи (database.write). Категории и теги ищутся по имени в словаре в
+памяти, недостающие создаются по ходу импорта. Для больших файлов
+вторичные индексы и триггеры можно отложить: они удаляются перед
+загрузкой и восстанавливаются одним проходом в конце.
+
+Запуск без GUI из корня проекта:
+    python importer.py items.csv [--defer] [--db study_tracker.db]
+"""
+import argparse
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import database as db
+
+CHUNK_SIZE = 50000
+# Файлы больше порога импортируются с отложенными индексами и триггерами
+DEFER_THRESHOLD = 20 * 1024 * 1024
+# Сколько ошибок разбора сохранять в отчёте
+MAX_ERRORS = 20
+
+FORMATS = ('.csv', '.jsonl')
+
+ITEM_INSERT = '''
+INSERT INTO study_items
+(id, title, description, category_id, rating, status, created_at, deadline, hours_spent, priority)
+VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?)
+'''
+TAG_INSERT = "INSERT OR IGNORE INTO study_item_tags (study_item_id, tag_id) VALUES (?, ?)"
+
+
+class RecordFile:
+    """Ленивое чтение записей из CSV или JSON Lines, в том числе .gz"""
+
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+        name = path[:-3] if path.endswith('.gz') else path
+        self.format = os.path.splitext(name)[1].lower()
+        if self.format not in FORMATS:
+            raise ValueError(f"Неподдерживаемый формат файла: {self.format or path}")
+
+        self._raw = open(path, 'rb')
+        binary = gzip.GzipFile(fileobj=self._raw) if path.endswith('.gz') else self._raw
+        self._text = io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+    def position(self):
+        """Прочитано байт исходного файла"""
+        return self._raw.tell()
+
+    def __iter__(self):
+        if self.format == '.csv':
+            for line_no, record in enumerate(csv.DictReader(self._text), 2):
+                yield line_no, record
+        else:
+            for line_no, line in enumerate(self._text, 1):
+                if line.strip():
+                    yield line_no, line
+
+    def close(self):
+        self._text.close()
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class NameResolver:
+    """Поиск id категорий и тегов по имени с созданием недостающих"""
+
+    def __init__(self, conn, table):
+        self.table = table
+        self.ids = {name: id for id, name in conn.execute(f"SELECT id, name FROM {table}")}
+
+    def resolve(self, conn, name):
+        item_id = self.ids.get(name)
+        if item_id is None:
+            # Имя могло появиться из другого процесса после загрузки словаря
+            conn.execute(f"INSERT OR IGNORE INTO {self.table} (name) VALUES (?)", (name,))
+            item_id = conn.execute(
+                f"SELECT id FROM {self.table} WHERE name = ?", (name,)).fetchone()[0]
+            self.ids[name] = item_id
+        return item_id
+
+
+def _number(value, convert):
+    value = value.strip() if value else ''
+    return convert(value) if value else None
+
+
+def _score(value, field):
+    """Оценка по шкале 1-5: рейтинг или приоритет"""
+    number = _number(value, lambda v: int(float(v)))
+    if number is not None and not 1 <= number <= 5:
+        raise ValueError(f"{field} должен быть от 1 до 5")
+    return number
+
+
+def _date(value, field):
+    """Дата ГГГГ-ММ-ДД, как её сравнивают списки и планировщик дедлайнов"""
+    value = value.strip() if value else ''
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f"{field}: ожидается дата ГГГГ-ММ-ДД, получено {value!r}")
+
+
+def _timestamp(value, field):
+    """Время в формате CURRENT_TIMESTAMP: ГГГГ-ММ-ДД ЧЧ:ММ:СС"""
+    value = value.strip() if value else ''
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value).strftime('%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        raise ValueError(f"{field}: ожидается дата и время ISO 8601, получено {value!r}")
+
+
+def parse_record(record):
+    """Проверка записи и приведение полей к типам таблицы
+
+    Возвращает кортеж (title, description, category, rating, status,
+    created_at, deadline, hours_spent, priority, tags).
+    """
+    if isinstance(record, str):
+        record = json.loads(record)
+        if not isinstance(record, dict):
+            raise ValueError("ожидается JSON-объект")
+        # Числа и прочие скаляры из JSON приводим к строкам, как в CSV
+        record = {key: value if value is None or isinstance(value, (str, list)) else str(value)
+                  for key, value in record.items()}
+
+    get = record.get
+    title = (get('title') or '').strip()
+    if not title:
+        raise ValueError("не заполнено название")
+
+    status = (get('status') or '').strip() or 'planned'
+    if status not in db.STATUS_RANKS:
+        raise ValueError(f"неизвестный статус {status!r}")
+
+    tags = get('tags') or ()
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    tags = [name for name in (str(tag).strip() for tag in tags) if name]
+
+    priority = _score(get('priority'), 'приоритет')
+    return (
+        title,
+        (get('description') or '').strip() or None,
+        (get('category') or '').strip() or None,
+        _score(get('rating'), 'рейтинг'),
+        status,
+        _timestamp(get('created_at'), 'дата создания'),
+        _date(get('deadline'), 'дедлайн'),
+        _number(get('hours_spent'), float) or 0,
+        3 if priority is None else priority,
+        tags,
+    )
+
+
+def _next_item_id(conn):
+    """Первый свободный id с учётом счётчика AUTOINCREMENT"""
+    row = conn.execute(
+        "SELECT MAX(IFNULL((SELECT seq FROM sqlite_sequence WHERE name = 'study_items'), 0),"
+        " IFNULL((SELECT MAX(id) FROM study_items), 0))"
+    ).fetchone()
+    return row[0] + 1
+
+
+def _write_chunk(records, categories, tags):
+    """Вставка пачки разобранных записей одной транзакцией"""
+    with db.transaction() as conn:
+        item_id = _next_item_id(conn)
+        item_rows = []
+        tag_rows = []
+        for title, description, category, rating, status, created_at, deadline, \
+                hours_spent, priority, tag_names in records:
+            item_rows.append((
+                item_id, title, description,
+                categories.resolve(conn, category) if category else None,
+                rating, status, created_at, deadline, hours_spent, priority,
+            ))
+            for name in tag_names:
+                tag_rows.append((item_id, tags.resolve(conn, name)))
+            item_id += 1
+
+        conn.executemany(ITEM_INSERT, item_rows)
+        conn.executemany(TAG_INSERT, tag_rows)
+
+
+def _suspend_maintenance():
+    with db.transaction() as conn:
+        return db.suspend_maintenance(conn)
+
+
+def _resume_maintenance(suspended):
+    with db.transaction() as conn:
+        db.resume_maintenance(conn, suspended)
+
+
+def import_file(path, defer=None, chunk_size=CHUNK_SIZE, progress=None, cancel_event=None):
+    """Импорт файла; возвращает отчёт о загруженных и пропущенных записях
+
+    progress(imported, fraction) вызывается после каждой пачки, установка
+    cancel_event останавливает импорт после текущей пачки. Уже записанные
+    пачки при отмене остаются в базе.
+    """
+    if defer is None:
+        defer = os.path.getsize(path) > DEFER_THRESHOLD
+
+    report = {'imported': 0, 'skipped': 0, 'errors': [], 'cancelled': False}
+    suspended = set()
+
+    with RecordFile(path) as source:
+        with db.reader() as conn:
+            categories = NameResolver(conn, 'categories')
+            tags = NameResolver(conn, 'tags')
+
+        if defer:
+            suspended = db.write(_suspend_maintenance)
+        try:
+            chunk = []
+            for line_no, record in source:
+                try:
+                    chunk.append(parse_record(record))
+                except (ValueError, TypeError, AttributeError) as e:
+                    report['skipped'] += 1
+                    if len(report['errors']) < MAX_ERRORS:
+                        report['errors'].append(f"Строка {line_no}: {e}")
+
+                if len(chunk) >= chunk_size:
+                    db.write(_write_chunk, chunk, categories, tags)
+                    report['imported'] += len(chunk)
+                    chunk = []
+                    if progress:
+                        progress(report['imported'], source.position() / (source.size or 1))
+                    if cancel_event is not None and cancel_event.is_set():
+                        report['cancelled'] = True
+                        break
+
+            if chunk and not report['cancelled']:
+                db.write(_write_chunk, chunk, categories, tags)
+                report['imported'] += len(chunk)
+        finally:
+            if suspended:
+                db.write(_resume_maintenance, suspended)
+
+    if progress:
+        progress(report['imported'], 1.0)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Импорт учебных материалов из CSV или JSON Lines")
+    parser.add_argument('path', help="файл .csv или .jsonl, можно сжатый .gz")
+    parser.add_argument('--defer', action='store_true', default=None,
+                        help="отложить индексы и триггеры до конца загрузки")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--db', default=db.DB_NAME, help="файл базы данных")
+    args = parser.parse_args()
+
+    db.use_database(args.db)
+    db.init_database()
+
+    start = time.perf_counter()
+    try:
+        report = import_file(
+            args.path, defer=args.defer, chunk_size=args.chunk_size,
+            progress=lambda count, fraction: print(f"\rИмпортировано: {count} ({fraction:.0%})",
+                                                   end='', flush=True))
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"\nОшибка импорта: {e}")
+        return 1
+
+    print(f"\nГотово за {time.perf_counter() - start:.1f} с: "
+          f"импортировано {report['imported']}, пропущено {report['skipped']}")
+    for error in report['errors']:
+        print(f"  {error}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,23 +1,74 @@
+import time
+
+# Отсчёт этапов запуска ведётся от начала работы модуля
+STARTED = time.perf_counter()
+
+import argparse
 import tkinter as tk
+from tkinter import messagebox
 import database as db
-from gui.main_window import MainWindow
+
+
+class StartupProfile:
+    """Время этапов запуска для --startup-profile"""
+
+    def __init__(self, started):
+        self.started = started
+        self.phases = []
+        self.last = started
+
+    def mark(self, phase):
+        """Конец этапа phase: время с предыдущей отметки"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last, now - self.started))
+        self.last = now
+
+    def report(self):
+        print(f"{'этап':<28}{'мс':>10}{'с начала, мс':>16}")
+        for phase, elapsed, total in self.phases:
+            print(f"{phase:<28}{elapsed * 1000:>10.1f}{total * 1000:>16.1f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Трекер учебы")
+    parser.add_argument('--startup-profile', action='store_true',
+                        help="вывести время этапов запуска")
+    parser.add_argument('--profile-queries', metavar='FILE',
+                        help="профилировать запросы к базе и сохранить отчёт в FILE при выходе")
+    return parser.parse_args()
 
 
 def main():
+    args = parse_args()
+    profile = StartupProfile(STARTED) if args.startup_profile else None
+    if args.profile_queries:
+        import profiler
+        profiler.enable()
     try:
+        from gui.main_window import MainWindow
+        if profile:
+            profile.mark("импорт модулей")
+
         print("Инициализация базы данных...")
         db.init_database()
         print("База данных готова")
+        if profile:
+            profile.mark("проверка схемы")
 
         print("Запуск приложения...")
-        app = MainWindow()
+        app = MainWindow(profile)
+        if profile:
+            profile.mark("создание окна")
         app.run()
+        if args.profile_queries:
+            profiler.dump(args.profile_queries)
+            print(f"Отчёт профилировщика: {args.profile_queries}")
 
     except Exception as e:
         print(f"Критическая ошибка: {e}")
         root = tk.Tk()
         root.withdraw()
-        tk.messagebox.showerror(
+        messagebox.showerror(
             "Ошибка запуска",
             f"Не удалось запустить приложение:\n{str(e)}\n\n"
             "Проверьте наличие необходимых библиотек и прав доступа."
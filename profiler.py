@@ -0,0 +1,285 @@
+"""Профилирование слоя данных: время вызовов, SQL и планы запросов
+
+Включается явно (enable() или main.py --profile-queries). Публичные
+функции database.py подменяются обёртками, которые замеряют время
+вызова и число строк результата, а трассировка соединений собирает
+выполненный каждым вызовом SQL. disable() возвращает исходные функции
+и снимает трассировку, поэтому выключенный профилировщик ничего не
+стоит: вызовы идут напрямую, как без него.
+
+По каждой функции хранится скользящее окно последних ROLLING_SIZE
+длительностей, из него строятся перцентили и гистограмма. Планы
+запросов (EXPLAIN QUERY PLAN) снимаются при построении отчёта на
+отдельном соединении; полный просмотр большой таблицы помечается.
+
+Отчёт для разбора вне приложения:
+    profiler.dump('profile.json')
+"""
+import bisect
+import functools
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import database as db
+
+# Длительностей в скользящем окне на функцию
+ROLLING_SIZE = 1000
+# Последних вызовов в журнале
+RECENT_SIZE = 200
+# Запросов, запоминаемых за один вызов (executemany трассирует каждую строку)
+STATEMENTS_PER_CALL = 100
+# Верхние границы корзин гистограммы, мс; последняя корзина - всё, что дольше
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# Чистые функции и служебные обёртки над соединениями: SQL не выполняют
+# или вызываются на каждую строку, замер только мешал бы
+UNPROFILED = frozenset({
+    'study_item_row', 'decode_study_items', 'get_manager', 'set_trace_callback',
+    'transaction', 'reader', 'close_connections', 'use_database', 'item_sort_key',
+    'ids_param', 'invalidate_reference_cache', 'rollup_bucket', 'rollup_buckets',
+    'build_fts_query', 'fold_text', 'search_terms', 'build_search_query',
+    'submit_write', 'write', 'is_busy_error', 'get_write_stats',
+    'cached_query', 'get_query_cache_stats', 'clear_query_cache',
+})
+
+# Таблицы, растущие вместе с данными (и их псевдонимы в запросах);
+# справочники и сводные таблицы малы, их просмотр целиком допустим
+LARGE_TABLES = {'study_items', 'si', 'study_item_tags', 'sit', 'study_sessions'}
+
+# Операторы, у которых есть план
+_PLANNED = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def full_scans(conn, sql):
+    """Строки плана с полным сканированием большой таблицы"""
+    plan = conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+    return [
+        row[3] for row in plan
+        if row[3].startswith('SCAN ')
+        and row[3].split()[1] in LARGE_TABLES
+        and ' USING ' not in row[3]
+    ]
+
+
+def normalize_sql(sql):
+    """Текст запроса без значений параметров: одинаковые запросы с разными
+    аргументами сводятся к одной строке"""
+    return _LITERAL_RE.sub('?', ' '.join(sql.split()))
+
+
+class _FunctionStats:
+    __slots__ = ('calls', 'total_ms', 'max_ms', 'rows', 'sized', 'recent')
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.sized = 0  # вызовов, вернувших коллекцию строк
+        self.recent = deque(maxlen=ROLLING_SIZE)
+
+
+class QueryProfiler:
+    """Сборщик замеров; один на процесс (см. get_profiler())"""
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._originals = {}
+        self.reset()
+
+    def reset(self):
+        """Очистка накопленных замеров"""
+        with self._lock:
+            self.functions = {}
+            self.statements = {}  # нормализованный SQL -> [выполнений, пример, функции]
+            self.recent = deque(maxlen=RECENT_SIZE)
+            self.plans = {}
+
+    def enable(self):
+        """Подмена публичных функций database.py обёртками и включение трассировки"""
+        if self.enabled:
+            return
+        for name, func in list(vars(db).items()):
+            if (callable(func) and getattr(func, '__module__', None) == db.__name__
+                    and not isinstance(func, type) and not name.startswith('_')
+                    and name not in UNPROFILED):
+                self._originals[name] = func
+                setattr(db, name, self._wrap(name, func))
+        db.set_trace_callback(self._on_statement)
+        self.enabled = True
+
+    def disable(self):
+        """Возврат исходных функций: без профилировщика вызовы идут напрямую"""
+        if not self.enabled:
+            return
+        db.set_trace_callback(None)
+        for name, func in self._originals.items():
+            setattr(db, name, func)
+        self._originals.clear()
+        self.enabled = False
+
+    def _wrap(self, name, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stack = self._stack()
+            statements = []
+            stack.append(statements)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                elapsed = (time.perf_counter() - start) * 1000
+                stack.pop()
+            self._record(name, elapsed, result, statements)
+            return result
+        return wrapper
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _on_statement(self, sql):
+        # Вызывается SQLite в потоке, выполняющем запрос: SQL достаётся
+        # самому внутреннему профилируемому вызову этого потока
+        # Строки "-- ..." - внутренние запросы FTS5 к своим таблицам
+        stack = getattr(self._local, 'stack', None)
+        if stack and len(stack[-1]) < STATEMENTS_PER_CALL and not sql.startswith('--'):
+            stack[-1].append(sql)
+
+    def _record(self, name, elapsed, result, statements):
+        rows = len(result) if isinstance(result, (list, dict, set, tuple)) else None
+        with self._lock:
+            stats = self.functions.get(name)
+            if stats is None:
+                stats = self.functions[name] = _FunctionStats()
+            stats.calls += 1
+            stats.total_ms += elapsed
+            stats.max_ms = max(stats.max_ms, elapsed)
+            if rows is not None:
+                stats.rows += rows
+                stats.sized += 1
+            stats.recent.append(elapsed)
+
+            for sql in statements:
+                key = normalize_sql(sql)
+                entry = self.statements.get(key)
+                if entry is None:
+                    entry = self.statements[key] = [0, sql, set()]
+                entry[0] += 1
+                entry[2].add(name)
+            self.recent.append((time.time(), name, elapsed, rows, statements))
+
+    def explain(self):
+        """Планы ещё не проверенных запросов; безопасно в рабочем потоке
+
+        EXPLAIN выполняется на отдельном соединении, чтобы не занимать
+        соединения менеджера и не попадать в трассировку.
+        """
+        with self._lock:
+            pending = [(key, entry[1]) for key, entry in self.statements.items()
+                       if key not in self.plans]
+        if not pending:
+            return
+        conn = sqlite3.connect(db.DB_NAME)
+        try:
+            for key, sql in pending:
+                if not sql.lstrip().upper().startswith(_PLANNED):
+                    plan = None
+                else:
+                    try:
+                        plan = full_scans(conn, sql)
+                    except sqlite3.Error:
+                        # Запрос к временной таблице или объекту, которого уже нет
+                        plan = None
+                with self._lock:
+                    self.plans[key] = plan
+        finally:
+            conn.close()
+
+    def report(self):
+        """Сводка замеров: функции с перцентилями и гистограммой, запросы
+        с пометкой полного просмотра, журнал последних вызовов и счётчики
+        кэша запросов"""
+        self.explain()
+        with self._lock:
+            functions = {
+                name: _summarize(stats) for name, stats in sorted(self.functions.items())
+            }
+            statements = sorted((
+                {
+                    'sql': key,
+                    'example': example,
+                    'executions': executions,
+                    'functions': sorted(names),
+                    'full_scans': self.plans.get(key) or [],
+                }
+                for key, (executions, example, names) in self.statements.items()
+            ), key=lambda statement: (not statement['full_scans'], -statement['executions']))
+            recent = [
+                {'time': at, 'function': name, 'ms': round(elapsed, 3), 'rows': rows, 'sql': sql}
+                for at, name, elapsed, rows, sql in self.recent
+            ]
+        return {
+            'enabled': self.enabled,
+            'database': db.DB_NAME,
+            'query_cache': db.get_query_cache_stats(),
+            'histogram_bounds_ms': list(HISTOGRAM_BOUNDS_MS),
+            'functions': functions,
+            'statements': statements,
+            'recent': recent,
+        }
+
+    def dump(self, path):
+        """Отчёт report() в JSON-файл"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=1)
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _summarize(stats):
+    ordered = sorted(stats.recent)
+    histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+    for elapsed in ordered:
+        histogram[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, elapsed)] += 1
+    return {
+        'calls': stats.calls,
+        'total_ms': round(stats.total_ms, 3),
+        'max_ms': round(stats.max_ms, 3),
+        'avg_rows': round(stats.rows / stats.sized, 1) if stats.sized else None,
+        'p50_ms': round(_percentile(ordered, 0.5), 3),
+        'p95_ms': round(_percentile(ordered, 0.95), 3),
+        'p99_ms': round(_percentile(ordered, 0.99), 3),
+        'histogram': histogram,
+    }
+
+
+_profiler = QueryProfiler()
+
+
+def get_profiler():
+    """Профилировщик процесса"""
+    return _profiler
+
+
+def enable():
+    _profiler.enable()
+
+
+def disable():
+    _profiler.disable()
+
+
+def dump(path):
+    _profiler.dump(path)
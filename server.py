@@ -0,0 +1,574 @@
+"""HTTP/JSON-сервис над database.py для нескольких клиентов одной базы
+
+Необязательный модуль: GUI, браузерная панель и скрипты могут ходить к
+одной базе через сервис, а не открывать файл SQLite каждый сам. Только
+стандартная библиотека: asyncio-сервер и разбор HTTP/1.1 с keep-alive.
+
+Чтения (GET) выполняются в пуле из READER_POOL_SIZE потоков, каждый
+берёт читающее соединение менеджера. Записи идут через очередь потока-
+писателя database.py (submit_write): запросы, пришедшие одновременно,
+фиксируются одной транзакцией и не ждут блокировку друг друга в SQLite.
+
+Ответы GET несут ETag по PRAGMA data_version: он меняется после любого
+коммита, в том числе из другого процесса. Запрос с If-None-Match и
+актуальным ETag получает 304 без обращения к данным.
+
+Маршруты:
+    GET    /items?status=&category_id=&tag_id=&search=&limit=&cursor=&count=1
+    GET    /items/<id>
+    GET    /items/<id>/sessions?from=&to=
+    GET    /categories, /tags, /stats
+    GET    /rollups/<day|week|month>?kind=category&since=
+    POST   /items                    новый материал, ответ 201 {"id": ...}
+    PUT    /items/<id>               замена материала целиком
+    PATCH  /items/<id>               изменение полей, как строка cli.py update
+    PATCH  /items                    список изменений в формате cli.py update
+    DELETE /items/<id>
+    POST   /items/<id>/sessions      {"duration_minutes": 30, "date": ..., "notes": ...}
+
+Постраничная выдача /items: в ответе поле "next" — курсор следующей
+страницы (null на последней), он передаётся в параметре cursor.
+
+Запуск из корня проекта:
+    python server.py --port 8765
+"""
+import argparse
+import asyncio
+import base64
+import binascii
+import concurrent.futures
+import contextlib
+import datetime
+import io
+import json
+import re
+import sqlite3
+import sys
+import uuid
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import database as db
+from cli import ITEM_OUTPUT_FIELDS, CliError, apply_changes, check_item_fields
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Наибольший размер страницы /items
+MAX_LIMIT = 500
+# Ограничения запроса
+MAX_BODY = 1 << 20
+MAX_HEADERS = 100
+# Сколько ждать следующего запроса на открытом соединении, с
+KEEPALIVE_TIMEOUT = 15
+
+# Значения полей нового материала, не переданные клиентом
+ITEM_DEFAULTS = {
+    'description': '',
+    'category_id': None,
+    'rating': None,
+    'status': 'planned',
+    'deadline': None,
+    'priority': 3,
+}
+ITEM_INPUT_FIELDS = frozenset(ITEM_DEFAULTS) | {'title', 'hours_spent', 'category', 'tags'}
+ROLLUP_KINDS = ('all', 'category', 'tag')
+
+
+class HttpError(Exception):
+    """Ошибка запроса с кодом ответа"""
+
+    def __init__(self, status, message=None):
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+
+
+class Request:
+    __slots__ = ('method', 'path', 'query', 'version', 'headers', 'body', 'params')
+
+    def __init__(self, method, target, version, headers, body):
+        parts = urlsplit(target)
+        self.method = method
+        self.version = version
+        self.path = parts.path.rstrip('/') or '/'
+        # Повторённый параметр: берётся последнее значение
+        self.query = {name: values[-1] for name, values in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.body = body
+        self.params = ()
+
+    def json(self):
+        """Тело запроса как JSON"""
+        try:
+            return json.loads(self.body or b'null')
+        except ValueError as e:
+            raise HttpError(400, f"некорректный JSON: {e}")
+
+
+ROUTES = []
+
+
+def route(method, pattern):
+    """Регистрация обработчика; группы шаблона попадают в request.params"""
+    def register(handler):
+        ROUTES.append((method, re.compile(pattern + '$'), handler))
+        return handler
+    return register
+
+
+def _int_param(query, name, default=None, low=None, high=None):
+    value = query.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise HttpError(400, f"{name}: ожидается целое число")
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise HttpError(400, f"{name}: допустимо от {low} до {high}")
+    return value
+
+
+def _list_filters(query):
+    status = query.get('status')
+    if status is not None and status not in db.STATUS_RANKS:
+        raise HttpError(400, f"неизвестный статус «{status}»")
+    return {
+        'status': status,
+        'category_id': _int_param(query, 'category_id'),
+        'tag_id': _int_param(query, 'tag_id'),
+    }
+
+
+def encode_cursor(key):
+    """Курсор страницы: ключ сортировки (или смещение в поиске) в base64url"""
+    if key is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error):
+        raise HttpError(400, "некорректный курсор")
+
+
+def _is_offset(cursor):
+    return isinstance(cursor, int) and not isinstance(cursor, bool) and cursor >= 0
+
+
+def _is_sort_key(cursor):
+    """Ключ сортировки списка: три скаляра, как у db.item_sort_key"""
+    return (isinstance(cursor, list) and len(cursor) == 3
+            and all(isinstance(value, (int, float, str, type(None))) for value in cursor))
+
+
+def _item_json(item):
+    return {field: getattr(item, field) for field in ITEM_OUTPUT_FIELDS}
+
+
+@route('GET', r'/items')
+def list_items(request):
+    query = request.query
+    filters = _list_filters(query)
+    limit = _int_param(query, 'limit', db.PAGE_SIZE, 1, MAX_LIMIT)
+    cursor = decode_cursor(query.get('cursor'))
+    payload = {}
+
+    if query.get('search'):
+        # Порядок релевантности не даёт ключа для keyset: курсор — смещение
+        if cursor is not None and not _is_offset(cursor):
+            raise HttpError(400, "некорректный курсор")
+        offset = cursor or 0
+        item_ids = [row[0] for row in db.search_study_item_ids(query['search'], **filters)]
+        page = item_ids[offset:offset + limit]
+        rows = db.get_study_items_by_ids(page)
+        items = [rows[item_id] for item_id in page if item_id in rows]
+        following = offset + limit if offset + limit < len(item_ids) else None
+        if query.get('count'):
+            payload['total'] = len(item_ids)
+    else:
+        if cursor is not None and not _is_sort_key(cursor):
+            raise HttpError(400, "некорректный курсор")
+        items = db.get_study_items_page(after=cursor, limit=limit, **filters)
+        following = db.item_sort_key(items[-1]) if len(items) == limit else None
+        if query.get('count'):
+            payload['total'] = db.count_study_items(**filters)
+
+    payload['items'] = [_item_json(item) for item in items]
+    payload['next'] = encode_cursor(following)
+    return payload
+
+
+@route('GET', r'/items/(\d+)')
+def get_item(request):
+    item, tags = db.get_study_item_by_id(int(request.params[0]))
+    if item is None:
+        raise HttpError(404, "материал не найден")
+    payload = {field: getattr(item, field) for field in db.ITEM_COLUMNS}
+    category = db.get_category(item.category_id)
+    payload['category_name'] = category[1] if category else None
+    payload['tags'] = [tag[1] for tag in tags]
+    return payload
+
+
+@route('GET', r'/items/(\d+)/sessions')
+def get_sessions(request):
+    rows = db.get_item_sessions(int(request.params[0]),
+                                request.query.get('from'), request.query.get('to'))
+    return [
+        {'id': session_id, 'date': date, 'duration_minutes': minutes, 'notes': notes}
+        for session_id, _, date, minutes, notes in rows
+    ]
+
+
+@route('GET', r'/categories')
+def list_categories(request):
+    return [
+        {'id': row[0], 'name': row[1], 'description': row[2], 'color': row[3],
+         'is_default': bool(row[4])}
+        for row in db.get_all_categories()
+    ]
+
+
+@route('GET', r'/tags')
+def list_tags(request):
+    return [{'id': row[0], 'name': row[1], 'color': row[2]} for row in db.get_all_tags()]
+
+
+@route('GET', r'/stats')
+def get_stats(request):
+    return db.get_statistics()
+
+
+@route('GET', r'/rollups/(day|week|month)')
+def get_rollups(request):
+    kind = request.query.get('kind', 'category')
+    if kind not in ROLLUP_KINDS:
+        raise HttpError(400, f"kind: одно из {', '.join(ROLLUP_KINDS)}")
+    series = db.get_rollup_series(request.params[0], kind, request.query.get('since'))
+    return {str(key): points for key, points in series.items()}
+
+
+def _reference_id(lookup, name, label):
+    reference_id = lookup(name)
+    if reference_id is None:
+        raise HttpError(400, f"нет {label} «{name}»")
+    return reference_id
+
+
+def _item_data(body):
+    """Данные для add_study_item/update_study_item; категория и теги по названиям"""
+    if not isinstance(body, dict) or not body.get('title'):
+        raise HttpError(400, "ожидается объект с полем title")
+    unknown = set(body) - ITEM_INPUT_FIELDS
+    if unknown:
+        raise HttpError(400, f"неизвестные поля: {', '.join(sorted(unknown))}")
+    data = dict(ITEM_DEFAULTS, **body)
+    check_item_fields(data)
+    if not isinstance(body.get('category'), (str, type(None))):
+        raise HttpError(400, "category: ожидается название категории")
+    tags = body.get('tags') or []
+    if not isinstance(tags, list) or not all(isinstance(name, str) for name in tags):
+        raise HttpError(400, "tags: ожидается список строк")
+    if body.get('category') is not None:
+        data['category_id'] = _reference_id(db.get_category_id, body['category'], "категории")
+    data['tags'] = [_reference_id(db.get_tag_id, name, "тега") for name in tags]
+    return data
+
+
+@route('POST', r'/items')
+def create_item(request):
+    item_id = db.add_study_item(_item_data(request.json()))
+    return 201, {'id': item_id}
+
+
+@route('PUT', r'/items/(\d+)')
+def replace_item(request):
+    item_id = int(request.params[0])
+    data = _item_data(request.json())
+    if db.get_study_item_by_id(item_id)[0] is None:
+        raise HttpError(404, "материал не найден")
+    db.update_study_item(item_id, data)
+    return {'id': item_id}
+
+
+@route('PATCH', r'/items/(\d+)')
+def patch_item(request):
+    change = request.json()
+    if not isinstance(change, dict):
+        raise HttpError(400, "ожидается объект JSON")
+    change = dict(change, id=int(request.params[0]))
+    change.pop('ids', None)
+    return apply_changes([(1, change)])
+
+
+@route('PATCH', r'/items')
+def patch_items(request):
+    changes = request.json()
+    if isinstance(changes, dict):
+        changes = [changes]
+    if not isinstance(changes, list):
+        raise HttpError(400, "ожидается объект или список изменений")
+    return apply_changes(enumerate(changes, 1))
+
+
+@route('DELETE', r'/items/(\d+)')
+def delete_item(request):
+    if not db.delete_study_items([int(request.params[0])]):
+        raise HttpError(404, "материал не найден")
+    return 204, None
+
+
+@route('POST', r'/items/(\d+)/sessions')
+def create_session(request):
+    body = request.json()
+    minutes = body.get('duration_minutes') if isinstance(body, dict) else None
+    if not isinstance(minutes, int) or isinstance(minutes, bool) or minutes < 0:
+        raise HttpError(400, "ожидается объект с неотрицательным целым duration_minutes")
+    session_id = db.add_study_session(int(request.params[0]), body['duration_minutes'],
+                                      body.get('date'), body.get('notes'))
+    return 201, {'id': session_id}
+
+
+def find_route(method, path):
+    """Обработчик и группы пути; 404 или 405, если маршрута нет"""
+    allowed = []
+    for route_method, pattern, handler in ROUTES:
+        match = pattern.match(path)
+        if match:
+            if route_method == method or (method == 'HEAD' and route_method == 'GET'):
+                return handler, match.groups()
+            allowed.append(route_method)
+    if allowed:
+        raise HttpError(405, f"допустимо: {', '.join(allowed)}")
+    raise HttpError(404, "нет такого адреса")
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+def _encode(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+class StudyServer:
+    """HTTP-сервис: разбор запросов в цикле событий, работа с базой в потоках
+
+    Чтения идут в пул readers, записи — в очередь записи database.py.
+    ETag составлен из метки запуска, PRAGMA data_version и даты: от
+    даты зависят просрочка в /stats и окна сводок, а метка запуска не
+    даёт совпасть номерам data_version разных запусков.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, allow_origin=None):
+        self.host = host
+        self.port = port
+        self.allow_origin = allow_origin
+        self.epoch = uuid.uuid4().hex[:8]
+        self.readers = concurrent.futures.ThreadPoolExecutor(
+            db.READER_POOL_SIZE, thread_name_prefix='reader')
+        self.server = None
+
+    def etag(self):
+        return f'"{self.epoch}-{db.data_version()}-{datetime.date.today().isoformat()}"'
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        # С портом 0 система выбирает свободный
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.readers.shutdown(wait=True)
+
+    async def handle(self, reader, writer):
+        """Обслуживание соединения: запросы по очереди, пока клиент держит keep-alive"""
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except HttpError as e:
+                    await self.send(writer, e.status, {}, _encode({'error': str(e)}), keep_alive=False)
+                    return
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    return
+                if request is None:
+                    return
+
+                status, headers, body = await self.dispatch(request)
+                keep_alive = self.keep_alive(request)
+                await self.send(writer, status, headers, body, keep_alive,
+                                head=request.method == 'HEAD')
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def read_request(self, reader):
+        """Разбор строки запроса, заголовков и тела; None — клиент закрыл соединение"""
+        try:
+            line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+            if not line:
+                return None
+            try:
+                method, target, version = line.decode('latin-1').split()
+            except ValueError:
+                raise HttpError(400, "некорректная строка запроса")
+
+            headers = {}
+            while True:
+                line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                if len(headers) > MAX_HEADERS:
+                    raise HttpError(431)
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+        except ValueError:
+            # Строка длиннее буфера StreamReader
+            raise HttpError(400, "слишком длинная строка запроса или заголовка")
+
+        if 'transfer-encoding' in headers:
+            raise HttpError(411)
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HttpError(400, "некорректный Content-Length")
+        if length > MAX_BODY:
+            raise HttpError(413)
+        body = await reader.readexactly(length) if length > 0 else b''
+        return Request(method.upper(), target, version, headers, body)
+
+    @staticmethod
+    def keep_alive(request):
+        connection = request.headers.get('connection', '').lower()
+        if request.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    async def dispatch(self, request):
+        """Выполнение запроса в потоке пула; возвращает (код, заголовки, тело)"""
+        if request.method == 'OPTIONS' and self.allow_origin:
+            return 204, {
+                'Access-Control-Allow-Methods': 'GET, HEAD, POST, PUT, PATCH, DELETE',
+                'Access-Control-Allow-Headers': 'Content-Type, If-None-Match',
+                'Access-Control-Max-Age': '86400',
+            }, None
+        try:
+            handler, request.params = find_route(request.method, request.path)
+        except HttpError as e:
+            return e.status, {}, _encode({'error': str(e)})
+
+        loop = asyncio.get_running_loop()
+        if request.method in ('GET', 'HEAD'):
+            return await loop.run_in_executor(self.readers, self.run_read, handler, request)
+        # Ошибка обработчика должна дойти до очереди: она откатит его изменения
+        try:
+            result = await asyncio.wrap_future(db.submit_write(handler, request))
+        except Exception as e:
+            return self.error_response(e)
+        status, payload = result if isinstance(result, tuple) else (200, result)
+        return status, {}, None if payload is None else _encode(payload)
+
+    def run_read(self, handler, request):
+        # ETag снимается до чтения: если коммит попадёт между ними, клиент
+        # получит более новые данные со старой меткой и просто перезапросит их
+        try:
+            etag = self.etag()
+            headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+            if _etag_matches(request.headers.get('if-none-match'), etag):
+                return 304, headers, None
+            return 200, headers, _encode(handler(request))
+        except Exception as e:
+            return self.error_response(e)
+
+    @staticmethod
+    def error_response(error):
+        if isinstance(error, HttpError):
+            status = error.status
+        elif isinstance(error, (CliError, ValueError)):
+            status = 400
+        elif isinstance(error, sqlite3.IntegrityError):
+            # Нарушенный CHECK или NOT NULL — ошибка в данных запроса,
+            # конфликтом считаются только связи и уникальность
+            message = str(error)
+            status = 400 if message.startswith(('CHECK', 'NOT NULL')) else 409
+        elif isinstance(error, sqlite3.OperationalError) and db.is_busy_error(error):
+            status = 503
+        else:
+            print(f"Ошибка обработки запроса: {error!r}", file=sys.stderr)
+            status = 500
+        return status, {}, _encode({'error': str(error)})
+
+    async def send(self, writer, status, headers, body, keep_alive=True, head=False):
+        """Ответ клиенту; на HEAD — только заголовки"""
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+        if body is not None:
+            lines.append("Content-Type: application/json; charset=utf-8")
+        if status not in (204, 304):
+            lines.append(f"Content-Length: {len(body or b'')}")
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        if self.allow_origin:
+            lines.append(f"Access-Control-Allow-Origin: {self.allow_origin}")
+            lines.append("Access-Control-Expose-Headers: ETag")
+        lines.append("Connection: " + ("keep-alive" if keep_alive else "close"))
+        head_bytes = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+        writer.write(head_bytes if head or body is None else head_bytes + body)
+        await writer.drain()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default=db.DB_NAME, help="файл базы данных")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="0 — любой свободный")
+    parser.add_argument('--allow-origin', help="разрешить запросы браузера с этого origin (CORS)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    db.use_database(args.db)
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.init_database()
+
+    server = StudyServer(args.host, args.port, args.allow_origin)
+
+    async def run():
+        await server.start()
+        print(f"Сервис слушает http://{server.host}:{server.port}", flush=True)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    finally:
+        server.close()
+        db.close_connections()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+import datetime
+import itertools
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db  # noqa: E402
+
+STATUSES = list(db.STATUS_RANKS)
+
+
+@pytest.fixture
+def study_db(tmp_path):
+    """Новая база текущей схемы с тестовыми данными во временном каталоге"""
+    db.use_database(str(tmp_path / 'study.db'))
+    db.init_database()
+    yield
+    db.close_connections()
+
+
+def query_all(sql, params=()):
+    with db.reader() as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def _random_date(rnd):
+    return (datetime.date(2025, 1, 1) + datetime.timedelta(days=rnd.randrange(120))).isoformat()
+
+
+def random_changes(steps=400, seed=1):
+    """Случайная смесь записей через функции database.py
+
+    Задевает всё, от чего зависят производные данные: материалы,
+    категории, теги и их связи, учебные сессии, массовые изменения
+    и каскадные удаления.
+    """
+    rnd = random.Random(seed)
+    names = itertools.count(1)
+    item_ids = [row[0] for row in query_all("SELECT id FROM study_items")]
+    session_ids = []
+
+    def categories():
+        return [row[0] for row in db.get_all_categories()]
+
+    def tags():
+        return [row[0] for row in db.get_all_tags()]
+
+    def some(values, most):
+        return rnd.sample(values, rnd.randint(0, min(most, len(values))))
+
+    def item_data():
+        return {
+            'title': f"Материал {rnd.randrange(10000)}",
+            'description': rnd.choice(["", "Описание"]),
+            'category_id': rnd.choice(categories() + [None]),
+            'rating': rnd.choice([None, 1, 2, 3, 4, 5]),
+            'status': rnd.choice(STATUSES),
+            'deadline': rnd.choice([None, _random_date(rnd)]),
+            'hours_spent': rnd.choice([0, 1.5, 10]),
+            'priority': rnd.randint(1, 5),
+            'tags': some(tags(), 2),
+        }
+
+    for _ in range(steps):
+        action = rnd.random()
+        if action < 0.15 or not item_ids:
+            item_ids.append(db.add_study_item(item_data()))
+        elif action < 0.25:
+            data = item_data()
+            if rnd.random() < 0.5:
+                del data['hours_spent']
+            db.update_study_item(rnd.choice(item_ids), data)
+        elif action < 0.35:
+            field, values = rnd.choice([
+                ('status', STATUSES),
+                ('category_id', categories() + [None]),
+                ('rating', [None, 1, 3, 5]),
+                ('hours_spent', [0, 2, 7.25]),
+            ])
+            db.patch_study_items(rnd.sample(item_ids, min(len(item_ids), 5)),
+                                 **{field: rnd.choice(values)})
+        elif action < 0.42:
+            db.set_item_tags(rnd.choice(item_ids), some(tags(), 3))
+        elif action < 0.47:
+            selection = rnd.sample(item_ids, min(len(item_ids), 4))
+            if rnd.random() < 0.5:
+                db.add_tag_to_items(rnd.choice(tags()), selection)
+            else:
+                db.remove_tag_from_items(rnd.choice(tags()), selection)
+        elif action < 0.70:
+            session_ids.append(db.add_study_session(
+                rnd.choice(item_ids), rnd.choice([0, 15, 30, 45, 90]), _random_date(rnd)))
+        elif action < 0.80 and session_ids:
+            db.update_study_session(rnd.choice(session_ids), rnd.choice([0, 20, 60]),
+                                    _random_date(rnd))
+        elif action < 0.85 and session_ids:
+            session_id = session_ids.pop(rnd.randrange(len(session_ids)))
+            db.delete_study_session(session_id)
+        elif action < 0.92:
+            deleted = rnd.sample(item_ids, min(len(item_ids), rnd.randint(1, 2)))
+            db.delete_study_items(deleted)
+            item_ids = [item_id for item_id in item_ids if item_id not in deleted]
+        elif action < 0.95:
+            db.add_category(f"Категория {seed}-{next(names)}", "", '#123456')
+            db.add_tag(f"тег-{seed}-{next(names)}", '#654321')
+        elif action < 0.97 and len(categories()) > 1:
+            db.delete_category(rnd.choice(categories()))
+        elif len(tags()) > 1:
+            db.delete_tag(rnd.choice(tags()))
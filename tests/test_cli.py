@@ -0,0 +1,95 @@
+"""cli.py: изменения одной транзакцией, проверка ввода и выборка
+
+Запуск из корня проекта:
+    python -m pytest tests
+"""
+import io
+import json
+
+import pytest
+
+import cli
+import database as db
+from conftest import query_all
+
+
+def items():
+    return query_all("SELECT id, status, priority, rating, category_id FROM study_items ORDER BY id")
+
+
+def tag_names(item_id):
+    return sorted(tag[1] for tag in db.get_study_item_by_id(item_id)[1])
+
+
+def test_apply_changes(study_db):
+    report = cli.apply_changes(enumerate([
+        {'ids': [1, 2], 'status': 'on_hold'},
+        {'ids': [3], 'status': 'on_hold'},
+        {'id': 4, 'category': "Математика", 'tags': ["SQL"]},
+        {'id': 5, 'delete': True},
+    ], 1))
+    assert report == {'changes': 4, 'updated': 4, 'deleted': 1, 'tagged': 1}
+
+    statuses = dict(query_all("SELECT id, status FROM study_items"))
+    assert [statuses[item_id] for item_id in (1, 2, 3)] == ['on_hold'] * 3
+    item, _ = db.get_study_item_by_id(4)
+    assert item.category_id == db.get_category_id("Математика")
+    assert tag_names(4) == ["SQL"]
+    assert 5 not in statuses
+
+
+@pytest.mark.parametrize('change', [
+    {'id': 1, 'priority': 9},
+    {'id': 1, 'rating': "5"},
+    {'id': 1, 'status': 'done'},
+    {'id': 1, 'hours_spent': -1},
+    {'id': 1, 'title': ""},
+    {'id': "1", 'priority': 2},
+    {'ids': [1, True], 'priority': 2},
+    {'id': 1, 'tags': "SQL"},
+    {'id': 1, 'category': "Нет такой"},
+    {'id': 1, 'owner': "кто-то"},
+    {'priority': 2},
+    [1, 2],
+])
+def test_bad_change_rolls_back_batch(study_db, change):
+    before = items()
+    with pytest.raises(cli.CliError, match="строка 2"):
+        cli.apply_changes(enumerate([{'ids': [1, 2, 3], 'priority': 5}, change], 1))
+    assert items() == before
+
+
+def run(argv, stdin=''):
+    out = io.StringIO()
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr('sys.stdin', io.StringIO(stdin))
+        patch.setattr('sys.stdout', out)
+        code = cli.main(argv + ['--db', db.DB_NAME])
+    return code, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_update_from_stdin_and_set(study_db):
+    code, report = run(['update'], '{"id": 1, "priority": 4}\n\n{"id": 2, "priority": 4}\n')
+    assert code == 0 and report[0]['updated'] == 2
+
+    # Строки, где приоритет уже 1, не считаются изменёнными
+    changed = query_all("SELECT COUNT(*) FROM study_items"
+                        " WHERE status = 'planned' AND priority != 1")[0][0]
+    code, report = run(['update', '--status', 'planned', '--set', 'priority=1'])
+    assert code == 0 and report[0]['updated'] == changed
+    assert query_all("SELECT DISTINCT priority FROM study_items WHERE status = 'planned'") == [(1,)]
+
+
+def test_update_filters_need_set(study_db, capsys):
+    before = items()
+    code, _ = run(['update', '--status', 'planned'], '{"id": 1, "priority": 4}\n')
+    assert code == 1 and "--set" in capsys.readouterr().err
+    assert items() == before
+
+
+def test_query_matches_database(study_db):
+    code, rows = run(['query', '--status', 'in_progress', '--fields', 'id,title,tags'])
+    assert code == 0
+    expected = [(item.id, item.title, item.tags)
+                for item in db.search_study_items(None, status='in_progress')]
+    assert sorted((row['id'], row['title'], row['tags']) for row in rows) == sorted(expected)
@@ -0,0 +1,118 @@
+"""Экспорт: содержимое файлов совпадает с базой
+
+Запуск из корня проекта:
+    python -m pytest tests
+"""
+import csv
+import gzip
+import json
+import os
+import sqlite3
+import threading
+
+import pytest
+
+import database as db
+import exporter
+import importer
+from conftest import query_all, random_changes
+
+
+@pytest.fixture
+def exported_db(study_db):
+    random_changes(steps=300, seed=7)
+    # Сессия без материала: в JSON Lines её вложить некуда, в CSV она есть
+    with db.transaction() as conn:
+        conn.execute("""INSERT INTO study_sessions (study_item_id, date, duration_minutes)
+                        VALUES (NULL, '2025-03-01', 20)""")
+
+
+def expected_items():
+    """Материалы с тегами и сессиями прямыми запросами к базе"""
+    items = {}
+    for row in query_all(exporter.ITEM_EXPORT_SQL):
+        item = dict(zip(exporter.ITEM_FIELDS, row))
+        item['tags'] = sorted(json.loads(item['tags']))
+        item['sessions'] = []
+        items[item['id']] = item
+    for row in query_all(exporter.SESSION_EXPORT_SQL):
+        if row[1] is not None:
+            items[row[1]]['sessions'].append(dict(zip(exporter.SESSION_FIELDS, row)))
+    return items
+
+
+def read_text(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('name', ['items.jsonl', 'items.jsonl.gz'])
+def test_jsonl_merges_sessions_into_items(exported_db, tmp_path, name):
+    path = str(tmp_path / name)
+    report = exporter.export_file(path)
+
+    items = {}
+    for line in read_text(path).splitlines():
+        item = json.loads(line)
+        item['tags'] = sorted(item['tags'])
+        items[item['id']] = item
+    expected = expected_items()
+    assert items == expected
+    assert report['exported'] == len(expected)
+    assert report['sessions'] == sum(len(item['sessions']) for item in expected.values())
+
+
+def test_csv_items_and_sessions(exported_db, tmp_path):
+    path = str(tmp_path / 'items.csv.gz')
+    report = exporter.export_file(path)
+
+    items = list(csv.DictReader(read_text(path).splitlines()))
+    assert [int(item['id']) for item in items] == [row[0] for row in query_all(
+        "SELECT id FROM study_items ORDER BY id")]
+    sessions = list(csv.reader(read_text(exporter.sessions_path(path)).splitlines()))
+    assert sessions[0] == list(exporter.SESSION_FIELDS)
+    assert len(sessions) - 1 == report['sessions'] == query_all(
+        "SELECT COUNT(*) FROM study_sessions")[0][0]
+    assert ['', '2025-03-01', '20'] in [row[1:4] for row in sessions]
+
+
+def test_csv_round_trip_through_importer(exported_db, tmp_path):
+    path = str(tmp_path / 'items.csv')
+    exporter.export_file(path)
+    before = query_all("""SELECT si.title, c.name, si.rating, si.status, si.deadline,
+                                 si.priority FROM study_items si
+                          LEFT JOIN categories c ON c.id = si.category_id ORDER BY si.id""")
+
+    db.use_database(str(tmp_path / 'copy.db'))
+    db.init_database()
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM study_items")
+    report = importer.import_file(path)
+    assert report['skipped'] == 0
+    assert query_all("""SELECT si.title, c.name, si.rating, si.status, si.deadline,
+                               si.priority FROM study_items si
+                        LEFT JOIN categories c ON c.id = si.category_id ORDER BY si.id""") == before
+
+
+def test_snapshot_copies_all_tables(exported_db, tmp_path):
+    path = str(tmp_path / 'backup.db')
+    exporter.export_file(path)
+    copy = sqlite3.connect(path)
+    try:
+        for table in ('study_items', 'study_sessions', 'study_item_tags', 'study_item_stats',
+                      'session_rollup'):
+            sql = f"SELECT * FROM {table} ORDER BY 1, 2"
+            assert copy.execute(sql).fetchall() == query_all(sql)
+    finally:
+        copy.close()
+
+
+def test_cancelled_export_leaves_no_files(exported_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(exporter, 'FETCH_SIZE', 10)
+    cancel = threading.Event()
+    cancel.set()
+    path = str(tmp_path / 'items.csv')
+    report = exporter.export_file(path, cancel_event=cancel)
+    assert report['cancelled']
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('items')]
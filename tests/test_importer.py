@@ -0,0 +1,105 @@
+"""Импорт CSV и JSON Lines: проверка записей и отложенное обслуживание
+
+Запуск из корня проекта:
+    python -m pytest tests
+"""
+import csv
+import json
+import threading
+
+import pytest
+
+import database as db
+import importer
+from conftest import query_all
+
+FIELDS = ('title', 'description', 'category', 'rating', 'status',
+          'created_at', 'deadline', 'hours_spent', 'priority', 'tags')
+
+GOOD = [
+    {'title': "Импорт один", 'category': "Новая категория", 'rating': '4', 'status': 'planned',
+     'created_at': '2025-01-02T10:30:00', 'deadline': '2025-02-01', 'hours_spent': '1.5',
+     'priority': '2', 'tags': 'Python, новый тег'},
+    {'title': "Импорт два", 'category': "Математика", 'status': 'completed', 'tags': ''},
+]
+BAD = [
+    {'title': "", 'status': 'planned'},
+    {'title': "Плохой дедлайн", 'deadline': '01.02.2025'},
+    {'title': "Плохой рейтинг", 'rating': '7'},
+    {'title': "Плохой статус", 'status': 'done'},
+    {'title': "Плохое время", 'created_at': 'вчера'},
+]
+
+
+def write_csv(path, records):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, FIELDS)
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def write_jsonl(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            if isinstance(record.get('tags'), str):
+                record = dict(record, tags=[tag for tag in record['tags'].split(',') if tag])
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def imported(title):
+    item_id = query_all("SELECT id FROM study_items WHERE title = ?", (title,))[0][0]
+    item, tags = db.get_study_item_by_id(item_id)
+    category = db.get_category(item.category_id)
+    return item, category[1] if category else None, sorted(tag[1] for tag in tags)
+
+
+@pytest.mark.parametrize('name, write', [('items.csv', write_csv), ('items.jsonl', write_jsonl)])
+def test_valid_records_imported_bad_skipped(study_db, tmp_path, name, write):
+    path = str(tmp_path / name)
+    write(path, GOOD + BAD)
+    report = importer.import_file(path, defer=False)
+
+    assert report['imported'] == len(GOOD)
+    assert report['skipped'] == len(BAD)
+    assert len(report['errors']) == len(BAD)
+
+    item, category, tags = imported("Импорт один")
+    assert (item.rating, item.status, item.created_at, item.deadline, item.hours_spent,
+            item.priority) == (4, 'planned', '2025-01-02 10:30:00', '2025-02-01', 1.5, 2)
+    assert category == "Новая категория"
+    assert tags == ['Python', 'новый тег']
+
+    item, category, tags = imported("Импорт два")
+    assert (item.rating, item.status, item.priority, category, tags) == (
+        None, 'completed', 3, "Математика", [])
+    assert not query_all("SELECT 1 FROM study_items WHERE title LIKE 'Плох%'")
+
+
+def test_deferred_import_restores_derived_data(study_db, tmp_path):
+    path = str(tmp_path / 'items.csv')
+    records = [dict(GOOD[i % 2], title=f"Отложенный {i}") for i in range(250)]
+    write_csv(path, records)
+    report = importer.import_file(path, defer=True, chunk_size=100)
+    assert report['imported'] == 250
+
+    with db.reader() as conn:
+        assert db.schema_ready(conn)
+    stats = query_all("SELECT * FROM study_item_stats WHERE count != 0 ORDER BY kind, key")
+    db.rebuild_statistics()
+    assert stats == query_all("SELECT * FROM study_item_stats WHERE count != 0 ORDER BY kind, key")
+    assert db.get_statistics()['total'] == 255
+    if db.fts_enabled():
+        assert len(db.search_study_item_ids('отложенный')) == 250
+
+
+def test_cancelled_import_keeps_written_chunks(study_db, tmp_path):
+    path = str(tmp_path / 'items.csv')
+    write_csv(path, [dict(GOOD[1], title=f"Пачка {i}") for i in range(30)])
+    cancel = threading.Event()
+    cancel.set()
+    # Отмена проверяется после каждой пачки: первая успевает записаться
+    report = importer.import_file(path, defer=True, chunk_size=10, cancel_event=cancel)
+    assert report['cancelled'] and report['imported'] == 10
+    assert query_all("SELECT COUNT(*) FROM study_items WHERE title LIKE 'Пачка%'") == [(10,)]
+    with db.reader() as conn:
+        assert db.schema_ready(conn)
@@ -0,0 +1,56 @@
+"""Миграции схемы: база старой версии доводится до текущей
+
+Запуск из корня проекта:
+    python -m pytest tests
+"""
+import sqlite3
+
+import database as db
+from conftest import query_all
+
+
+def derived_tables():
+    return (
+        query_all("SELECT kind, key, count, round(total, 6) FROM study_item_stats"
+                  " WHERE count != 0 ORDER BY kind, key"),
+        query_all("SELECT * FROM session_rollup WHERE sessions != 0 OR minutes != 0"
+                  " ORDER BY period, kind, key, bucket"),
+    )
+
+
+def test_baseline_database_is_migrated(tmp_path):
+    path = str(tmp_path / 'old.db')
+    # База в том виде, в каком её создавала версия до миграций
+    conn = sqlite3.connect(path)
+    db._migration_base_schema(conn)
+    db.add_default_data(conn)
+    conn.execute("""INSERT INTO study_sessions (study_item_id, date, duration_minutes)
+                    VALUES (1, '2025-03-01', 30), (2, '2025-03-02', 45)""")
+    conn.commit()
+    conn.close()
+
+    db.use_database(path)
+    try:
+        db.init_database()
+        with db.reader() as conn:
+            assert db.get_schema_version(conn) == db.SCHEMA_VERSION
+            assert db.schema_ready(conn)
+        assert db.get_statistics()['total'] == 5
+
+        migrated = derived_tables()
+        db.rebuild_statistics()
+        db.rebuild_rollups()
+        assert derived_tables() == migrated
+
+        if db.fts_enabled():
+            titles = [item.title for item in db.search_study_items('алгоритм')]
+            assert titles == ['Алгоритмы сортировки']
+    finally:
+        db.close_connections()
+
+
+def test_init_is_idempotent(study_db):
+    objects = query_all("SELECT type, name FROM sqlite_master ORDER BY name")
+    db.init_database()
+    assert query_all("SELECT type, name FROM sqlite_master ORDER BY name") == objects
+    assert query_all("SELECT COUNT(*) FROM study_items") == [(5,)]
@@ -0,0 +1,76 @@
+"""Кэш запросов: результат из кэша совпадает с чтением из базы
+
+Запуск из корня проекта:
+    python -m pytest tests
+"""
+import sqlite3
+
+import database as db
+from conftest import random_changes
+
+CACHED_CALLS = [
+    lambda: db.get_all_study_items(),
+    lambda: db.count_study_items(status='planned'),
+    lambda: db.get_statistics(),
+    lambda: db.get_rollup_series('week', 'category'),
+    lambda: db.search_study_items('материал'),
+    lambda: db.search_study_item_ids('материал'),
+]
+
+
+def uncached(call):
+    db.clear_query_cache()
+    return call()
+
+
+def test_cached_results_follow_writes(study_db):
+    for seed in range(1, 6):
+        for call in CACHED_CALLS:
+            call()
+        random_changes(steps=40, seed=seed)
+        # Поколение сменилось: кэш отдаёт не старые результаты, а новые
+        cached = [call() for call in CACHED_CALLS]
+        assert cached == [uncached(call) for call in CACHED_CALLS]
+
+
+def test_repeated_call_is_a_hit(study_db):
+    db.get_statistics()
+    before = db.get_query_cache_stats()['hits']
+    db.get_statistics()
+    assert db.get_query_cache_stats()['hits'] == before + 1
+
+
+def test_commit_from_another_connection_invalidates(study_db):
+    total = db.get_statistics()['total']
+    conn = sqlite3.connect(db.DB_NAME)
+    conn.execute("""INSERT INTO study_items (title, status, priority)
+                    VALUES ('Из другого процесса', 'planned', 3)""")
+    conn.commit()
+    conn.close()
+    assert db.get_statistics()['total'] == total + 1
+
+
+def test_callers_get_independent_copies(study_db):
+    stats = db.get_statistics()
+    stats['by_status'].clear()
+    stats['total'] = -1
+    items = db.get_all_study_items()
+    items.clear()
+    series = db.get_rollup_series('day', 'all')
+    series.setdefault(0, []).append(('2000-01-01', 1))
+
+    assert db.get_statistics() == uncached(db.get_statistics)
+    assert db.get_all_study_items() == uncached(db.get_all_study_items)
+    assert db.get_rollup_series('day', 'all') == uncached(
+        lambda: db.get_rollup_series('day', 'all'))
+
+
+def test_transaction_sees_own_writes(study_db):
+    total = db.get_statistics()['total']
+    with db.transaction():
+        db.add_study_item({
+            'title': "В транзакции", 'description': "", 'category_id': None, 'rating': None,
+            'status': 'planned', 'deadline': None, 'priority': 3,
+        })
+        assert db.get_statistics()['total'] == total + 1
+    assert db.get_statistics()['total'] == total + 1
@@ -0,0 +1,129 @@
+"""Планы горячих запросов: каждый идёт по своему индексу
+
+Тест заполняет временную базу, вызывает функции database.py,
+перехватывает выполненный ими SQL и проверяет EXPLAIN QUERY PLAN:
+в плане есть ожидаемый индекс, нет полного сканирования большой
+таблицы и нет сортировки во временном B-дереве.
+
+Запуск из корня проекта:
+    python -m pytest tests
+"""
+import random
+
+import pytest
+
+import database as db
+from profiler import full_scans
+
+ITEMS = 5000
+SORT_KEY = (1, '2025-06-01', 100)
+
+# (имя, вызов, подстроки плана, сортировка во временном B-дереве допустима)
+# Фильтр по тегу читает id материалов тега по индексу и сортирует их:
+# для редких тегов это на порядки быстрее обхода всего списка по порядку
+HOT_CALLS = [
+    ('get_all_study_items', lambda: db.get_all_study_items(),
+     ['idx_study_items_order'], False),
+    ('page', lambda: db.get_study_items_page(limit=50),
+     ['idx_study_items_order'], False),
+    ('page after', lambda: db.get_study_items_page(after=SORT_KEY, limit=50),
+     ['idx_study_items_order'], False),
+    ('page before', lambda: db.get_study_items_page(before=SORT_KEY, limit=50),
+     ['idx_study_items_order'], False),
+    ('page status', lambda: db.get_study_items_page(limit=50, status='planned'),
+     ['idx_study_items_order'], False),
+    ('page tag', lambda: db.get_study_items_page(limit=50, tag_id=1),
+     ['idx_study_item_tags_tag'], True),
+    ('count status', lambda: db.count_study_items(status='planned'),
+     ['idx_study_items_status_deadline'], False),
+    ('count before', lambda: db.count_study_items(before=SORT_KEY),
+     ['idx_study_items_order'], False),
+    ('search: статус', lambda: db.search_study_items(None, status='planned'),
+     ['idx_study_items_status_deadline'], False),
+    ('search: категория', lambda: db.search_study_items(None, category_id=2),
+     ['idx_study_items_category'], False),
+    ('search: тег', lambda: db.search_study_items(None, tag_id=1),
+     ['idx_study_item_tags_tag'], True),
+    ('search: текст', lambda: db.search_study_items('матер', snippets=True),
+     ['study_items_fts'], False),
+    ('search ids: текст', lambda: db.search_study_item_ids('матер'),
+     ['study_items_fts'], False),
+    ('get_statistics', lambda: db.get_statistics(),
+     ['study_item_stats', 'idx_study_items_deadline'], False),
+    ('get_upcoming_deadlines', lambda: db.get_upcoming_deadlines('2025-01-01', '2025-01-15'),
+     ['idx_study_items_deadline'], False),
+]
+
+
+def seed(items):
+    rnd = random.Random(1)
+    statuses = ['planned', 'in_progress', 'completed', 'on_hold']
+    rows = [
+        (f"Материал {i}", "Описание", rnd.randint(1, 5), rnd.randint(1, 5),
+         rnd.choice(statuses), f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+         rnd.randint(1, 5))
+        for i in range(items)
+    ]
+    with db.transaction() as conn:
+        conn.executemany(
+            """INSERT INTO study_items
+               (title, description, category_id, rating, status, deadline, priority)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            rows
+        )
+        tag_ids = [row[0] for row in conn.execute("SELECT id FROM tags")]
+        conn.executemany(
+            "INSERT OR IGNORE INTO study_item_tags (study_item_id, tag_id) VALUES (?, ?)",
+            [(item_id, rnd.choice(tag_ids)) for item_id in range(1, items + 1)]
+        )
+        conn.execute("ANALYZE")
+
+
+@pytest.fixture(scope='module')
+def database(tmp_path_factory):
+    db.use_database(str(tmp_path_factory.mktemp('plans') / 'plans.db'))
+    db.init_database()
+    seed(ITEMS)
+    yield
+    db.close_connections()
+
+
+def traced_plans(call):
+    """Планы SELECT-запросов вызова: [(sql, строки плана, полные сканирования)]"""
+    statements = []
+    db.clear_query_cache()
+    db.get_manager().set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        db.get_manager().set_trace_callback(None)
+
+    plans = []
+    with db.reader() as conn:
+        for sql in statements:
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            # Служебные запросы SQLite и FTS5 к своим таблицам не проверяем
+            if 'sqlite_master' in sql or "'main'." in sql:
+                continue
+            plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+            plans.append((sql, plan, full_scans(conn, sql)))
+    return plans
+
+
+@pytest.mark.parametrize('name, call, expected, sorts', HOT_CALLS,
+                         ids=[case[0] for case in HOT_CALLS])
+def test_hot_query_plan(database, name, call, expected, sorts):
+    plans = traced_plans(call)
+    assert plans, f"{name}: не выполнено ни одного запроса"
+
+    lines = [line for _, plan, _ in plans for line in plan]
+    for index in expected:
+        assert any(index in line for line in lines), f"{name}: нет {index} в плане {lines}"
+
+    for sql, plan, scans in plans:
+        query = ' '.join(sql.split())[:120]
+        assert not scans, f"{name}: полное сканирование {scans}\n{query}"
+        if not sorts:
+            temp = [line for line in plan if 'USE TEMP B-TREE' in line]
+            assert not temp, f"{name}: сортировка {temp}\n{query}"
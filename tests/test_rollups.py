@@ -0,0 +1,68 @@
+"""Сводки session_rollup совпадают с пересчётом по всем сессиям
+
+Запуск из корня проекта:
+    python -m pytest tests
+"""
+import datetime
+
+import pytest
+
+import database as db
+from conftest import query_all, random_changes
+
+# Недели на стыке лет: 2024-12-30 - это 2025-W01, 2021-01-03 - 2020-W53
+EDGE_DATES = ['2024-12-30', '2021-01-03', '2025-02-28']
+
+
+def rollup_rows():
+    # Триггеры оставляют обнулившиеся строки, пересчёт их не создаёт
+    return query_all("SELECT * FROM session_rollup WHERE sessions != 0 OR minutes != 0"
+                     " ORDER BY period, kind, key, bucket")
+
+
+def expected_series(period, kind):
+    """get_rollup_series() по сессиям, материалам и тегам в памяти"""
+    keys = {
+        'all': "SELECT id, 0 FROM study_items",
+        'category': "SELECT id, category_id FROM study_items WHERE category_id IS NOT NULL",
+        'tag': "SELECT study_item_id, tag_id FROM study_item_tags",
+    }[kind]
+    item_keys = {}
+    for item_id, key in query_all(keys):
+        item_keys.setdefault(item_id, []).append(key)
+
+    minutes = {}
+    for item_id, date, duration in query_all(
+            "SELECT study_item_id, date, duration_minutes FROM study_sessions"):
+        bucket = db.rollup_bucket(datetime.date.fromisoformat(date), period)
+        for key in item_keys.get(item_id, ()):
+            minutes[key, bucket] = minutes.get((key, bucket), 0) + (duration or 0)
+
+    series = {}
+    for (key, bucket), total in sorted(minutes.items()):
+        if total:
+            series.setdefault(key, []).append((bucket, total))
+    return series
+
+
+def add_edge_sessions():
+    item_ids = [row[0] for row in query_all("SELECT id FROM study_items LIMIT 3")]
+    for item_id, date in zip(item_ids, EDGE_DATES):
+        db.add_study_session(item_id, 50, date)
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_rollups_match_rebuild(study_db, seed):
+    add_edge_sessions()
+    random_changes(seed=seed)
+    maintained = rollup_rows()
+    db.rebuild_rollups()
+    assert maintained == rollup_rows()
+
+
+@pytest.mark.parametrize('period', db.ROLLUP_PERIODS)
+@pytest.mark.parametrize('kind', ['all', 'category', 'tag'])
+def test_series_match_sessions(study_db, period, kind):
+    add_edge_sessions()
+    random_changes(seed=5)
+    assert db.get_rollup_series(period, kind) == expected_series(period, kind)
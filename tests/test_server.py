@@ -0,0 +1,73 @@
+"""server.py: проверка тел запросов и курсоров без сетевого сервера
+
+Обработчики вызываются напрямую, код ответа даёт error_response().
+
+Запуск из корня проекта:
+    python -m pytest tests
+"""
+import base64
+import json
+import sqlite3
+
+import pytest
+
+import database as db
+import server
+
+
+def call(method, target, body=None):
+    request = server.Request(method, target, 'HTTP/1.1', {},
+                             None if body is None else json.dumps(body).encode())
+    handler, request.params = server.find_route(method, request.path)
+    try:
+        result = handler(request)
+    except Exception as e:
+        return server.StudyServer.error_response(e)[0], None
+    return result if isinstance(result, tuple) else (200, result)
+
+
+def cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('method, target, body', [
+    ('POST', '/items', {'title': "Новый", 'rating': 9}),
+    ('POST', '/items', {'title': "Новый", 'priority': 0}),
+    ('POST', '/items', {'title': "Новый", 'status': 'done'}),
+    ('POST', '/items', {'title': "Новый", 'tags': "SQL"}),
+    ('POST', '/items', {'title': "Новый", 'category': {}}),
+    ('PUT', '/items/1', {'title': "Новый", 'rating': True}),
+    ('PATCH', '/items/1', {'rating': 7}),
+    ('PATCH', '/items', [{'id': 1, 'priority': "высокий"}]),
+    ('POST', '/items/1/sessions', {'duration_minutes': -5}),
+])
+def test_invalid_fields_are_bad_requests(study_db, method, target, body):
+    before = db.get_all_study_items()
+    assert call(method, target, body)[0] == 400
+    assert db.get_all_study_items() == before
+
+
+@pytest.mark.parametrize('target', [
+    '/items?cursor=' + cursor([{}, [], 1]),
+    '/items?cursor=' + cursor([1, 2]),
+    '/items?search=sql&cursor=' + cursor(-1),
+    '/items?search=sql&cursor=' + cursor(True),
+])
+def test_malformed_cursor(study_db, target):
+    assert call('GET', target)[0] == 400
+
+
+def test_cursor_pages_cover_list(study_db):
+    seen, target = [], '/items?limit=2'
+    while target:
+        status, payload = call('GET', target)
+        assert status == 200
+        seen += [item['id'] for item in payload['items']]
+        target = payload['next'] and '/items?limit=2&cursor=' + payload['next']
+    assert seen == [item.id for item in db.get_all_study_items()]
+
+
+def test_integrity_errors(study_db):
+    assert call('POST', '/items/999/sessions', {'duration_minutes': 5})[0] == 409
+    check = sqlite3.IntegrityError("CHECK constraint failed: rating >= 1 AND rating <= 5")
+    assert server.StudyServer.error_response(check)[0] == 400
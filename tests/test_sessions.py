@@ -0,0 +1,76 @@
+"""Учебные сессии: триггеры прибавляют их минуты к hours_spent материала
+
+Запуск из корня проекта:
+    python -m pytest tests
+"""
+import random
+
+import pytest
+
+import database as db
+from conftest import query_all
+
+
+def hours(item_id):
+    return query_all("SELECT hours_spent FROM study_items WHERE id = ?", (item_id,))[0][0]
+
+
+def new_item(hours_spent=2):
+    return db.add_study_item({
+        'title': "Сессии", 'description': "", 'category_id': None, 'rating': None,
+        'status': 'in_progress', 'deadline': None, 'hours_spent': hours_spent, 'priority': 3,
+    })
+
+
+def test_session_changes_update_hours(study_db):
+    item_id = new_item()
+    session_id = db.add_study_session(item_id, 30, '2025-03-01')
+    assert hours(item_id) == pytest.approx(2.5)
+
+    db.update_study_session(session_id, 90, '2025-03-01')
+    assert hours(item_id) == pytest.approx(3.5)
+
+    # Правка материала без hours_spent не затирает часы сессий
+    item, _ = db.get_study_item_by_id(item_id)
+    data = {field: getattr(item, field) for field in db.ITEM_COLUMNS}
+    del data['hours_spent']
+    db.update_study_item(item_id, data)
+    assert hours(item_id) == pytest.approx(3.5)
+
+    db.delete_study_session(session_id)
+    assert hours(item_id) == pytest.approx(2)
+
+
+def test_hours_match_sessions_sum(study_db):
+    rnd = random.Random(1)
+    item_ids = [new_item(0) for _ in range(5)]
+    session_ids = []
+    for _ in range(300):
+        action = rnd.random()
+        if action < 0.5 or not session_ids:
+            session_ids.append(db.add_study_session(
+                rnd.choice(item_ids), rnd.choice([0, 10, 25, 60]), '2025-03-01'))
+        elif action < 0.8:
+            db.update_study_session(rnd.choice(session_ids), rnd.choice([0, 5, 45]), '2025-03-02')
+        else:
+            db.delete_study_session(session_ids.pop(rnd.randrange(len(session_ids))))
+
+    expected = dict(query_all(
+        "SELECT study_item_id, SUM(duration_minutes) / 60.0 FROM study_sessions"
+        " GROUP BY study_item_id"))
+    for item_id in item_ids:
+        assert hours(item_id) == pytest.approx(expected.get(item_id, 0))
+
+
+def test_sessions_counted_while_maintenance_suspended(study_db):
+    item_id = new_item()
+    with db.transaction() as conn:
+        suspended = db.suspend_maintenance(conn)
+    assert not suspended & set(db.SESSION_TRIGGERS)
+
+    db.add_study_session(item_id, 60, '2025-03-01')
+    with db.transaction() as conn:
+        db.resume_maintenance(conn, suspended)
+    assert hours(item_id) == pytest.approx(3)
+    assert db.get_statistics()['total_hours'] == pytest.approx(
+        query_all("SELECT SUM(hours_spent) FROM study_items")[0][0])
@@ -0,0 +1,50 @@
+"""Сводная статистика study_item_stats совпадает с пересчётом с нуля
+
+Запуск из корня проекта:
+    python -m pytest tests
+"""
+import pytest
+
+import database as db
+from conftest import query_all, random_changes
+
+
+def stats_rows():
+    # Триггеры оставляют обнулившиеся строки, пересчёт их не создаёт
+    return query_all("SELECT kind, key, count, round(total, 6) FROM study_item_stats"
+                     " WHERE count != 0 ORDER BY kind, key")
+
+
+def expected_statistics():
+    """get_statistics() по самой таблице материалов, без сводной"""
+    rows = query_all("SELECT status, category_id, rating, hours_spent FROM study_items")
+    ratings = [rating for _, _, rating, _ in rows if rating is not None]
+    names = dict(query_all("SELECT id, name FROM categories"))
+    by_status, by_category = {}, {}
+    for status, category_id, _, _ in rows:
+        by_status[status] = by_status.get(status, 0) + 1
+        if category_id is not None:
+            name = names[category_id]
+            by_category[name] = by_category.get(name, 0) + 1
+    return {
+        'total': len(rows),
+        'total_hours': round(sum(hours or 0 for *_, hours in rows), 2),
+        'avg_rating': pytest.approx(sum(ratings) / len(ratings) if ratings else 0),
+        'by_status': by_status,
+        'by_category': by_category,
+    }
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_stats_match_rebuild(study_db, seed):
+    random_changes(seed=seed)
+    maintained = stats_rows()
+    db.rebuild_statistics()
+    assert maintained == stats_rows()
+
+
+def test_get_statistics_matches_items(study_db):
+    random_changes(seed=4)
+    stats = db.get_statistics()
+    stats.pop('overdue')
+    assert stats == expected_statistics()